@@ -1,34 +1,58 @@
 import os
+import heapq
 
 # ✅ Define Input Folder
 INPUT_FOLDER = "cleaned_subtitles"
-
-# ✅ Store token counts
-token_counts = {}
-
-# ✅ Process each subtitle file
-for filename in os.listdir(INPUT_FOLDER):
-    file_path = os.path.join(INPUT_FOLDER, filename)
-
-    if filename.endswith((".srt", ".vtt", ".ass", ".nfo")):
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            text = f.read()
-
-        # Tokenize (split by spaces)
-        tokens = text.split()
-        token_counts[filename] = len(tokens)
-
-# ✅ Sorting by file size (largest first)
-sorted_files = sorted(token_counts.items(), key=lambda x: x[1], reverse=True)
-
-# ✅ Print top 10 largest subtitle files
-print("\n📌 Top 10 Largest Subtitle Files by Token Count:")
-for i, (file, count) in enumerate(sorted_files[:10]):
-    print(f"{i+1}. {file} - {count} tokens")
-
-# ✅ Print summary
-total_files = len(token_counts)
-average_tokens = sum(token_counts.values()) / total_files if total_files > 0 else 0
-
-print(f"\n✅ Total Files Analyzed: {total_files}")
-print(f"📊 Average Tokens per File: {int(average_tokens)}")
+INPUT_DATASET = "cleaned_subtitles.parquet"   # used instead of the folder when it exists (see columnar_dataset.py)
+TOP_N = 10
+
+# ✅ Columnar path: token counts were stored at cleaning time, so stats only scan two columns
+def row_group_stats(table):
+    """(files, total tokens, top-N (tokens, source)) of one row group of the documents dataset."""
+    sources, tokens = table.column("source").to_pylist(), table.column("tokens").to_pylist()
+    return len(tokens), sum(tokens), heapq.nlargest(TOP_N, zip(tokens, sources))
+
+def dataset_token_counts(path=INPUT_DATASET):
+    """Row groups are scanned in parallel; only `source` and `tokens` are read, never the text."""
+    from columnar_dataset import map_row_groups
+
+    parts = map_row_groups(path, row_group_stats, columns=["source", "tokens"])
+    total_files = sum(files for files, _, _ in parts)
+    total_tokens = sum(tokens for _, tokens, _ in parts)
+    largest = heapq.nlargest(TOP_N, (top for _, _, tops in parts for top in tops))
+    return total_files, total_tokens, [(source, count) for count, source in largest]
+
+# ✅ Folder path: read and tokenize every subtitle file
+def folder_token_counts(folder=INPUT_FOLDER):
+    token_counts = {}
+    for filename in os.listdir(folder):
+        file_path = os.path.join(folder, filename)
+
+        if filename.endswith((".srt", ".vtt", ".ass", ".nfo")):
+            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+                text = f.read()
+
+            # Tokenize (split by spaces)
+            tokens = text.split()
+            token_counts[filename] = len(tokens)
+
+    # ✅ Sorting by file size (largest first)
+    sorted_files = sorted(token_counts.items(), key=lambda x: x[1], reverse=True)
+    return len(token_counts), sum(token_counts.values()), sorted_files[:TOP_N]
+
+if __name__ == "__main__":
+    if os.path.exists(INPUT_DATASET):
+        total_files, total_tokens, largest = dataset_token_counts()
+    else:
+        total_files, total_tokens, largest = folder_token_counts()
+
+    # ✅ Print top 10 largest subtitle files
+    print(f"\n📌 Top {TOP_N} Largest Subtitle Files by Token Count:")
+    for i, (file, count) in enumerate(largest):
+        print(f"{i+1}. {file} - {count} tokens")
+
+    # ✅ Print summary
+    average_tokens = total_tokens / total_files if total_files > 0 else 0
+
+    print(f"\n✅ Total Files Analyzed: {total_files}")
+    print(f"📊 Average Tokens per File: {int(average_tokens)}")
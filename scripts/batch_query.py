@@ -0,0 +1,126 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+
+from search_backends import get_backend, PERSIST_DIR, COLLECTION_NAME
+from embedding_store import STORE_DIR
+from embedding_engine import load_encoder, ENCODER_BACKENDS
+
+# ✅ Batch retrieval defaults
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ENCODE_BATCH_SIZE = 256    # queries encoded per model call
+QUERY_BATCH_SIZE = 64      # query embeddings sent per collection.query call
+TOP_K = 5
+
+
+def read_queries(source, fmt):
+    """
+    Yield (query_id, query_text) from JSONL ({"id": ..., "query": ...}), CSV
+    (columns `query` and optional `id`) or plain text (one query per line).
+    Missing IDs default to the line number.
+    """
+    if fmt == "csv":
+        for i, row in enumerate(csv.DictReader(source)):
+            if row.get("query"):
+                yield row.get("id") or str(i), row["query"]
+        return
+    for i, line in enumerate(source):
+        line = line.strip()
+        if not line:
+            continue
+        if fmt == "jsonl":
+            record = json.loads(line)
+            yield str(record.get("id", i)), record["query"]
+        else:
+            yield str(i), line
+
+
+def iter_groups(items, size):
+    group = []
+    for item in items:
+        group.append(item)
+        if len(group) >= size:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+def run_batch(queries, model, backend, out, top_k=TOP_K, encode_batch_size=ENCODE_BATCH_SIZE,
+              query_batch_size=QUERY_BATCH_SIZE, include_documents=True):
+    """
+    Encode queries in batches, issue multi-vector queries in chunks and stream one
+    JSONL result line per query to `out`. Returns throughput stats.
+    """
+    stats = {"queries": 0, "encode_s": 0.0, "query_s": 0.0}
+    start = time.perf_counter()
+    for group in iter_groups(queries, encode_batch_size):
+        t0 = time.perf_counter()
+        embeddings = model.encode([text for _, text in group], batch_size=encode_batch_size,
+                                  show_progress_bar=False).tolist()
+        stats["encode_s"] += time.perf_counter() - t0
+
+        for i in range(0, len(group), query_batch_size):
+            sub_group = group[i:i + query_batch_size]
+            t0 = time.perf_counter()
+            results = backend.query(embeddings[i:i + query_batch_size], top_k=top_k)
+            stats["query_s"] += time.perf_counter() - t0
+
+            for q, (query_id, text) in enumerate(sub_group):
+                hits = []
+                for rank, (doc_id, dist) in enumerate(zip(results["ids"][q], results["distances"][q]), start=1):
+                    hit = {"rank": rank, "id": doc_id, "distance": dist}
+                    if include_documents:
+                        hit["document"] = results["documents"][q][rank - 1]
+                    if results["metadatas"][q][rank - 1]:
+                        hit["metadata"] = results["metadatas"][q][rank - 1]
+                    hits.append(hit)
+                out.write(json.dumps({"id": query_id, "query": text, "results": hits}) + "\n")
+            stats["queries"] += len(sub_group)
+    stats["total_s"] = time.perf_counter() - start
+    stats["qps"] = stats["queries"] / stats["total_s"] if stats["total_s"] else 0.0
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk subtitle retrieval: queries in, JSONL results out.")
+    parser.add_argument("input", nargs="?", default="-", help="Query file (.jsonl, .csv or .txt); '-' reads stdin")
+    parser.add_argument("--format", choices=["jsonl", "csv", "text"], default=None,
+                        help="Input format (default: from the file extension, jsonl for stdin)")
+    parser.add_argument("--output", default="-", help="Results JSONL file; '-' writes stdout")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--encode-batch-size", type=int, default=ENCODE_BATCH_SIZE)
+    parser.add_argument("--query-batch-size", type=int, default=QUERY_BATCH_SIZE)
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default="chroma")
+    parser.add_argument("--no-documents", action="store_true", help="Only output IDs and distances")
+    parser.add_argument("--encoder", choices=ENCODER_BACKENDS, default="torch", help="Query encoder backend")
+    args = parser.parse_args()
+
+    fmt = args.format
+    if fmt is None:
+        ext = os.path.splitext(args.input)[1].lower()
+        fmt = {".csv": "csv", ".txt": "text"}.get(ext, "jsonl")
+
+    model = load_encoder(MODEL_NAME, args.encoder)
+    if args.backend == "chroma":
+        backend = get_backend("chroma", persist_dir=PERSIST_DIR, collection_name=COLLECTION_NAME)
+    else:
+        backend = get_backend("numpy", store_dir=STORE_DIR)
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8", newline="")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        stats = run_batch(read_queries(source, fmt), model, backend, out, args.top_k,
+                          args.encode_batch_size, args.query_batch_size, not args.no_documents)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+    # Summary goes to stderr so stdout stays pure JSONL
+    print(f"🎯 {stats['queries']} queries in {stats['total_s']:.1f}s -> {stats['qps']:.1f} queries/s "
+          f"(encode {stats['encode_s']:.1f}s, search {stats['query_s']:.1f}s)", file=sys.stderr)
@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import chromadb
+
+from embedding_store import EmbeddingStore, EMBEDDING_DIM
+from search_backends import ChromaBackend, NumpyBackend
+
+# ✅ Benchmark parameters
+CORPUS_SIZES = [10000, 50000, 200000]
+NUM_QUERIES = 200
+TOP_K = 5
+INSERT_BATCH = 5000      # Chroma's max batch size is around this
+RESULTS_FILE = "benchmark_backends.json"
+
+
+def synthetic_embeddings(n, dim, seed):
+    """Unit-norm random vectors with some cluster structure, like real sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 500), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def percentile_ms(samples, p):
+    return float(np.percentile(samples, p) * 1000)
+
+
+def time_queries(backend, queries, top_k):
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        res = backend.query([q.tolist()], top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+        results.append(res["ids"][0])
+    return latencies, results
+
+
+def run_size(n, workdir, num_queries=NUM_QUERIES, top_k=TOP_K):
+    vectors = synthetic_embeddings(n, EMBEDDING_DIM, seed=n)
+    ids = [f"chunk_{i}" for i in range(n)]
+    texts = [f"synthetic chunk {i}" for i in range(n)]
+    queries = synthetic_embeddings(num_queries, EMBEDDING_DIM, seed=n + 1)
+
+    # Build both indexes from the same vectors
+    store_dir = os.path.join(workdir, f"store_{n}")
+    store = EmbeddingStore(store_dir)
+    chroma_dir = os.path.join(workdir, f"chroma_{n}")
+    collection = chromadb.PersistentClient(path=chroma_dir).get_or_create_collection(
+        "bench", metadata={"hnsw:space": "cosine"}
+    )
+    start = time.perf_counter()
+    for i in range(0, n, INSERT_BATCH):
+        collection.add(ids=ids[i:i + INSERT_BATCH], embeddings=vectors[i:i + INSERT_BATCH].tolist(),
+                       documents=texts[i:i + INSERT_BATCH])
+    chroma_build = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(0, n, INSERT_BATCH):
+        store.append(ids[i:i + INSERT_BATCH], texts[i:i + INSERT_BATCH], vectors[i:i + INSERT_BATCH])
+    numpy_build = time.perf_counter() - start
+
+    # Cold start = open the persisted index from disk in a fresh client/reader
+    start = time.perf_counter()
+    chroma = ChromaBackend(chromadb.PersistentClient(path=chroma_dir).get_collection("bench"))
+    chroma.query([queries[0].tolist()], top_k=top_k)
+    chroma_cold = time.perf_counter() - start
+    start = time.perf_counter()
+    exact = NumpyBackend(store_dir, space="cosine")   # same scale as the cosine "bench" collection
+    exact.query([queries[0].tolist()], top_k=top_k)
+    numpy_cold = time.perf_counter() - start
+
+    chroma_lat, chroma_ids = time_queries(chroma, queries, top_k)
+    numpy_lat, numpy_ids = time_queries(exact, queries, top_k)
+
+    # NumPy search is exact, so it is the ground truth for Chroma's recall@k
+    recall = np.mean([len(set(a) & set(b)) / top_k for a, b in zip(chroma_ids, numpy_ids)])
+
+    start = time.perf_counter()
+    exact.query(queries.tolist(), top_k=top_k)
+    numpy_batch_qps = num_queries / (time.perf_counter() - start)
+
+    return {
+        "corpus_size": n,
+        "chroma": {"build_s": chroma_build, "cold_start_s": chroma_cold,
+                   "p50_ms": percentile_ms(chroma_lat, 50), "p95_ms": percentile_ms(chroma_lat, 95),
+                   f"recall@{top_k}": float(recall)},
+        "numpy": {"build_s": numpy_build, "cold_start_s": numpy_cold,
+                  "p50_ms": percentile_ms(numpy_lat, 50), "p95_ms": percentile_ms(numpy_lat, 95),
+                  f"recall@{top_k}": 1.0, "batched_qps": numpy_batch_qps},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Chroma HNSW and NumPy exact search latency/recall.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=CORPUS_SIZES, help="Corpus sizes to test")
+    parser.add_argument("--queries", type=int, default=NUM_QUERIES, help="Queries per corpus size")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--output", default=RESULTS_FILE, help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_backends_")
+    all_results = []
+    try:
+        for n in args.sizes:
+            print(f"🚀 Benchmarking corpus of {n} vectors...")
+            res = run_size(n, workdir, args.queries, args.top_k)
+            all_results.append(res)
+            for name in ("chroma", "numpy"):
+                r = res[name]
+                print(f"   {name:>6}: cold start {r['cold_start_s']:.2f}s | p50 {r['p50_ms']:.2f}ms | "
+                      f"p95 {r['p95_ms']:.2f}ms | recall@{args.top_k} {r[f'recall@{args.top_k}']:.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(all_results, f, indent=2)
+    print(f"\n✅ Results saved to {args.output}")
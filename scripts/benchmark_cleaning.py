@@ -0,0 +1,90 @@
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+from synthetic_corpus import write_corpus
+from clean_subtitles import clean_folder, NUM_WORKERS
+
+# ✅ Benchmark parameters
+NUM_FILES = 300
+CUES_PER_FILE = 600
+RESULTS_FILE = "benchmark_cleaning.json"
+
+
+def legacy_clean_subtitle(text):
+    """The original four-pass regex cleaner, kept here as the baseline."""
+    text = re.sub(r"\d{2}:\d{2}:\d{2}[.,]\d{1,3} --> \d{2}:\d{2}:\d{2}[.,]\d{1,3}", "", text)
+    text = re.sub(r"\d{2}:\d{2}:\d{2}", "", text)
+    text = re.sub(r"[^a-zA-Z0-9\s.,!?']", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+def run_legacy(input_folder, output_folder):
+    """Serial read-whole-file + legacy regex cleaning, as the old script did."""
+    os.makedirs(output_folder, exist_ok=True)
+    start = time.perf_counter()
+    n_files, n_bytes = 0, 0
+    for filename in os.listdir(input_folder):
+        path = os.path.join(input_folder, filename)
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            text = f.read()
+        with open(os.path.join(output_folder, filename), "w", encoding="utf-8") as f:
+            f.write(legacy_clean_subtitle(text))
+        n_files += 1
+        n_bytes += os.path.getsize(path)
+    return n_files, n_bytes, time.perf_counter() - start
+
+
+def leftover_junk(output_folder):
+    """Count tokens that should never reach embeddings (headers, cue IDs, style lines)."""
+    junk = re.compile(r"\b(WEBVTT|Dialogue|Format|Style|Kind|Language|NOTE|STYLE|cue)\b")
+    count = 0
+    for filename in os.listdir(output_folder):
+        with open(os.path.join(output_folder, filename), "r", encoding="utf-8") as f:
+            count += len(junk.findall(f.read()))
+    return count
+
+
+def summarize(name, n_files, n_bytes, seconds, junk):
+    return {"name": name, "files": n_files, "mb": n_bytes / 1e6, "seconds": seconds,
+            "files_per_s": n_files / seconds, "mb_per_s": n_bytes / 1e6 / seconds, "junk_tokens": junk}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput benchmark for subtitle cleaning.")
+    parser.add_argument("--files", type=int, default=NUM_FILES)
+    parser.add_argument("--cues", type=int, default=CUES_PER_FILE, help="Average cues per file")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS)
+    parser.add_argument("--output", default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_cleaning_")
+    try:
+        corpus = os.path.join(workdir, "corpus")
+        total = write_corpus(corpus, args.files, args.cues)
+        print(f"📂 Synthetic corpus: {args.files} files, {total / 1e6:.1f} MB (SRT/VTT/ASS)")
+
+        results = []
+        out = os.path.join(workdir, "legacy")
+        results.append(summarize("legacy regex, serial", *run_legacy(corpus, out), leftover_junk(out)))
+        out = os.path.join(workdir, "parser_1")
+        results.append(summarize("format-aware, 1 worker", *clean_folder(corpus, out, 1, verbose=False),
+                                 leftover_junk(out)))
+        out = os.path.join(workdir, f"parser_{args.workers}")
+        results.append(summarize(f"format-aware, {args.workers} workers",
+                                 *clean_folder(corpus, out, args.workers, verbose=False), leftover_junk(out)))
+
+        for r in results:
+            print(f"   {r['name']:<28} {r['mb_per_s']:7.1f} MB/s {r['files_per_s']:8.1f} files/s "
+                  f"junk tokens left: {r['junk_tokens']}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Results saved to {args.output}")
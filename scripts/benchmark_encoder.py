@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+from benchmark_backends import percentile_ms
+from synthetic_corpus import generate_files
+from clean_subtitles import clean_subtitle
+from embedding_engine import MODEL_NAME
+from onnx_encoder import ONNX_DIR, OnnxEncoder, export_onnx, model_path, parity_check
+
+# ✅ Benchmark parameters
+NUM_CHUNKS = 2000        # ingestion-like texts for the throughput run
+CHUNK_WORDS = (20, 200)  # chunk lengths vary, as they do for real subtitle chunks
+NUM_QUERIES = 200        # single-query latency run
+BATCH_SIZE = 64
+THREAD_COUNTS = [1, 2, 4, 8]
+RESULTS_FILE = "benchmark_encoder.json"
+
+
+def make_texts(n, seed=0):
+    """Subtitle chunks of mixed lengths plus short query-like strings."""
+    rng = np.random.default_rng(seed)
+    words = " ".join(clean_subtitle(body, name) for name, body in generate_files(40, 300, seed)).split()
+    chunks = []
+    while len(chunks) < n:
+        start = int(rng.integers(0, len(words) - CHUNK_WORDS[1]))
+        chunks.append(" ".join(words[start:start + int(rng.integers(*CHUNK_WORDS))]))
+    queries = [" ".join(words[i:i + int(rng.integers(3, 12))]) for i in rng.integers(0, len(words) - 12, n)]
+    return chunks, queries
+
+
+def padding_waste(tokenizer, texts, batch_size, max_length):
+    """Fraction of computed positions that are padding, in input order vs sorted by length."""
+    lengths = [len(ids) for ids in tokenizer(texts, truncation=True, max_length=max_length)["input_ids"]]
+
+    def waste(order):
+        padded = sum(len(order[i:i + batch_size]) * max(order[i:i + batch_size])
+                     for i in range(0, len(order), batch_size))
+        return 1 - sum(lengths) / padded
+
+    return {"unsorted": waste(lengths), "length_sorted": waste(sorted(lengths))}
+
+
+def measure(encoder, chunks, queries, batch_size):
+    encoder.encode(queries[:8], batch_size=batch_size)   # warm-up (graph init, allocations)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        encoder.encode(query)
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    encoder.encode(chunks, batch_size=batch_size)
+    seconds = time.perf_counter() - start
+    return {"query_p50_ms": percentile_ms(latencies, 50), "query_p95_ms": percentile_ms(latencies, 95),
+            "chunks_per_sec": len(chunks) / seconds}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SentenceTransformer.encode vs ONNX Runtime (fp32 / int8).")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--onnx-dir", default=ONNX_DIR, help="Exported model directory (exported here if missing)")
+    parser.add_argument("--chunks", type=int, default=NUM_CHUNKS)
+    parser.add_argument("--queries", type=int, default=NUM_QUERIES)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--threads", type=int, nargs="+", default=THREAD_COUNTS, help="Intra-op thread counts to try")
+    parser.add_argument("--output", default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer(args.model, device="cpu")
+    if not os.path.exists(model_path(args.onnx_dir, True)):
+        export_onnx(args.model, args.onnx_dir, quantize=True, model=reference)
+    chunks, queries = make_texts(args.chunks)
+    queries = queries[:args.queries]
+    threads = [t for t in args.threads if t <= (os.cpu_count() or 1)] or [1]
+
+    report = {"cpus": os.cpu_count(), "chunks": len(chunks), "queries": len(queries), "batch_size": args.batch_size,
+              "padding_waste": padding_waste(reference.tokenizer, chunks, args.batch_size, reference.max_seq_length),
+              "runs": []}
+    for n in threads:
+        torch.set_num_threads(n)
+        run = {"encoder": "torch", "threads": n, **measure(reference, chunks, queries, args.batch_size)}
+        report["runs"].append(run)
+        for quantized in (False, True):
+            encoder = OnnxEncoder(args.onnx_dir, quantized=quantized, threads=n)
+            name = "onnx-int8" if quantized else "onnx"
+            report["runs"].append({"encoder": name, "threads": n, **measure(encoder, chunks, queries, args.batch_size)})
+            if n == threads[0]:
+                report[f"{name}_parity"] = parity_check(reference, encoder, chunks[:500], args.batch_size)
+
+    waste = report["padding_waste"]
+    print(f"🧮 Padding waste at batch {args.batch_size}: {waste['unsorted']:.1%} in input order, "
+          f"{waste['length_sorted']:.1%} length-sorted")
+    for name in ("onnx", "onnx-int8"):
+        parity = report[f"{name}_parity"]
+        print(f"🎯 {name} parity: min cosine {parity['min_cosine']:.5f} | mean {parity['mean_cosine']:.5f}")
+    for run in report["runs"]:
+        print(f"⚡ {run['encoder']:>9} x{run['threads']} threads: query p50 {run['query_p50_ms']:.2f}ms | "
+              f"p95 {run['query_p95_ms']:.2f}ms | {run['chunks_per_sec']:.1f} chunks/sec")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results saved to {args.output}")
@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+from lexical_index import LexicalIndex, hybrid_query, tokenize, phrase_matcher
+from embedding_store import EmbeddingStore, STORE_DIR
+from search_backends import NumpyBackend
+
+# ✅ Benchmark parameters
+NUM_QUERIES = 300
+TOP_K = 5
+QUOTE_WORDS = (4, 9)      # quote length range in words
+RESULTS_FILE = "benchmark_lexical.json"
+
+
+def sample_quotes(index, n, seed=0):
+    """Pick random chunks and cut a short verbatim quote out of each: (chunk_id, quote)."""
+    rng = random.Random(seed)
+    rows = index.conn.execute("SELECT chunk_id, text FROM docs ORDER BY RANDOM() LIMIT ?", (n * 2,)).fetchall()
+    quotes = []
+    for chunk_id, text in rows:
+        words = text.split()
+        size = rng.randint(*QUOTE_WORDS)
+        if len(words) < size:
+            continue
+        start = rng.randint(0, len(words) - size)
+        quotes.append((chunk_id, " ".join(words[start:start + size])))
+        if len(quotes) == n:
+            break
+    return quotes
+
+
+def build_synthetic(workdir, n_files, encoder):
+    """Synthetic subtitles -> cleaned -> chunked -> store + lexical index, with the stub encoder."""
+    from synthetic_corpus import generate_files
+    from clean_subtitles import clean_subtitle
+    from chunk_subtitles import chunk_text
+
+    chunks = [c for name, text in generate_files(n_files, 300) for c in chunk_text(clean_subtitle(text, name))]
+    ids = [f"chunk_{i}" for i in range(len(chunks))]
+    store_dir = os.path.join(workdir, "store")
+    index = LexicalIndex(os.path.join(workdir, "lexical.sqlite3"))
+    store = EmbeddingStore(store_dir)
+    for i in range(0, len(chunks), 1000):
+        store.append(ids[i:i + 1000], chunks[i:i + 1000], encoder.encode(chunks[i:i + 1000]))
+        index.append(ids[i:i + 1000], chunks[i:i + 1000])
+    return store_dir, index
+
+
+def run(index, backend, encoder, quotes, top_k=TOP_K):
+    modes = {
+        "phrase": lambda q, vec: index.query([q], top_k, phrase=True),
+        "bm25": lambda q, vec: index.query([q], top_k),
+        "vector": lambda q, vec: backend.query([vec], top_k),
+        "hybrid": lambda q, vec: hybrid_query(index, backend, q, vec, top_k),
+    }
+    query_vectors = encoder.encode([q for _, q in quotes])
+    report = {}
+    for mode, search in modes.items():
+        latencies, hits, matches = [], 0, 0
+        for (chunk_id, quote), vec in zip(quotes, query_vectors):
+            vec = vec.tolist()
+            start = time.perf_counter()
+            result = search(quote, vec)
+            latencies.append(time.perf_counter() - start)
+            hits += chunk_id in result["ids"][0]
+            contains_quote = phrase_matcher(tokenize(quote))
+            matches += any(contains_quote(doc) for doc in result["documents"][0])
+        ms = np.asarray(latencies) * 1000
+        report[mode] = {
+            "hit_rate": hits / len(quotes),           # source chunk in the top_k
+            "quote_match_rate": matches / len(quotes),  # some top_k chunk contains the quote verbatim
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)),
+        }
+        print(f"🎯 {mode:>6}: hit@{top_k} {report[mode]['hit_rate']:.1%} | quote found {report[mode]['quote_match_rate']:.1%}"
+              f" | p50 {report[mode]['p50_ms']:.2f}ms | p95 {report[mode]['p95_ms']:.2f}ms")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quote-style query benchmark: phrase vs BM25 vs vector vs hybrid.")
+    parser.add_argument("--index", default=None, help="Existing lexical index (default: build a synthetic one)")
+    parser.add_argument("--store", default=STORE_DIR, help="EmbeddingStore with the same chunks (used with --index)")
+    parser.add_argument("--synthetic-files", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=NUM_QUERIES)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--output", default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_lexical_")
+    try:
+        if args.index:
+            from embedding_engine import EmbeddingEngine
+            encoder = EmbeddingEngine().model
+            index, store_dir = LexicalIndex(args.index), args.store
+        else:
+            # The stub encoder is itself bag-of-words, so synthetic "vector" numbers are optimistic
+            from stub_encoder import StubEncoder
+            encoder = StubEncoder()
+            store_dir, index = build_synthetic(workdir, args.synthetic_files, encoder)
+        backend = NumpyBackend(store_dir)
+        quotes = sample_quotes(index, args.queries)
+        print(f"📋 {index.count()} chunks indexed, {len(quotes)} quote queries")
+        report = {"chunks": index.count(), "queries": len(quotes), "top_k": args.top_k,
+                  "modes": run(index, backend, encoder, quotes, args.top_k)}
+        index.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results saved to {args.output}")
@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+from embedding_store import EmbeddingStore, EMBEDDING_DIM
+from search_backends import NumpyBackend, QuantizedBackend, ChromaBackend, RERANK_FACTOR, QUANT_FILE
+from benchmark_backends import synthetic_embeddings, time_queries, percentile_ms, INSERT_BATCH
+
+# ✅ Benchmark parameters
+CORPUS_SIZES = [50000, 200000]
+NUM_QUERIES = 200
+TOP_K = 10
+RESULTS_FILE = "benchmark_quantized.json"
+
+
+def overlap(results, reference, top_k):
+    return float(np.mean([len(set(a) & set(b)) / top_k for a, b in zip(results, reference)]))
+
+
+def run_size(n, workdir, num_queries=NUM_QUERIES, top_k=TOP_K, with_chroma=True):
+    vectors = synthetic_embeddings(n, EMBEDDING_DIM, seed=n)
+    ids = [f"chunk_{i}" for i in range(n)]
+    texts = [f"synthetic chunk {i}" for i in range(n)]
+    queries = synthetic_embeddings(num_queries, EMBEDDING_DIM, seed=n + 1)
+
+    store_dir = os.path.join(workdir, f"store_{n}")
+    store = EmbeddingStore(store_dir)
+    for i in range(0, n, INSERT_BATCH):
+        store.append(ids[i:i + INSERT_BATCH], texts[i:i + INSERT_BATCH], vectors[i:i + INSERT_BATCH])
+
+    exact = NumpyBackend(store_dir, space="cosine")   # same scale as the cosine "bench" collection
+    _, exact_ids = time_queries(exact, queries, top_k)
+    backends = {"float32": exact}
+
+    chroma_ids = None
+    if with_chroma:
+        try:
+            import chromadb
+        except ImportError:
+            chromadb = None
+        if chromadb is not None:
+            collection = chromadb.PersistentClient(path=os.path.join(workdir, f"chroma_{n}")).get_or_create_collection(
+                "bench", metadata={"hnsw:space": "cosine"})
+            for i in range(0, n, INSERT_BATCH):
+                collection.add(ids=ids[i:i + INSERT_BATCH], embeddings=vectors[i:i + INSERT_BATCH].tolist(),
+                               documents=texts[i:i + INSERT_BATCH])
+            backends["chroma"] = ChromaBackend(collection)
+
+    build = {}
+    for mode in ("int8", "binary"):
+        start = time.perf_counter()
+        backends[mode] = QuantizedBackend(store_dir, mode)
+        build[mode] = time.perf_counter() - start
+        # Same codes with no re-ranking: shows what the full-precision pass buys
+        backends[f"{mode}_no_rerank"] = QuantizedBackend(store_dir, mode, rerank_factor=1)
+
+    results = {"corpus_size": n, "top_k": top_k}
+    for name, backend in backends.items():
+        latencies, found = time_queries(backend, queries, top_k)
+        if name == "chroma":
+            chroma_ids = found
+        if isinstance(backend, QuantizedBackend):
+            ram = backend.index_bytes
+            disk = os.path.getsize(os.path.join(store_dir, QUANT_FILE.format(mode=backend.mode)))
+        elif name == "float32":
+            ram = vectors.nbytes + backend.inv_norms.nbytes    # what an in-RAM float32 matrix costs
+            disk = vectors.nbytes
+        else:
+            ram = disk = None
+        results[name] = {
+            "index_ram_mb": ram / 1e6 if ram is not None else None,
+            "index_disk_mb": disk / 1e6 if disk is not None else None,
+            "p50_ms": percentile_ms(latencies, 50), "p95_ms": percentile_ms(latencies, 95),
+            f"recall@{top_k}": overlap(found, exact_ids, top_k),
+        }
+        if name in build:
+            results[name]["build_s"] = build[name]
+    if chroma_ids is not None:
+        for name in backends:
+            if name != "chroma":
+                _, found = time_queries(backends[name], queries[:50], top_k)
+                results[name][f"overlap_with_chroma@{top_k}"] = overlap(found, chroma_ids[:50], top_k)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory, latency and recall of int8/binary quantized search.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=CORPUS_SIZES)
+    parser.add_argument("--queries", type=int, default=NUM_QUERIES)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--no-chroma", action="store_true")
+    parser.add_argument("--output", default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_quantized_")
+    all_results = []
+    try:
+        for n in args.sizes:
+            print(f"🚀 Benchmarking {n} vectors (re-rank factors {RERANK_FACTOR})...")
+            res = run_size(n, workdir, args.queries, args.top_k, not args.no_chroma)
+            all_results.append(res)
+            for name, r in res.items():
+                if not isinstance(r, dict):
+                    continue
+                ram = f"{r['index_ram_mb']:.1f}MB RAM" if r["index_ram_mb"] is not None else "RAM n/a"
+                print(f"   {name:>17}: {ram} | p50 {r['p50_ms']:.2f}ms | p95 {r['p95_ms']:.2f}ms | "
+                      f"recall@{args.top_k} {r[f'recall@{args.top_k}']:.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(all_results, f, indent=2)
+    print(f"\n✅ Results saved to {args.output}")
@@ -0,0 +1,93 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+from embedding_store import EMBEDDING_DIM
+from benchmark_backends import synthetic_embeddings, percentile_ms
+from sharding import ShardedCollection
+
+# ✅ Benchmark parameters
+SHARD_COUNTS = [1, 2, 4, 8]
+CORPUS_SIZE = 100000
+NUM_QUERIES = 200
+QUERY_BATCH = 32         # queries per scatter-gather in the throughput run
+TOP_K = 5
+INSERT_BATCH = 5000
+RESULTS_FILE = "benchmark_sharding.json"
+
+
+def exact_top_k(vectors, queries, top_k):
+    """Ground truth: brute-force cosine top-k (vectors are unit-norm)."""
+    scores = queries @ vectors.T
+    return [set(np.argpartition(-row, top_k)[:top_k].tolist()) for row in scores]
+
+
+def run_shards(num_shards, vectors, queries, truth, workdir, top_k=TOP_K, query_batch=QUERY_BATCH):
+    ids = [str(i) for i in range(len(vectors))]
+    documents = [f"chunk {i}" for i in range(len(vectors))]
+    with ShardedCollection(f"{workdir}/shards_{num_shards}", num_shards=num_shards) as collection:
+        start = time.perf_counter()
+        for i in range(0, len(vectors), INSERT_BATCH * num_shards):
+            # Each call carries INSERT_BATCH rows per shard, inserted by all shard workers at once
+            j = i + INSERT_BATCH * num_shards
+            collection.upsert(ids=ids[i:j], embeddings=vectors[i:j], documents=documents[i:j])
+        ingest_s = time.perf_counter() - start
+
+        latencies, hits = [], 0
+        for q, expected in zip(queries, truth):
+            start = time.perf_counter()
+            result = collection.query(q[None, :], n_results=top_k)
+            latencies.append(time.perf_counter() - start)
+            hits += len(expected & {int(i) for i in result["ids"][0]})
+
+        start = time.perf_counter()
+        for i in range(0, len(queries), query_batch):
+            collection.query(queries[i:i + query_batch], n_results=top_k)
+        batch_s = time.perf_counter() - start
+
+    return {
+        "shards": num_shards,
+        "cpus": os.cpu_count(),     # shards only scale while there are cores to run their workers
+        "ingest_vectors_per_sec": len(vectors) / ingest_s,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "single_query_qps": len(queries) / sum(latencies),
+        "batched_qps": len(queries) / batch_s,
+        f"recall@{top_k}": hits / (len(queries) * top_k),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest and query throughput of a sharded collection vs shard count.")
+    parser.add_argument("--shards", type=int, nargs="+", default=SHARD_COUNTS, help="Shard counts to test")
+    parser.add_argument("--size", type=int, default=CORPUS_SIZE, help="Vectors in the corpus")
+    parser.add_argument("--queries", type=int, default=NUM_QUERIES)
+    parser.add_argument("--query-batch", type=int, default=QUERY_BATCH)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--output", default=RESULTS_FILE, help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    vectors = synthetic_embeddings(args.size, EMBEDDING_DIM, seed=0)
+    queries = synthetic_embeddings(args.queries, EMBEDDING_DIM, seed=1)
+    truth = exact_top_k(vectors, queries, args.top_k)
+
+    workdir = tempfile.mkdtemp(prefix="bench_sharding_")
+    all_results = []
+    try:
+        for num_shards in args.shards:
+            print(f"🚀 Benchmarking {num_shards} shard(s) over {args.size} vectors...")
+            r = run_shards(num_shards, vectors, queries, truth, workdir, args.top_k, args.query_batch)
+            all_results.append(r)
+            print(f"   ingest {r['ingest_vectors_per_sec']:.0f} vectors/sec | p50 {r['p50_ms']:.2f}ms | "
+                  f"p95 {r['p95_ms']:.2f}ms | {r['single_query_qps']:.0f} qps single, {r['batched_qps']:.0f} qps "
+                  f"batched | recall@{args.top_k} {r[f'recall@{args.top_k}']:.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(all_results, f, indent=2)
+    print(f"\n✅ Results saved to {args.output}")
@@ -0,0 +1,203 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+from synthetic_corpus import write_zipfiles_db
+from stub_encoder import StubEncoder
+from stream_ingest import iter_zip_rows, iter_subtitle_files
+from clean_subtitles import clean_subtitle
+from chunk_subtitles import chunk_text
+from token_chunker import load_chunker
+from embedding_engine import EmbeddingEngine
+from embedding_store import EmbeddingStore
+from search_backends import NumpyBackend, ChromaBackend
+
+# ✅ Benchmark scale (override on the command line)
+NUM_FILES = 200
+CUES_PER_FILE = 500
+NUM_QUERIES = 200
+TOP_K = 5
+INSERT_BATCH = 1000
+RESULTS_FILE = "benchmark_results.json"
+
+
+class Stage:
+    """Times one pipeline stage and turns item/byte counts into rates."""
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.items = 0
+        self.bytes = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds += time.perf_counter() - self._start
+
+    def result(self, unit):
+        out = {"seconds": self.seconds, unit: self.items, f"{unit}_per_s": self.items / max(self.seconds, 1e-9)}
+        if self.bytes:
+            out["mb"] = self.bytes / 1e6
+            out["mb_per_s"] = self.bytes / 1e6 / max(self.seconds, 1e-9)
+        return out
+
+
+def latency_summary(samples):
+    ms = np.asarray(samples) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p90_ms": float(np.percentile(ms, 90)),
+            "p99_ms": float(np.percentile(ms, 99)), "mean_ms": float(ms.mean())}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run_suite(workdir, n_files=NUM_FILES, cues_per_file=CUES_PER_FILE, num_queries=NUM_QUERIES, top_k=TOP_K,
+              chunker="words", with_chroma=True):
+    encoder = StubEncoder()
+    db_path = os.path.join(workdir, "subtitles.db")
+    corpus_bytes = write_zipfiles_db(db_path, n_files, cues_per_file)
+    results = {"corpus": {"files": n_files, "cues_per_file": cues_per_file, "mb": corpus_bytes / 1e6,
+                          "chunker": chunker}}
+
+    # Stage 1: extraction (page rows + unzip in memory)
+    extract = Stage("extract")
+    with extract:
+        files = []
+        for zip_name, file_name, text in iter_subtitle_files(iter_zip_rows(db_path)):
+            files.append((zip_name, file_name, text))
+            extract.items += 1
+            extract.bytes += len(text.encode("utf-8"))
+    results["extract"] = extract.result("files")
+
+    # Stage 2: cleaning
+    clean = Stage("clean")
+    with clean:
+        cleaned = []
+        for _, file_name, text in files:
+            cleaned.append(clean_subtitle(text, file_name))
+            clean.items += 1
+            clean.bytes += len(text.encode("utf-8"))
+    results["clean"] = clean.result("files")
+
+    # Stage 3: chunking
+    chunk = Stage("chunk")
+    make_chunks = load_chunker(encoder).chunk_text if chunker == "tokens" else chunk_text
+    with chunk:
+        chunks = [c for text in cleaned for c in make_chunks(text)]
+        chunk.items = len(chunks)
+    results["chunk"] = chunk.result("chunks")
+
+    # Stage 4: embedding (stub encoder, so this measures batching overhead, not model compute)
+    embed = Stage("embed")
+    engine = EmbeddingEngine(model=encoder)
+    with embed:
+        vectors = engine.encode(chunks)
+        embed.items = len(chunks)
+    results["embed"] = embed.result("embeddings")
+
+    ids = [f"chunk_{i}" for i in range(len(chunks))]
+
+    # Stage 5: inserts into the binary store (and Chroma, if installed)
+    insert = Stage("insert_store")
+    store_dir = os.path.join(workdir, "store")
+    store = EmbeddingStore(store_dir)
+    with insert:
+        for i in range(0, len(chunks), INSERT_BATCH):
+            store.append(ids[i:i + INSERT_BATCH], chunks[i:i + INSERT_BATCH], vectors[i:i + INSERT_BATCH])
+        insert.items = len(chunks)
+    results["insert_store"] = insert.result("rows")
+
+    backends = {"numpy": NumpyBackend(store_dir, space="cosine")}
+    if with_chroma:
+        try:
+            import chromadb
+        except ImportError:
+            chromadb = None
+        if chromadb is not None:
+            collection = chromadb.PersistentClient(path=os.path.join(workdir, "chroma")).get_or_create_collection(
+                "bench", metadata={"hnsw:space": "cosine"})
+            insert = Stage("insert_chroma")
+            with insert:
+                for i in range(0, len(chunks), INSERT_BATCH):
+                    collection.add(ids=ids[i:i + INSERT_BATCH], documents=chunks[i:i + INSERT_BATCH],
+                                   embeddings=vectors[i:i + INSERT_BATCH].tolist())
+                insert.items = len(chunks)
+            results["insert_chroma"] = insert.result("rows")
+            backends["chroma"] = ChromaBackend(collection)
+
+    # Stage 6: query latency (single queries, as the app issues them)
+    rng = np.random.default_rng(0)
+    query_texts = [chunks[i][:120] for i in rng.integers(0, len(chunks), num_queries)]
+    query_vectors = encoder.encode(query_texts).tolist()
+    for name, backend in backends.items():
+        latencies = []
+        for q in query_vectors:
+            start = time.perf_counter()
+            backend.query([q], top_k=top_k)
+            latencies.append(time.perf_counter() - start)
+        results[f"query_{name}"] = latency_summary(latencies)
+    return results
+
+
+def compare(current, previous):
+    """Print per-metric change against an earlier results file."""
+    print("\n📈 Change vs previous run:")
+    for stage, metrics in current["results"].items():
+        old = previous.get("results", {}).get(stage, {})
+        for key, value in metrics.items():
+            if isinstance(value, (int, float)) and isinstance(old.get(key), (int, float)) and old[key]:
+                print(f"   {stage}.{key}: {old[key]:.3f} -> {value:.3f} ({(value - old[key]) / old[key]:+.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end ingestion + search benchmark on a synthetic corpus.")
+    parser.add_argument("--files", type=int, default=NUM_FILES)
+    parser.add_argument("--cues", type=int, default=CUES_PER_FILE)
+    parser.add_argument("--queries", type=int, default=NUM_QUERIES)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--chunker", choices=["words", "tokens"], default="words")
+    parser.add_argument("--no-chroma", action="store_true", help="Skip the Chroma insert/query stages")
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        results = run_suite(workdir, args.files, args.cues, args.queries, args.top_k, args.chunker,
+                            not args.no_chroma)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    for stage, metrics in results.items():
+        print(f"⏱️ {stage}: " + ", ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                                         for k, v in metrics.items()))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
@@ -0,0 +1,177 @@
+import re
+import html
+import json
+import time
+import random
+import argparse
+
+from synthetic_corpus import generate_files
+from subtitle_parsers import PARSERS, detect_format, iter_plain_cues
+from text_cleanup import clean_cue_text, clean_cue_texts, cleanup_document, cleanup_documents
+
+# ✅ Benchmark parameters
+NUM_FILES = 200
+CUES_PER_FILE = 400
+NUM_DOCUMENTS = 5000
+REPEATS = 5
+RESULTS_FILE = "benchmark_text_cleanup.json"
+
+BOILERPLATE = ["Downloaded from www.OpenSubtitles.org", "Uploader: somebody", "FPS: 23.976",
+               "Movie information: see IMDb link", "Support us and become VIP member http://osdb.link/vip",
+               "<i>we set the standards</i>"]
+
+
+LINE_BREAKS = ["\n", "\r\n", "\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029"]
+
+
+# The three copies this module replaced, kept verbatim as baselines
+def legacy_cleanup_document(doc):
+    """streamlit_app.cleanup_document before consolidation."""
+    if not doc:
+        return ""
+    doc_no_urls = re.sub(r'http\S+', '', doc)
+    lines = doc_no_urls.splitlines()
+    skip_phrases = [
+        "movie information", "imdb link", "uploader", "download",
+        "filename", "nfo created", "md5", "fps", "language",
+        "format", "subtitles", "www.opensubtitles.org",
+        "we set the standards", "the benchmark", "score", "org"
+    ]
+    cleaned_lines = []
+    for line in lines:
+        lower_line = line.lower()
+        if any(skip in lower_line for skip in skip_phrases):
+            continue
+        line = re.sub(r"\s+", " ", line).strip()
+        if line:
+            cleaned_lines.append(line)
+    cleaned_doc = " ".join(cleaned_lines).strip()
+    if not cleaned_doc:
+        cleaned_doc = doc_no_urls.strip()
+    max_len = 300
+    if len(cleaned_doc) > max_len:
+        cleaned_doc = cleaned_doc[:max_len] + "..."
+    return cleaned_doc
+
+
+def legacy_cleanup_subtitle_text(text):
+    """query_retreival.cleanup_subtitle_text before consolidation."""
+    if not text:
+        return ""
+    text = re.sub(r'http\S+', '', text)
+    text = re.sub(r'www\.opensubtitles\.org', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\.org', '', text, flags=re.IGNORECASE)
+    skip_phrases = ["download", "score", "uploader", "subtitles", "the benchmark", "we set the standards"]
+    cleaned_lines = []
+    for line in text.splitlines():
+        lower_line = line.lower()
+        if any(skip in lower_line for skip in skip_phrases):
+            continue
+        line = re.sub(r"\s+", " ", line).strip()
+        if line:
+            cleaned_lines.append(line)
+    cleaned_text = " ".join(cleaned_lines)
+    if len(cleaned_text) > 300:
+        cleaned_text = cleaned_text[:300] + "..."
+    return cleaned_text
+
+
+LEGACY_HTML_TAG = re.compile(r"<[^>]*>")
+LEGACY_DISALLOWED_CHARS = re.compile(r"[^a-zA-Z0-9\s.,!?']")
+LEGACY_WHITESPACE = re.compile(r"\s+")
+
+
+def legacy_clean_cue_text(text):
+    """subtitle_parsers.clean_cue_text (the per-cue step of clean_subtitle) before consolidation."""
+    if "<" in text:
+        text = LEGACY_HTML_TAG.sub(" ", text)
+    if "&" in text:
+        text = html.unescape(text)
+    text = LEGACY_DISALLOWED_CHARS.sub(" ", text)
+    return LEGACY_WHITESPACE.sub(" ", text).strip()
+
+
+def make_documents(n, seed=0):
+    """Retrieved-chunk-like documents: dialogue lines with some boilerplate, URLs and odd spacing."""
+    rng = random.Random(seed)
+    words = [w for _, text in generate_files(5, 50, seed) for w in text.split() if w.isalpha()]
+    docs = []
+    for _ in range(n):
+        lines = []
+        for _ in range(rng.randint(1, 40)):
+            if rng.random() < 0.08:
+                lines.append(rng.choice(BOILERPLATE))
+            else:
+                lines.append("  ".join(rng.choices(words, k=rng.randint(3, 14))))
+        # Mostly "\n", plus the other breaks str.splitlines() honours, so the parity check covers them
+        breaks = rng.choices(LINE_BREAKS, weights=[90] + [1] * (len(LINE_BREAKS) - 1), k=len(lines))
+        docs.append("".join(line + brk for line, brk in zip(lines, breaks)))
+    return docs
+
+
+def best_of(fn, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def run(num_files=NUM_FILES, cues_per_file=CUES_PER_FILE, num_documents=NUM_DOCUMENTS, repeats=REPEATS):
+    report = {}
+
+    # Cue cleaning (the per-cue step of clean_subtitle at ingestion)
+    files = [[text for _, _, text in PARSERS.get(detect_format(name), iter_plain_cues)(body.splitlines())]
+             for name, body in generate_files(num_files, cues_per_file)]
+    n_cues = sum(len(cues) for cues in files)
+    legacy_s, expected = best_of(lambda: [[legacy_clean_cue_text(t) for t in cues] for cues in files], repeats)
+    single_s, single = best_of(lambda: [[clean_cue_text(t) for t in cues] for cues in files], repeats)
+    batch_s, batch = best_of(lambda: [clean_cue_texts(cues) for cues in files], repeats)
+    report["cue_cleaning"] = {
+        "cues": n_cues,
+        "legacy_us_per_cue": legacy_s / n_cues * 1e6,
+        "compiled_us_per_cue": single_s / n_cues * 1e6,
+        "batch_us_per_cue": batch_s / n_cues * 1e6,
+        "identical_output": single == expected and batch == expected,
+    }
+
+    # Display cleanup of retrieved documents
+    docs = make_documents(num_documents)
+    legacy_s, expected = best_of(lambda: [legacy_cleanup_document(d) for d in docs], repeats)
+    query_s, _ = best_of(lambda: [legacy_cleanup_subtitle_text(d) for d in docs], repeats)
+    single_s, single = best_of(lambda: [cleanup_document(d) for d in docs], repeats)
+    batch_s, batch = best_of(lambda: cleanup_documents(docs), repeats)
+    report["display_cleanup"] = {
+        "documents": len(docs),
+        "legacy_streamlit_us_per_doc": legacy_s / len(docs) * 1e6,
+        "legacy_query_retreival_us_per_doc": query_s / len(docs) * 1e6,
+        "compiled_us_per_doc": single_s / len(docs) * 1e6,
+        "batch_us_per_doc": batch_s / len(docs) * 1e6,
+        "identical_output": single == expected and batch == expected,
+    }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks: consolidated text cleanup vs the old copies.")
+    parser.add_argument("--files", type=int, default=NUM_FILES)
+    parser.add_argument("--cues", type=int, default=CUES_PER_FILE)
+    parser.add_argument("--documents", type=int, default=NUM_DOCUMENTS)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--output", default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    report = run(args.files, args.cues, args.documents, args.repeats)
+    cues, docs = report["cue_cleaning"], report["display_cleanup"]
+    print(f"🧹 Cue cleaning ({cues['cues']} cues): legacy {cues['legacy_us_per_cue']:.2f}us | "
+          f"compiled {cues['compiled_us_per_cue']:.2f}us | batch {cues['batch_us_per_cue']:.2f}us per cue"
+          f" | identical output: {cues['identical_output']}")
+    print(f"🧹 Display cleanup ({docs['documents']} docs): legacy {docs['legacy_streamlit_us_per_doc']:.1f}us "
+          f"(query_retreival copy {docs['legacy_query_retreival_us_per_doc']:.1f}us) | "
+          f"compiled {docs['compiled_us_per_doc']:.1f}us | batch {docs['batch_us_per_doc']:.1f}us per doc"
+          f" | identical output: {docs['identical_output']}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results saved to {args.output}")
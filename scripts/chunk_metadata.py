@@ -0,0 +1,114 @@
+import re
+
+# ✅ Release names in the OpenSubtitles dump look like "the.matrix.(1999).eng.1cd"
+YEAR_PATTERN = re.compile(r"[\s._-]*\(?((?:19|20)\d{2})\)?(?=$|[\s._-])")
+RELEASE_SUFFIX = re.compile(r"([\s._-]+(eng|english|\d+cd|cd\d+))+$", re.IGNORECASE)
+SUBTITLE_EXTENSION = re.compile(r"(_chunks)?\.(srt|vtt|ass|nfo|txt)$", re.IGNORECASE)
+WHERE_OPERATORS = {
+    "$eq": lambda a, b: a == b, "$ne": lambda a, b: a != b,
+    "$gt": lambda a, b: a is not None and a > b, "$gte": lambda a, b: a is not None and a >= b,
+    "$lt": lambda a, b: a is not None and a < b, "$lte": lambda a, b: a is not None and a <= b,
+    "$in": lambda a, b: a in b, "$nin": lambda a, b: a not in b,
+}
+
+
+def parse_release_name(name):
+    """
+    Best-effort (title, year) from a release or file name:
+    "the.matrix.(1999).eng.1cd" -> ("The Matrix", 1999). Year is None if absent.
+    """
+    name = SUBTITLE_EXTENSION.sub("", name.rsplit("/", 1)[-1])
+    # The last year-like token wins ("blade.runner.2049.(2017)" is from 2017)
+    match = ([m for m in YEAR_PATTERN.finditer(name) if m.start() > 0] or [None])[-1]
+    if match:
+        title, year = name[:match.start()], int(match.group(1))
+    else:
+        title, year = RELEASE_SUFFIX.sub("", name), None
+    title = re.sub(r"[._]+", " ", title).strip(" -")
+    return (title.title() if title.islower() else title), year
+
+
+def chunk_metadata(source, chunk_index, **offsets):
+    """
+    Structured metadata stored with every chunk. `source` is the manifest key
+    ("zip_name/file_name" for streamed ingestion, the chunk file name otherwise);
+    `offsets` may carry char_start/char_end, start_time/end_time (seconds) and
+    the packed cue index and snippet-window vectors (see cue_index.py).
+    Keys whose value is unknown are left out (Chroma rejects None values).
+    """
+    zip_name, _, file_name = source.rpartition("/")
+    title, year = parse_release_name(zip_name or file_name)
+    metadata = {
+        "source": source,
+        "zip_name": zip_name or None,
+        "file_name": file_name,
+        "title": title,
+        "title_key": title.lower(),
+        "year": year,
+        "chunk_index": chunk_index,
+        **offsets,
+    }
+    return {key: value for key, value in metadata.items() if value is not None}
+
+
+def match_where(metadata, where):
+    """
+    Evaluate a Chroma-style `where` filter against one metadata dict, e.g.
+    {"title_key": "the matrix"}, {"year": {"$gte": 1990}}, {"$and": [...]}, {"$or": [...]}.
+    """
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(match_where(metadata, c) for c in condition):
+                return False
+        elif key == "$or":
+            if not any(match_where(metadata, c) for c in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            if not all(WHERE_OPERATORS[op](value, operand) for op, operand in condition.items()):
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def validate_where(where):
+    """
+    Raise ValueError if `where` is not a filter `match_where` (and Chroma) understands:
+    an object of field conditions, "$and"/"$or" lists of filters and known operators.
+    """
+    if not isinstance(where, dict):
+        raise ValueError("where must be an object")
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            if not isinstance(condition, list) or not condition:
+                raise ValueError(f"{key} needs a non-empty list of filters")
+            for clause in condition:
+                validate_where(clause)
+        elif key.startswith("$"):
+            raise ValueError(f"Unknown where operator: {key}")
+        elif isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op not in WHERE_OPERATORS:
+                    raise ValueError(f"Unknown where operator: {op}")
+                if op in ("$in", "$nin") and not isinstance(operand, list):
+                    raise ValueError(f"{op} needs a list")
+
+
+def build_where(title=None, year=None, file_name=None):
+    """Combine optional UI/CLI filters into one Chroma `where` clause (None if no filter)."""
+    clauses = []
+    if title:
+        clauses.append({"title_key": title.strip().lower()})
+    if year:
+        clauses.append({"year": int(year)})
+    if file_name:
+        clauses.append({"file_name": file_name})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
@@ -1,14 +1,20 @@
 import os
+import re
 import math
 
 # Define paths
 INPUT_FOLDER = "cleaned_subtitles"  # Folder with cleaned subtitles
 OUTPUT_FOLDER = "chunked_subtitles"  # Folder where chunked files will be saved
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+DATA_FORMAT = "files"  # "parquet": read cleaned_subtitles.parquet, write chunked_subtitles.parquet (needs pyarrow)
+INPUT_DATASET = "cleaned_subtitles.parquet"
+OUTPUT_DATASET = "chunked_subtitles.parquet"
 
 # Chunking parameters
-CHUNK_SIZE = 500      # number of tokens per chunk
-OVERLAP_SIZE = 50     # number of tokens to overlap between chunks
+CHUNKER = "tokens"    # "tokens": fill the embedding model's window exactly; "words": legacy whitespace chunks
+BOUNDARY = "sentence" # token chunker only: "sentence" keeps sentences whole, None cuts anywhere
+CHUNK_SIZE = 500      # number of tokens per chunk ("words" mode)
+OVERLAP_SIZE = 50     # number of tokens to overlap between chunks ("words" mode)
+DEDUP_INDEX = None     # e.g. "near_duplicates.sqlite3" to skip near-duplicate releases (MinHash index)
 
 def chunk_text(text, chunk_size=CHUNK_SIZE, overlap=OVERLAP_SIZE):
     """
@@ -32,26 +38,90 @@ def chunk_text(text, chunk_size=CHUNK_SIZE, overlap=OVERLAP_SIZE):
         start = end - overlap  # move back for overlap
     return chunks
 
+def chunk_text_spans(text, chunk_size=CHUNK_SIZE, overlap=OVERLAP_SIZE):
+    """
+    Same chunks as `chunk_text`, each returned as (chunk, char_start, char_end)
+    with the character range it covers in `text`.
+    """
+    words = [(m.group(), m.start(), m.end()) for m in re.finditer(r"\S+", text)]
+    spans = []
+    start = 0
+    while start < len(words):
+        window = words[start:start + chunk_size]
+        spans.append((" ".join(w for w, _, _ in window), window[0][1], window[-1][2]))
+        if start + chunk_size >= len(words):
+            break
+        start += chunk_size - overlap
+    return spans
+
+def iter_folder_documents(folder):
+    """Yield (filename, text) for every cleaned subtitle file in `folder`."""
+    for filename in os.listdir(folder):
+        if filename.endswith((".srt", ".vtt", ".ass", ".nfo")):
+            with open(os.path.join(folder, filename), "r", encoding="utf-8", errors="ignore") as f:
+                yield filename, f.read()
+
 # Process each cleaned subtitle file
-chunk_count = 0
-for filename in os.listdir(INPUT_FOLDER):
-    if filename.endswith((".srt", ".vtt", ".ass", ".nfo")):
-        file_path = os.path.join(INPUT_FOLDER, filename)
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            text = f.read()
-        
-        # Generate chunks for this file
-        chunks = chunk_text(text)
-        
-        # Save chunks to a new file; here we can save each file's chunks in a separate text file.
-        # Alternatively, you could save each chunk as a separate file.
-        output_file_path = os.path.join(OUTPUT_FOLDER, f"{os.path.splitext(filename)[0]}_chunks.txt")
-        with open(output_file_path, "w", encoding="utf-8") as out_f:
-            for i, chunk in enumerate(chunks):
-                out_f.write(f"--- CHUNK {i+1} ---\n")
-                out_f.write(chunk + "\n\n")
-                chunk_count += 1
-        
-        print(f"✅ Processed: {filename} -> {len(chunks)} chunks")
-
-print(f"\n🎯 Chunking complete! Total chunks created: {chunk_count}")
+if __name__ == "__main__":
+    if CHUNKER == "tokens":
+        from token_chunker import load_chunker
+        token_chunker = load_chunker(boundary=BOUNDARY)
+        make_chunks = token_chunker.chunk_text
+        print(f"✅ Token-aware chunking: {token_chunker.budget} word pieces per chunk, overlap {token_chunker.overlap}")
+    else:
+        make_chunks = chunk_text
+
+    dedup = None
+    if DEDUP_INDEX:
+        from near_duplicates import DuplicateIndex, format_report
+        dedup = DuplicateIndex(DEDUP_INDEX)
+
+    if DATA_FORMAT == "parquet":
+        # Documents stream in as record batches (only the two columns needed); chunks go to one dataset
+        from columnar_dataset import DatasetWriter, iter_batches
+        documents = ((source, text) for batch in iter_batches(INPUT_DATASET, ["source", "text"])
+                     for source, text in zip(*batch.to_pydict().values()))
+        writer = DatasetWriter(OUTPUT_DATASET, "chunks")
+    else:
+        os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+        documents = iter_folder_documents(INPUT_FOLDER)
+        writer = None
+
+    chunk_count = 0
+    for filename, text in documents:
+        if dedup is not None:
+            representative = dedup.check(filename, text)
+            if representative is not None:
+                print(f"🧬 Skipped near-duplicate: {filename} (alias of {representative})")
+                continue
+
+        # Generate chunks for this file (the dataset also records their character ranges when known)
+        if make_chunks is chunk_text and writer is not None:
+            spans = chunk_text_spans(text)
+        else:
+            spans = [(chunk, None, None) for chunk in make_chunks(text)]
+        if dedup is not None:
+            dedup.set_chunk_count(filename, len(spans))
+
+        if writer is not None:
+            for i, (chunk, start, end) in enumerate(spans):
+                writer.write(source=filename, chunk_index=i, char_start=start, char_end=end, text=chunk)
+            chunk_count += len(spans)
+        else:
+            # Save chunks to a new file; here we can save each file's chunks in a separate text file.
+            # Alternatively, you could save each chunk as a separate file.
+            output_file_path = os.path.join(OUTPUT_FOLDER, f"{os.path.splitext(filename)[0]}_chunks.txt")
+            with open(output_file_path, "w", encoding="utf-8") as out_f:
+                for i, (chunk, _, _) in enumerate(spans):
+                    out_f.write(f"--- CHUNK {i+1} ---\n")
+                    out_f.write(chunk + "\n\n")
+                    chunk_count += 1
+
+        print(f"✅ Processed: {filename} -> {len(spans)} chunks")
+
+    if writer is not None:
+        writer.close()
+    print(f"\n🎯 Chunking complete! Total chunks created: {chunk_count}")
+    if dedup is not None:
+        print(format_report(dedup.report()))
+        dedup.close()
@@ -1,41 +1,113 @@
 import os
-import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from subtitle_parsers import detect_format, iter_clean_cues
 
 # ✅ Define Input & Output Folders
 INPUT_FOLDER = "subtitles_extracted_data"   # Folder with extracted subtitles
 OUTPUT_FOLDER = "cleaned_subtitles"         # Folder where cleaned files will be stored
-
-# ✅ Ensure output folder exists
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+SUBTITLE_EXTENSIONS = (".srt", ".vtt", ".ass", ".nfo")
+NUM_WORKERS = os.cpu_count() or 1           # Files are cleaned in parallel across processes
+OUTPUT_FORMAT = "files"                     # "files": one cleaned file each; "parquet": one columnar dataset
+OUTPUT_DATASET = "cleaned_subtitles.parquet"  # used when OUTPUT_FORMAT == "parquet" (needs pyarrow)
 
 # ✅ Function to clean subtitle text
-def clean_subtitle(text):
-    # Remove timestamps (Format: 00:00:06,000 --> 00:00:12,074)
-    text = re.sub(r"\d{2}:\d{2}:\d{2}[.,]\d{1,3} --> \d{2}:\d{2}:\d{2}[.,]\d{1,3}", "", text)
-    text = re.sub(r"\d{2}:\d{2}:\d{2}", "", text)  # Remove standalone timestamps
+def clean_subtitle(text, file_name=None):
+    """
+    Clean one subtitle document. The format (SRT/VTT/ASS/plain) comes from
+    `file_name` or is sniffed from the text; cue indices, timing lines, headers
+    and markup are dropped by the format's parser, and only letters, numbers
+    and basic punctuation are kept.
+    """
+    fmt = detect_format(file_name, text[:2048])
+    return " ".join(cue_text for _, _, cue_text in iter_clean_cues(text.splitlines(), fmt))
 
-    # Remove special characters & extra whitespace
-    text = re.sub(r"[^a-zA-Z0-9\s.,!?']", " ", text)  # Keep only letters, numbers, and some punctuation
-    text = re.sub(r"\s+", " ", text).strip()  # Remove extra spaces
+def clean_subtitle_file(input_path, output_path):
+    """Stream one file line by line through its parser and write the cleaned text. Returns bytes read."""
+    file_name = os.path.basename(input_path)
+    with open(input_path, "r", encoding="utf-8", errors="ignore") as f:
+        head = f.read(2048)
+        f.seek(0)
+        fmt = detect_format(file_name, head)
+        with open(output_path, "w", encoding="utf-8") as out:
+            first = True
+            for _, _, cue_text in iter_clean_cues(f, fmt):
+                out.write(cue_text if first else " " + cue_text)
+                first = False
+    return os.path.getsize(input_path)
 
-    return text
+def _clean_task(args):
+    input_path, output_path = args
+    return os.path.basename(input_path), clean_subtitle_file(input_path, output_path)
 
-# ✅ Process each subtitle file
-for filename in os.listdir(INPUT_FOLDER):
-    file_path = os.path.join(INPUT_FOLDER, filename)
+def _clean_document_task(input_path):
+    """Clean one file with `clean_subtitle` and return what its dataset row needs."""
+    file_name = os.path.basename(input_path)
+    with open(input_path, "r", encoding="utf-8", errors="ignore") as f:
+        text = f.read()
+    # The format is only recorded in the row; clean_subtitle detects it the same way
+    fmt = detect_format(file_name, text[:2048])
+    return file_name, fmt, clean_subtitle(text, file_name), os.path.getsize(input_path)
 
-    if filename.endswith((".srt", ".vtt", ".ass", ".nfo")):  # Process only subtitle files
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            text = f.read()
+def clean_to_dataset(input_folder=INPUT_FOLDER, dataset_path=OUTPUT_DATASET, num_workers=NUM_WORKERS, verbose=True):
+    """
+    Like `clean_folder`, but workers return the cleaned text and the parent
+    appends it to one Parquet documents dataset (see columnar_dataset.py)
+    instead of writing a file per subtitle. Returns (files, bytes, seconds).
+    """
+    from columnar_dataset import DatasetWriter, document_row
 
-        # Clean text
-        cleaned_text = clean_subtitle(text)
+    inputs = sorted(os.path.join(input_folder, f) for f in os.listdir(input_folder) if f.endswith(SUBTITLE_EXTENSIONS))
+    start = time.perf_counter()
+    total_bytes = 0
+    with DatasetWriter(dataset_path, "documents") as writer:
+        if num_workers > 1:
+            pool = ProcessPoolExecutor(max_workers=num_workers)
+            results = pool.map(_clean_document_task, inputs, chunksize=max(1, len(inputs) // (num_workers * 8)))
+        else:
+            pool, results = None, map(_clean_document_task, inputs)
+        for filename, fmt, cleaned, size in results:
+            writer.write(**document_row(filename, fmt, cleaned))
+            total_bytes += size
+            if verbose:
+                print(f"✅ Cleaned: {filename}")
+        if pool is not None:
+            pool.shutdown()
+    return len(inputs), total_bytes, time.perf_counter() - start
 
-        # Save cleaned file
-        cleaned_file_path = os.path.join(OUTPUT_FOLDER, filename)
-        with open(cleaned_file_path, "w", encoding="utf-8") as f:
-            f.write(cleaned_text)
+def clean_folder(input_folder=INPUT_FOLDER, output_folder=OUTPUT_FOLDER, num_workers=NUM_WORKERS, verbose=True):
+    """Clean every subtitle file in `input_folder` using a process pool. Returns (files, bytes, seconds)."""
+    os.makedirs(output_folder, exist_ok=True)
+    tasks = [(os.path.join(input_folder, f), os.path.join(output_folder, f))
+             for f in os.listdir(input_folder) if f.endswith(SUBTITLE_EXTENSIONS)]
 
-        print(f"✅ Cleaned: {filename}")
+    start = time.perf_counter()
+    total_bytes = 0
+    if num_workers > 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as pool:
+            results = pool.map(_clean_task, tasks, chunksize=max(1, len(tasks) // (num_workers * 8)))
+            for filename, size in results:
+                total_bytes += size
+                if verbose:
+                    print(f"✅ Cleaned: {filename}")
+    else:
+        for task in tasks:
+            filename, size = _clean_task(task)
+            total_bytes += size
+            if verbose:
+                print(f"✅ Cleaned: {filename}")
+    return len(tasks), total_bytes, time.perf_counter() - start
+
+# ✅ Process each subtitle file
+if __name__ == "__main__":
+    if OUTPUT_FORMAT == "parquet":
+        n_files, n_bytes, seconds = clean_to_dataset()
+    else:
+        n_files, n_bytes, seconds = clean_folder()
+    print(f"✅ Cleaned {n_files} files ({n_bytes / 1e6:.1f} MB) in {seconds:.1f}s "
+          f"with {NUM_WORKERS} worker(s) -> {n_files / max(seconds, 1e-9):.1f} files/s, "
+          f"{n_bytes / 1e6 / max(seconds, 1e-9):.1f} MB/s")
 
-print("\n🎯 Subtitle Cleaning Complete! Check the 'cleaned_subtitles' folder.")
\ No newline at end of file
+    output = OUTPUT_DATASET if OUTPUT_FORMAT == "parquet" else OUTPUT_FOLDER
+    print(f"\n🎯 Subtitle Cleaning Complete! Check '{output}'.")
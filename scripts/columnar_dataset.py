@@ -0,0 +1,175 @@
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from ingest_manifest import content_hash
+
+# ✅ Columnar intermediate datasets (optional: needs pyarrow)
+DOCUMENTS_DATASET = "cleaned_subtitles.parquet"   # one row per cleaned subtitle file
+CHUNKS_DATASET = "chunked_subtitles.parquet"      # one row per chunk, in source order
+ROW_GROUP_ROWS = {"documents": 1000, "chunks": 20000}
+READ_BATCH_ROWS = 4096
+NUM_WORKERS = os.cpu_count() or 1
+
+
+def _arrow():
+    """Import pyarrow lazily, so the folder-based pipeline keeps working without it."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("The Parquet dataset format needs pyarrow: pip install pyarrow") from e
+    return pa, pq
+
+
+def schema(kind):
+    """
+    Arrow schema of a dataset. "documents": source, format, cleaned text and its
+    character and whitespace-token counts (so stats need no re-tokenizing).
+    "chunks": source, chunk index, character offsets in the cleaned text and
+    cue time range (null when unknown), and the chunk text.
+    """
+    pa, _ = _arrow()
+    if kind == "documents":
+        return pa.schema([("source", pa.string()), ("format", pa.string()), ("text", pa.large_string()),
+                          ("chars", pa.int64()), ("tokens", pa.int64())])
+    if kind == "chunks":
+        return pa.schema([("source", pa.string()), ("chunk_index", pa.int32()), ("char_start", pa.int64()),
+                          ("char_end", pa.int64()), ("start_time", pa.float64()), ("end_time", pa.float64()),
+                          ("text", pa.large_string())])
+    raise ValueError(f"Unknown dataset kind: {kind!r} (expected 'documents' or 'chunks')")
+
+
+class DatasetWriter:
+    """
+    Appends rows to a Parquet dataset, flushing one row group every
+    `row_group_rows` rows, so memory stays bounded and readers can later
+    split the work by row group.
+    """
+
+    def __init__(self, path, kind, row_group_rows=None):
+        pa, pq = _arrow()
+        self.pa = pa
+        self.schema = schema(kind)
+        self.row_group_rows = row_group_rows or ROW_GROUP_ROWS[kind]
+        self.columns = {name: [] for name in self.schema.names}
+        self.rows = 0
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, **row):
+        """Add one row; missing optional columns are written as null."""
+        for name, values in self.columns.items():
+            values.append(row.get(name))
+        if len(self.columns["source"]) >= self.row_group_rows:
+            self.flush()
+
+    def flush(self):
+        n = len(self.columns["source"])
+        if n:
+            table = self.pa.Table.from_pydict(self.columns, schema=self.schema)
+            self.writer.write_table(table, row_group_size=n)
+            self.rows += n
+            self.columns = {name: [] for name in self.schema.names}
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def document_row(source, fmt, text):
+    return {"source": source, "format": fmt, "text": text, "chars": len(text), "tokens": len(text.split())}
+
+
+def num_row_groups(path):
+    _, pq = _arrow()
+    return pq.ParquetFile(path).num_row_groups
+
+
+def iter_batches(path, columns=None, batch_size=READ_BATCH_ROWS, row_groups=None):
+    """Stream a dataset as Arrow record batches, reading only `columns` (and only `row_groups`, if given)."""
+    _, pq = _arrow()
+    parquet_file = pq.ParquetFile(path)
+    yield from parquet_file.iter_batches(batch_size=batch_size, columns=columns, row_groups=row_groups)
+
+
+def _row_group_task(args):
+    path, row_group, columns, fn = args
+    _, pq = _arrow()
+    return fn(pq.ParquetFile(path).read_row_group(row_group, columns=columns))
+
+
+def map_row_groups(path, fn, columns=None, num_workers=NUM_WORKERS):
+    """
+    Apply `fn` (a module-level function taking an Arrow table) to every row
+    group of the dataset, in parallel across processes. Each worker reads only
+    its own row group and only `columns`. Returns the results in file order.
+    """
+    tasks = [(path, i, columns, fn) for i in range(num_row_groups(path))]
+    if num_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(num_workers, len(tasks))) as pool:
+            return list(pool.map(_row_group_task, tasks))
+    return [_row_group_task(task) for task in tasks]
+
+
+def iter_dataset_chunk_files(path, batch_size=READ_BATCH_ROWS):
+    """
+    Yield (source, file_hash, get_chunks) for the ingestion manifest from a
+    chunks dataset, like vectorize_subtitles.iter_chunk_files does for
+    `*_chunks.txt` folders. A source's rows are contiguous, so they are grouped
+    while streaming record batches. `get_chunks()` returns (text, offsets)
+    pairs, with offsets carrying the char and time ranges that are known.
+    """
+    offset_columns = ("char_start", "char_end", "start_time", "end_time")
+    source, chunks = None, []
+
+    def finish():
+        file_hash = content_hash("\x00".join(text for text, _ in chunks))
+        return source, file_hash, (lambda chunks=chunks: chunks)
+
+    for batch in iter_batches(path, ["source", "text", *offset_columns], batch_size):
+        columns = batch.to_pydict()
+        for i, row_source in enumerate(columns["source"]):
+            if row_source != source:
+                if chunks:
+                    yield finish()
+                source, chunks = row_source, []
+            offsets = {name: columns[name][i] for name in offset_columns if columns[name][i] is not None}
+            chunks.append((columns["text"][i], offsets))
+    if chunks:
+        yield finish()
+
+
+def folder_to_dataset(folder, path, kind):
+    """Convert an existing cleaned_subtitles/ or chunked_subtitles/ folder into a dataset."""
+    from subtitle_parsers import detect_format
+    from vectorize_subtitles import read_chunk_file
+
+    with DatasetWriter(path, kind) as writer:
+        for filename in sorted(os.listdir(folder)):
+            file_path = os.path.join(folder, filename)
+            if kind == "chunks" and filename.endswith("_chunks.txt"):
+                for i, text in enumerate(read_chunk_file(file_path)):
+                    writer.write(source=filename, chunk_index=i, text=text)
+            elif kind == "documents":
+                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+                    text = f.read()
+                writer.write(**document_row(filename, detect_format(filename, text[:2048]), text))
+    return writer.rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert an intermediate folder into a columnar Parquet dataset.")
+    parser.add_argument("kind", choices=["documents", "chunks"])
+    parser.add_argument("folder", help="cleaned_subtitles/ (documents) or chunked_subtitles/ (chunks)")
+    parser.add_argument("--output", default=None, help=f"Default: {DOCUMENTS_DATASET} or {CHUNKS_DATASET}")
+    args = parser.parse_args()
+
+    output = args.output or (DOCUMENTS_DATASET if args.kind == "documents" else CHUNKS_DATASET)
+    rows = folder_to_dataset(args.folder, output, args.kind)
+    print(f"✅ Wrote {rows} {args.kind} rows to {output} ({num_row_groups(output)} row groups)")
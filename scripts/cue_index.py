@@ -0,0 +1,160 @@
+import base64
+import numpy as np
+
+from text_cleanup import DISPLAY_MAX_LEN
+
+# ✅ Per-chunk cue index and snippet-window vectors, stored in the chunk metadata
+CUE_INDEX_KEY = "cue_index"
+CUE_VECTORS_KEY = "cue_vectors"   # int8 embedding of every candidate window, computed at ingestion
+WINDOW_CUES = 3       # consecutive cues per snippet candidate
+WINDOW_STRIDE = 3     # candidates start every WINDOW_STRIDE cues (disjoint windows: fewer vectors to store)
+ELLIPSIS = "..."
+
+
+def pack_cue_index(char_starts, start_times, end_times):
+    """
+    Pack one chunk's cues as a uint32 array of rows (char offset of the cue in
+    the chunk text, start ms, end ms) and base64 it, so it fits in a Chroma
+    metadata string (12 bytes per cue, ~300 chars for a full 500-token chunk).
+    """
+    rows = np.empty((len(char_starts), 3), dtype="<u4")
+    rows[:, 0] = char_starts
+    rows[:, 1] = np.round(np.asarray(start_times, dtype=np.float64) * 1000)
+    rows[:, 2] = np.round(np.asarray(end_times, dtype=np.float64) * 1000)
+    return base64.b64encode(rows.tobytes()).decode("ascii")
+
+
+def unpack_cue_index(packed):
+    """(n_cues, 3) uint32 view: char offset in the chunk, start ms, end ms."""
+    return np.frombuffer(base64.b64decode(packed), dtype="<u4").reshape(-1, 3)
+
+
+def chunk_cue_index(cues, char_starts, first, last):
+    """
+    Cue index of a chunk made of cues[first..last] (cues are (start, end, text),
+    `char_starts` their offsets in the cues-joined-by-spaces text). Offsets are
+    relative to the chunk's first cue. None when a cue is untimed (plain text).
+    """
+    span = cues[first:last + 1]
+    if any(start is None or end is None for start, end, _ in span):
+        return None
+    base = char_starts[first]
+    return pack_cue_index([offset - base for offset in char_starts[first:last + 1]],
+                          [start for start, _, _ in span], [end for _, end, _ in span])
+
+
+def cue_windows(doc, index, size=WINDOW_CUES, stride=WINDOW_STRIDE):
+    """
+    Candidate snippet windows of `size` consecutive cues as (char_start,
+    char_end, start_ms, end_ms) rows. A cue ends where the next one starts
+    (minus the joining space); the last window always reaches the chunk end.
+    """
+    n = len(index)
+    if n == 0:
+        return []
+    starts = np.minimum(index[:, 0].astype(np.int64), len(doc))
+    ends = np.append(np.maximum(starts[1:] - 1, starts[:-1]), len(doc))
+    firsts = list(range(0, max(n - size, 0) + 1, stride))
+    if firsts[-1] + size < n:
+        firsts.append(n - size)
+    lasts = [min(first + size, n) - 1 for first in firsts]
+    return [(int(starts[f]), int(ends[l]), int(index[f, 1]), int(index[l, 2])) for f, l in zip(firsts, lasts)]
+
+
+def pack_window_vectors(vectors):
+    """
+    int8 codes of the window embeddings (each row scaled to its own max
+    magnitude), base64'd for the metadata: 384 bytes per window for MiniLM.
+    Only directions matter for ranking the windows, so no scales are stored.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scale = np.maximum(np.abs(vectors).max(axis=1, keepdims=True), 1e-12)
+    return base64.b64encode(np.rint(vectors / scale * 127).astype(np.int8).tobytes()).decode("ascii")
+
+
+def unpack_window_vectors(packed, dim):
+    return np.frombuffer(base64.b64decode(packed), dtype=np.int8).reshape(-1, dim)
+
+
+def add_cue_vectors(batch, encode):
+    """
+    Embed the candidate snippet windows of every chunk in an ingestion batch
+    ((chunk_id, source, chunk_index, offsets, text) records) with one
+    `encode` call and store them in each chunk's offsets under CUE_VECTORS_KEY,
+    so search ranks windows without running the model. Chunks without a cue
+    index, or with a single window, get nothing.
+    """
+    owners, texts = [], []
+    for record in batch:
+        offsets, doc = record[3], record[-1]
+        if not offsets.get(CUE_INDEX_KEY):
+            continue
+        windows = cue_windows(doc, unpack_cue_index(offsets[CUE_INDEX_KEY]))
+        if len(windows) > 1:
+            owners.append((offsets, len(windows)))
+            texts.extend(doc[start:end] for start, end, _, _ in windows)
+    if not texts:
+        return
+    vectors = np.asarray(encode(texts), dtype=np.float32)
+    row = 0
+    for offsets, n in owners:
+        offsets[CUE_VECTORS_KEY] = pack_window_vectors(vectors[row:row + n])
+        row += n
+
+
+def make_snippet(doc, char_start, char_end, max_len=DISPLAY_MAX_LEN):
+    """Slice a window out of the (already cleaned) chunk text; only the snippet itself is touched."""
+    text = doc[char_start:char_end]
+    if len(text) > max_len:
+        text = text[:max_len].rstrip() + ELLIPSIS
+    if char_start > 0:
+        text = ELLIPSIS + text
+    return text
+
+
+def best_window(query, windows, packed_vectors):
+    """Index of the window whose stored vector is closest to `query` (0 without usable vectors)."""
+    if len(windows) < 2 or not packed_vectors or query is None:
+        return 0
+    codes = unpack_window_vectors(packed_vectors, len(query))
+    if len(codes) != len(windows):
+        return 0
+    codes = codes.astype(np.float32)
+    return int(np.argmax(codes @ query / np.maximum(np.linalg.norm(codes, axis=1), 1e-12)))
+
+
+def best_snippets(query_embedding, docs, metadatas, max_len=DISPLAY_MAX_LEN):
+    """
+    For every hit, the cue window closest to the query by cosine similarity
+    against the window vectors stored at ingestion (a few hundred
+    multiply-adds per window; no model call). Returns (snippet, start_seconds,
+    end_seconds) per hit, or None for chunks indexed without a cue index.
+    Without window vectors (or a query embedding) the first window is used.
+    """
+    query = None if query_embedding is None else np.asarray(query_embedding, dtype=np.float32).ravel()
+    snippets = []
+    for doc, metadata in zip(docs, metadatas):
+        metadata = metadata or {}
+        packed = metadata.get(CUE_INDEX_KEY)
+        windows = cue_windows(doc, unpack_cue_index(packed)) if packed and doc else None
+        if not windows:
+            snippets.append(None)
+            continue
+        start, end, start_ms, end_ms = windows[best_window(query, windows, metadata.get(CUE_VECTORS_KEY))]
+        snippets.append((make_snippet(doc, start, end, max_len), start_ms / 1000, end_ms / 1000))
+    return snippets
+
+
+def attach_snippets(query_embedding, docs, metadatas, max_len=DISPLAY_MAX_LEN):
+    """
+    Copies of `metadatas` with "snippet", "snippet_start" and "snippet_end"
+    (seconds) from `best_snippets`, and without the packed index and vectors,
+    so results (and cached or served results) carry a display-ready snippet.
+    """
+    metadatas = [dict(metadata or {}) for metadata in metadatas]
+    for metadata, snippet in zip(metadatas, best_snippets(query_embedding, docs, metadatas, max_len)):
+        metadata.pop(CUE_INDEX_KEY, None)
+        metadata.pop(CUE_VECTORS_KEY, None)
+        if snippet is not None:
+            metadata["snippet"], metadata["snippet_start"], metadata["snippet_end"] = snippet
+    return metadatas
@@ -0,0 +1,113 @@
+import time
+
+from instrumentation import span
+
+# ✅ Defaults for the embedding stage
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ENCODE_BATCH_SIZE = 64     # texts per forward pass
+GATHER_SIZE = 1000         # chunks collected before each encode call
+NUM_WORKERS = 1            # >1 spreads encoding over that many CPU worker processes
+ENCODER_BACKEND = "torch"  # "torch" (SentenceTransformer), "onnx" or "onnx-int8" (ONNX Runtime, see onnx_encoder.py)
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def load_encoder(model_name=MODEL_NAME, backend=ENCODER_BACKEND, threads=None):
+    """
+    The query/ingest encoder: a SentenceTransformer, or an OnnxEncoder with the
+    same `encode` contract ("onnx-int8" uses the dynamically quantized model).
+    `threads` sets ONNX Runtime's intra-op threads.
+    """
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    if backend in ("onnx", "onnx-int8"):
+        from onnx_encoder import load_onnx_encoder
+        return load_onnx_encoder(model_name, quantized=backend == "onnx-int8", threads=threads)
+    raise ValueError(f"Unknown encoder backend: {backend!r} (expected one of {', '.join(ENCODER_BACKENDS)})")
+
+
+class EmbeddingEngine:
+    """
+    Batched embedding stage for subtitle chunks.
+
+    Chunks are gathered into groups of `gather_size` and encoded with
+    SentenceTransformer's own batching (`batch_size` texts per forward pass).
+    With `num_workers > 1` each group is split across a pool of CPU worker
+    processes; results always come back in input order so IDs stay stable.
+    `encoder` picks the backend (see load_encoder); the ONNX encoders run in
+    one process and parallelize with intra-op threads instead of workers.
+    """
+
+    def __init__(self, model_name=MODEL_NAME, batch_size=ENCODE_BATCH_SIZE, num_workers=NUM_WORKERS, model=None,
+                 encoder=ENCODER_BACKEND):
+        if model is None:
+            model = load_encoder(model_name, encoder)
+        if num_workers > 1 and not hasattr(model, "start_multi_process_pool"):
+            raise ValueError(f"The {encoder} encoder uses intra-op threads, not worker processes: use num_workers=1")
+        self.model = model
+        self.encoder = encoder
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.pool = None
+        if num_workers > 1:
+            self.pool = self.model.start_multi_process_pool(target_devices=["cpu"] * num_workers)
+
+        self.total_chunks = 0
+        self.total_seconds = 0.0
+
+    def encode(self, texts, stage="encode"):
+        """
+        Encode a list of texts, returning a float32 array in the same order.
+        `stage` names the timing span; only "encode" (chunks) counts towards chunks/sec.
+        """
+        if not texts:
+            return []
+        start = time.perf_counter()
+        with span(stage, items=len(texts)):
+            if self.pool is not None:
+                # Split evenly so every worker gets a share of this group
+                chunk_size = max(1, -(-len(texts) // self.num_workers))
+                embeddings = self.model.encode_multi_process(
+                    texts, self.pool, batch_size=self.batch_size, chunk_size=chunk_size
+                )
+            else:
+                embeddings = self.model.encode(texts, batch_size=self.batch_size, show_progress_bar=False)
+        if stage == "encode":
+            self.total_seconds += time.perf_counter() - start
+            self.total_chunks += len(texts)
+        return embeddings
+
+    def embed_batches(self, records, gather_size=GATHER_SIZE, get_text=lambda record: record[-1]):
+        """
+        Consume an iterable of records (any tuple whose text is returned by
+        `get_text`) and yield (records_batch, embeddings_batch) pairs.
+        """
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= gather_size:
+                yield batch, self.encode([get_text(r) for r in batch])
+                batch = []
+        if batch:
+            yield batch, self.encode([get_text(r) for r in batch])
+
+    @property
+    def chunks_per_sec(self):
+        return self.total_chunks / self.total_seconds if self.total_seconds else 0.0
+
+    def report(self):
+        """One-line throughput summary used to size ingestion jobs."""
+        return (f"⚡ Embedded {self.total_chunks} chunks in {self.total_seconds:.1f}s "
+                f"({self.chunks_per_sec:.1f} chunks/sec, batch_size={self.batch_size}, workers={self.num_workers}, "
+                f"encoder={self.encoder})")
+
+    def close(self):
+        if self.pool is not None:
+            self.model.stop_multi_process_pool(self.pool)
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
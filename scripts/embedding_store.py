@@ -0,0 +1,196 @@
+import os
+import json
+import numpy as np
+
+from chunk_metadata import match_where
+
+# ✅ Default store location (replaces the old embeddings.json backup)
+STORE_DIR = "embedding_store"
+EMBEDDING_DIM = 384
+
+# Files inside a store directory
+META_FILE = "meta.json"            # dim, dtype and committed row count
+VECTORS_FILE = "vectors.bin"       # row-major float32/float16 matrix, memory-mappable
+IDS_FILE = "ids.txt"               # one chunk ID per row
+TEXT_OFFSETS_FILE = "text_ends.u64"  # uint64 end offset of each row's text in texts.bin
+TEXTS_FILE = "texts.bin"           # concatenated UTF-8 chunk texts
+DELETED_FILE = "deleted.tsv"       # tombstoned chunk IDs with the row count at deletion time
+METADATA_FILE = "metadata.jsonl"   # one JSON object of chunk metadata per row ({} if none)
+
+
+class EmbeddingStore:
+    """
+    Append-only binary embedding store.
+
+    Each flushed batch is appended to the vector matrix, the ID list and the
+    text blob, and `meta.json` is rewritten last with the new row count, so
+    a crash mid-append never exposes a half-written row. Readers memory-map
+    `vectors.bin` and get zero-copy access to the whole matrix.
+    """
+
+    def __init__(self, path=STORE_DIR, dim=EMBEDDING_DIM, dtype="float32"):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dim, self.dtype, self.count = meta["dim"], np.dtype(meta["dtype"]), meta["count"]
+        else:
+            self.dim, self.dtype, self.count = dim, np.dtype(dtype), 0
+        self.text_size = self._committed_text_size()
+        self._truncate_uncommitted()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _committed_text_size(self):
+        if self.count == 0:
+            return 0
+        ends = np.memmap(self._file(TEXT_OFFSETS_FILE), dtype=np.uint64, mode="r", shape=(self.count,))
+        return int(ends[-1])
+
+    def _truncate_uncommitted(self):
+        """Drop any bytes a crashed run appended after the last committed meta.json."""
+        sizes = {
+            VECTORS_FILE: self.count * self.dim * self.dtype.itemsize,
+            TEXT_OFFSETS_FILE: self.count * 8,
+            TEXTS_FILE: self.text_size,
+        }
+        for name, size in sizes.items():
+            with open(self._file(name), "ab") as f:
+                f.truncate(size)
+
+        ids_path = self._file(IDS_FILE)
+        if os.path.exists(ids_path):
+            with open(ids_path, "r", encoding="utf-8") as f:
+                ids = f.read().splitlines()
+            if len(ids) != self.count:
+                with open(ids_path, "w", encoding="utf-8") as f:
+                    f.write("".join(f"{i}\n" for i in ids[:self.count]))
+
+        # Stores written before metadata existed are padded with empty objects so rows stay aligned
+        metadata_path = self._file(METADATA_FILE)
+        lines = []
+        if os.path.exists(metadata_path):
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        if len(lines) != self.count:
+            lines = lines[:self.count] + ["{}"] * (self.count - len(lines))
+            with open(metadata_path, "w", encoding="utf-8") as f:
+                f.write("".join(f"{line}\n" for line in lines))
+
+    def _write_meta(self):
+        tmp_path = self._file(META_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "dtype": self.dtype.name, "count": self.count}, f)
+        os.replace(tmp_path, self._file(META_FILE))
+
+    def append(self, ids, texts, embeddings, metadatas=None):
+        """Append one batch; nothing from previous batches is held in memory."""
+        if not ids:
+            return
+        matrix = np.asarray(embeddings, dtype=self.dtype).reshape(len(ids), self.dim)
+        encoded = [t.encode("utf-8") for t in texts]
+        ends = self.text_size + np.cumsum([len(b) for b in encoded], dtype=np.uint64)
+
+        with open(self._file(VECTORS_FILE), "ab") as f:
+            f.write(matrix.tobytes())
+        with open(self._file(TEXTS_FILE), "ab") as f:
+            f.write(b"".join(encoded))
+        with open(self._file(TEXT_OFFSETS_FILE), "ab") as f:
+            f.write(ends.astype(np.uint64).tobytes())
+        with open(self._file(IDS_FILE), "a", encoding="utf-8") as f:
+            f.write("".join(f"{i}\n" for i in ids))
+        with open(self._file(METADATA_FILE), "a", encoding="utf-8") as f:
+            for metadata in metadatas or [None] * len(ids):
+                f.write(json.dumps(metadata or {}, separators=(",", ":")) + "\n")
+
+        self.count += len(ids)
+        self.text_size = int(ends[-1])
+        self._write_meta()
+
+    def delete(self, ids):
+        """
+        Tombstone chunk IDs that were removed from the collection. Rows appended
+        later with the same ID (content came back) stay live.
+        """
+        if ids:
+            with open(self._file(DELETED_FILE), "a", encoding="utf-8") as f:
+                f.write("".join(f"{i}\t{self.count}\n" for i in ids))
+
+
+class EmbeddingStoreReader:
+    """
+    Zero-copy view over an EmbeddingStore directory.
+
+    `vectors` is an np.memmap of shape (count, dim); `ids` lists the chunk ID of
+    every row; `live_rows` holds the row numbers that are current (not tombstoned,
+    latest copy of re-embedded chunks) so searches can skip stale rows. Chunk
+    metadata is parsed on first use (`metadata(row)`, `filter_live(where)`).
+    """
+
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.dim, self.dtype, self.count = meta["dim"], np.dtype(meta["dtype"]), meta["count"]
+
+        if self.count:
+            self.vectors = np.memmap(os.path.join(path, VECTORS_FILE), dtype=self.dtype, mode="r",
+                                     shape=(self.count, self.dim))
+            self.text_ends = np.memmap(os.path.join(path, TEXT_OFFSETS_FILE), dtype=np.uint64, mode="r",
+                                       shape=(self.count,))
+            self.texts = np.memmap(os.path.join(path, TEXTS_FILE), dtype=np.uint8, mode="r")
+        else:
+            self.vectors = np.zeros((0, self.dim), dtype=self.dtype)
+            self.text_ends = np.zeros(0, dtype=np.uint64)
+            self.texts = np.zeros(0, dtype=np.uint8)
+
+        self._metadata = None
+        self.ids = []
+        if self.count:
+            with open(os.path.join(path, IDS_FILE), "r", encoding="utf-8") as f:
+                self.ids = f.read().splitlines()[:self.count]
+
+        # A row is dead if its ID was tombstoned after the row was written
+        deleted_at = {}
+        deleted_path = os.path.join(path, DELETED_FILE)
+        if os.path.exists(deleted_path):
+            with open(deleted_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    chunk_id, _, count = line.rstrip("\n").partition("\t")
+                    deleted_at[chunk_id] = int(count)
+
+        latest = {}
+        for row, chunk_id in enumerate(self.ids):
+            latest[chunk_id] = row
+        self.live_rows = np.array(
+            sorted(row for cid, row in latest.items() if row >= deleted_at.get(cid, 0)), dtype=np.int64
+        )
+
+    def _load_metadata(self):
+        if self._metadata is None:
+            self._metadata = []
+            path = os.path.join(self.path, METADATA_FILE)
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    self._metadata = [json.loads(line) for line in f.read().splitlines()[:self.count]]
+            self._metadata += [{}] * (self.count - len(self._metadata))
+        return self._metadata
+
+    def metadata(self, row):
+        return self._load_metadata()[row]
+
+    def filter_live(self, where):
+        """Positions into `live_rows` whose metadata matches a Chroma-style `where` filter."""
+        metadata = self._load_metadata()
+        return np.array([i for i, row in enumerate(self.live_rows) if match_where(metadata[row], where)],
+                        dtype=np.int64)
+
+    def text(self, row):
+        start = int(self.text_ends[row - 1]) if row > 0 else 0
+        return bytes(self.texts[start:int(self.text_ends[row])]).decode("utf-8")
+
+    def __len__(self):
+        return len(self.live_rows)
@@ -0,0 +1,228 @@
+import hashlib
+import sqlite3
+import time
+
+from instrumentation import span
+from chunk_metadata import chunk_metadata
+
+# ✅ Manifest location (lives next to the Chroma directory)
+MANIFEST_PATH = "ingest_manifest.sqlite3"
+DELETE_BATCH_SIZE = 10000   # Chroma delete calls are chunked to stay under batch limits
+
+
+def content_hash(data):
+    """SHA-1 of a file's raw bytes (or text), used to detect changed files."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha1(data).hexdigest()
+
+
+def make_chunk_ids(source, chunks):
+    """
+    Content-addressed chunk IDs: hash of the source name plus the chunk text.
+    Identical chunks repeated within one file get a "-n" suffix so IDs stay unique.
+    Adding or editing one file never changes the IDs of any other file.
+    """
+    ids = []
+    seen = {}
+    for chunk in chunks:
+        digest = hashlib.sha1(f"{source}\x00{chunk}".encode("utf-8")).hexdigest()[:24]
+        n = seen.get(digest, 0)
+        seen[digest] = n + 1
+        ids.append(f"{digest}-{n}" if n else digest)
+    return ids
+
+
+class IngestManifest:
+    """
+    Tracks which source files have been ingested (and with which content hash)
+    and which chunk IDs are already committed to the collection.
+
+    A file is `pending` while its chunks are being inserted and `done` once all
+    of them are committed, so a crashed run resumes from the last committed batch.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                source TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                status TEXT NOT NULL,
+                chunk_count INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chunks_by_source ON chunks(source);
+        """)
+        self.conn.commit()
+
+    def is_current(self, source, file_hash):
+        """True if `source` was fully ingested with exactly this content hash."""
+        row = self.conn.execute(
+            "SELECT content_hash, status FROM files WHERE source = ?", (source,)
+        ).fetchone()
+        return row is not None and row[0] == file_hash and row[1] == "done"
+
+    def committed_chunk_ids(self, source):
+        return {row[0] for row in self.conn.execute("SELECT chunk_id FROM chunks WHERE source = ?", (source,))}
+
+    def begin_file(self, source, file_hash):
+        self.conn.execute(
+            "INSERT INTO files (source, content_hash, status, updated_at) VALUES (?, ?, 'pending', ?) "
+            "ON CONFLICT(source) DO UPDATE SET content_hash = excluded.content_hash, status = 'pending', "
+            "updated_at = excluded.updated_at",
+            (source, file_hash, time.time()),
+        )
+        self.conn.commit()
+
+    def commit_chunks(self, pairs):
+        """Record (chunk_id, source) pairs after their batch has been written to the collection."""
+        self.conn.executemany("INSERT OR IGNORE INTO chunks (chunk_id, source) VALUES (?, ?)", pairs)
+        self.conn.commit()
+
+    def finish_file(self, source, chunk_ids):
+        """
+        Mark `source` done. Returns the IDs of chunks it used to have but no
+        longer produces (edited files); the caller deletes them from the collection.
+        """
+        keep = set(chunk_ids)
+        stale = [cid for cid in self.committed_chunk_ids(source) if cid not in keep]
+        self.conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(cid,) for cid in stale])
+        self.conn.execute(
+            "UPDATE files SET status = 'done', chunk_count = ?, updated_at = ? WHERE source = ?",
+            (len(keep), time.time(), source),
+        )
+        self.conn.commit()
+        return stale
+
+    def removed_sources(self, current_sources):
+        current = set(current_sources)
+        return [row[0] for row in self.conn.execute("SELECT source FROM files") if row[0] not in current]
+
+    def forget_source(self, source):
+        """Drop a removed file from the manifest, returning its chunk IDs for deletion."""
+        ids = list(self.committed_chunk_ids(source))
+        self.conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+        self.conn.execute("DELETE FROM files WHERE source = ?", (source,))
+        self.conn.commit()
+        return ids
+
+    def close(self):
+        self.conn.close()
+
+
+def iter_incremental_chunks(manifest, files, finished, stats):
+    """
+    Filter a stream of source files down to the chunks that actually need embedding.
+
+    `files` yields (source, file_hash, get_chunks) where `get_chunks()` returns the
+    file's chunk texts, or (text, offsets) pairs; it is only called for new or
+    changed files. Yields (chunk_id, source, chunk_index, offsets, text) for chunks
+    not yet committed. Once every chunk of a file has been yielded,
+    (source, chunk_ids) is appended to `finished`.
+    """
+    for source, file_hash, get_chunks in files:
+        stats["seen_sources"].add(source)
+        if manifest.is_current(source, file_hash):
+            stats["skipped_files"] += 1
+            continue
+
+        manifest.begin_file(source, file_hash)
+        chunks = get_chunks()
+        if chunks and isinstance(chunks[0], tuple):
+            chunks, offsets = [c for c, _ in chunks], [o for _, o in chunks]
+        else:
+            offsets = [{}] * len(chunks)
+        ids = make_chunk_ids(source, chunks)
+        already = manifest.committed_chunk_ids(source)
+        for i, (cid, text) in enumerate(zip(ids, chunks)):
+            if cid in already:
+                stats["reused_chunks"] += 1
+                continue
+            yield cid, source, i, offsets[i], text
+        stats["ingested_files"] += 1
+        finished.append((source, ids))
+
+
+def new_stats():
+    return {"seen_sources": set(), "skipped_files": 0, "ingested_files": 0, "reused_chunks": 0,
+            "embedded_chunks": 0, "deleted_chunks": 0}
+
+
+def delete_ids(collection, ids):
+    """Delete IDs from the collection in batches to avoid batch size limits."""
+    for i in range(0, len(ids), DELETE_BATCH_SIZE):
+        collection.delete(ids=ids[i:i + DELETE_BATCH_SIZE])
+
+
+def commit_batch(manifest, collection, batch, embeddings, finished, stats, extra=None, backup_store=None,
+                 lexical_index=None):
+    """
+    Upsert one embedded batch with its chunk metadata (source, title, year, chunk
+    index, offsets), record it in the manifest, then close out every file whose
+    chunks have now all been committed (deleting their stale chunks).
+    `extra` may add or override keyword arguments of the upsert call;
+    `backup_store` (an EmbeddingStore) and `lexical_index` (a LexicalIndex)
+    mirror every append and delete.
+    """
+    if batch:
+        ids = [r[0] for r in batch]
+        documents = [r[-1] for r in batch]
+        kwargs = {"metadatas": [chunk_metadata(r[1], r[2], **r[3]) for r in batch], **(extra or {})}
+        with span("db_insert", items=len(batch)):
+            collection.upsert(
+                ids=ids,
+                documents=documents,
+                embeddings=embeddings.tolist() if hasattr(embeddings, "tolist") else embeddings,
+                **kwargs
+            )
+        if backup_store is not None:
+            with span("store_append", items=len(batch)):
+                backup_store.append(ids, documents, embeddings, kwargs["metadatas"])
+        if lexical_index is not None:
+            with span("lexical_append", items=len(batch)):
+                lexical_index.append(ids, documents)
+        manifest.commit_chunks([(r[0], r[1]) for r in batch])
+        stats["embedded_chunks"] += len(batch)
+
+    while finished:
+        source, ids = finished.pop(0)
+        stale = manifest.finish_file(source, ids)
+        if stale:
+            with span("db_delete", items=len(stale)):
+                delete_ids(collection, stale)
+            if backup_store is not None:
+                backup_store.delete(stale)
+            if lexical_index is not None:
+                lexical_index.delete(stale)
+            stats["deleted_chunks"] += len(stale)
+
+
+def remove_missing_sources(manifest, collection, stats, backup_store=None, lexical_index=None, dedup=None):
+    """
+    After a complete pass, delete chunks of files that no longer exist in the source.
+    With `dedup` (a DuplicateIndex), aliases of a removed representative are
+    forgotten too, so the next run ingests one of them in its place.
+    """
+    for source in manifest.removed_sources(stats["seen_sources"]):
+        if dedup is not None:
+            for alias in dedup.remove(source):
+                manifest.forget_source(alias)
+        ids = manifest.forget_source(source)
+        delete_ids(collection, ids)
+        if backup_store is not None:
+            backup_store.delete(ids)
+        if lexical_index is not None:
+            lexical_index.delete(ids)
+        stats["deleted_chunks"] += len(ids)
+        print(f"🗑️ Removed {len(ids)} chunks of deleted file: {source}")
+
+
+def summary(stats):
+    return (f"📋 Files ingested: {stats['ingested_files']}, unchanged: {stats['skipped_files']} | "
+            f"chunks embedded: {stats['embedded_chunks']}, reused: {stats['reused_chunks']}, "
+            f"deleted: {stats['deleted_chunks']}")
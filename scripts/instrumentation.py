@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import uuid
+import bisect
+import cProfile
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# ✅ Instrumentation settings (environment overridable)
+METRICS_PREFIX = "subsearch"
+JSON_LOG = os.environ.get("METRICS_JSON_LOG")             # file path, or "-" for stderr; unset = no JSON logs
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", 0))  # >0 profiles requests and keeps the slow ones
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger("subtitle_search")
+logger.addHandler(logging.NullHandler())
+
+_lock = threading.Lock()
+_counters = {}     # (name, labels) -> value
+_histograms = {}   # (name, labels) -> [one count per bound..., overflow (> last bound), sum, count]
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_profiler_lock = threading.Lock()   # cProfile can only profile one request at a time
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def count(name, value=1, **labels):
+    """Increment a counter, e.g. count("chunks_total", len(batch), stage="encode")."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    """Record one duration in a histogram."""
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(BUCKETS) + 3)
+        hist[bisect.bisect_left(BUCKETS, seconds)] += 1
+        hist[-2] += seconds
+        hist[-1] += 1
+
+
+def _record_stage(stage, seconds, items=None):
+    observe("stage_duration_seconds", seconds, stage=stage)
+    if items is not None:
+        count("stage_items_total", items, stage=stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace["stages"][stage] = trace["stages"].get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage, items=None):
+    """
+    Time one pipeline stage (extract, clean, chunk, encode, db_insert, query,
+    postprocess, transcribe, ...). The duration goes into the stage histogram and,
+    inside a `trace`, into that request's per-stage breakdown.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_stage(stage, time.perf_counter() - start, items)
+
+
+def timed_iter(stage, iterable):
+    """
+    Wrap a generator stage so the time spent producing each item is attributed
+    to `stage`, without pulling the whole stream into memory.
+    """
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        _record_stage(stage, time.perf_counter() - start, 1)
+        yield item
+
+
+@contextmanager
+def trace(name, profile_slow_ms=None, **fields):
+    """
+    One end-to-end request (a search, a transcription, an ingestion run).
+    Emits a single JSON log record with the total time and the per-stage
+    breakdown of every `span` inside it. When `profile_slow_ms` (default
+    PROFILE_SLOW_MS) is set, the request runs under cProfile and the profile is
+    written to PROFILE_DIR if it took longer than the threshold.
+    """
+    threshold_ms = PROFILE_SLOW_MS if profile_slow_ms is None else profile_slow_ms
+    record = {"event": name, "trace_id": uuid.uuid4().hex[:16], "stages": {}, **fields}
+    token = _current_trace.set(record)
+    profiler = None
+    if threshold_ms > 0 and _profiler_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. in a different thread on Python 3.12+) is already active
+            profiler = None
+            _profiler_lock.release()
+
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield record
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            _profiler_lock.release()
+        _current_trace.reset(token)
+
+        observe("request_duration_seconds", seconds, request=name)
+        count("requests_total", request=name, status=status)
+        record.update(status=status, duration_ms=round(seconds * 1000, 3),
+                      stages={k: round(v * 1000, 3) for k, v in record["stages"].items()})
+        if profiler is not None and seconds * 1000 >= threshold_ms:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{name}-{record['trace_id']}.prof")
+            profiler.dump_stats(path)
+            record["profile"] = path
+            count("slow_requests_profiled_total", request=name)
+        log_event(record)
+
+
+def log_event(record):
+    """Write one structured record as a JSON line (if JSON logging is configured)."""
+    logger.info(json.dumps({"ts": round(time.time(), 3), **record}, default=str))
+
+
+def configure_json_log(destination=JSON_LOG):
+    """Send JSON log records to a file or, with "-", to stderr."""
+    if not destination:
+        return
+    handler = logging.StreamHandler() if destination == "-" else logging.FileHandler(destination, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _labels_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+
+def prometheus_text():
+    """Render every counter and histogram in the Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((k, list(v)) for k, v in _histograms.items())
+    lines = []
+    seen = set()
+    for (name, labels), value in counters:
+        metric = f"{METRICS_PREFIX}_{name}"
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} counter")
+            seen.add(metric)
+        lines.append(f"{metric}{_labels_text(labels)} {value}")
+    for (name, labels), hist in histograms:
+        metric = f"{METRICS_PREFIX}_{name}"
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} histogram")
+            seen.add(metric)
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS, hist[:len(BUCKETS)]):
+            cumulative += bucket
+            lines.append(f"{metric}_bucket{_labels_text(labels, [('le', bound)])} {cumulative}")
+        # The +Inf bucket is required by Prometheus and always equals the count
+        lines.append(f"{metric}_bucket{_labels_text(labels, [('le', '+Inf')])} {hist[-1]}")
+        lines.append(f"{metric}_sum{_labels_text(labels)} {hist[-2]:.6f}")
+        lines.append(f"{metric}_count{_labels_text(labels)} {hist[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Write a metrics snapshot for the node_exporter textfile collector (atomic rename)."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+def stage_summary():
+    """{stage: {"seconds", "calls", "items"}} totals, for end-of-run reports and JSON logs."""
+    out = {}
+    with _lock:
+        for (name, labels), hist in _histograms.items():
+            if name == "stage_duration_seconds":
+                out[dict(labels)["stage"]] = {"seconds": round(hist[-2], 3), "calls": hist[-1]}
+        for (name, labels), value in _counters.items():
+            if name == "stage_items_total":
+                out.setdefault(dict(labels)["stage"], {})["items"] = value
+    return out
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+configure_json_log()
@@ -0,0 +1,333 @@
+import re
+import math
+import zlib
+import sqlite3
+import argparse
+from collections import Counter, defaultdict
+import numpy as np
+
+# ✅ Lexical index defaults
+LEXICAL_INDEX_PATH = "lexical_index.sqlite3"
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60                 # reciprocal rank fusion constant (rank 1 scores 1/61)
+RRF_CANDIDATES = 50        # candidates taken from each retriever before fusion
+PHRASE_FETCH = 256         # candidate texts fetched per round when verifying a phrase
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+
+
+def tokenize(text):
+    """Lowercased word tokens; apostrophes inside words are kept ("don't", "i'll")."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def phrase_matcher(terms):
+    """
+    Predicate: does a text contain the tokens consecutively (any punctuation or
+    whitespace between them, case ignored)? Token boundaries are lookarounds in
+    the pattern, so a rejected partial match never hides an overlapping one.
+    """
+    pattern = re.compile(r"(?<![a-z0-9'])" + r"[^a-z0-9]+".join(map(re.escape, terms)) + r"(?![a-z0-9])")
+
+    def matches(text):
+        return pattern.search(text.lower()) is not None
+
+    return matches
+
+
+def _pack(values):
+    return zlib.compress(np.asarray(values, dtype=np.uint32).tobytes(), 1)
+
+
+def _unpack(blob):
+    return np.frombuffer(zlib.decompress(blob), dtype=np.uint32)
+
+
+class LexicalIndex:
+    """
+    On-disk BM25 inverted index over subtitle chunks (SQLite file).
+
+    Each `append` call writes one segment: for every term, the doc numbers of
+    that batch are stored delta-encoded and zlib-compressed next to their term
+    frequencies, so postings stay compact and inserts never rewrite old data.
+    Deletes only drop the document row; its postings are skipped at query time
+    and removed for good by `compact()`. Chunk IDs match the Chroma collection,
+    so results from both retrievers can be fused.
+    """
+
+    def __init__(self, path=LEXICAL_INDEX_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS docs (
+                docno INTEGER PRIMARY KEY,
+                chunk_id TEXT UNIQUE NOT NULL,
+                length INTEGER NOT NULL,
+                text TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                segment INTEGER NOT NULL,
+                docnos BLOB NOT NULL,
+                tfs BLOB NOT NULL,
+                PRIMARY KEY (term, segment)
+            ) WITHOUT ROWID;
+        """)
+        for key in ("next_docno", "next_segment", "doc_count", "total_length", "version"):
+            self.conn.execute("INSERT OR IGNORE INTO meta VALUES (?, 0)", (key,))
+        self.conn.commit()
+        self._loaded_version = None
+        self.lengths = np.zeros(0, dtype=np.uint32)
+
+    def _meta(self):
+        return dict(self.conn.execute("SELECT key, value FROM meta"))
+
+    def _refresh(self, meta):
+        """Reload the docno -> length array (0 = deleted) when another writer changed the index."""
+        if meta["version"] == self._loaded_version:
+            return
+        lengths = np.zeros(meta["next_docno"], dtype=np.uint32)
+        rows = np.array(self.conn.execute("SELECT docno, length FROM docs").fetchall(), dtype=np.int64)
+        if len(rows):
+            lengths[rows[:, 0]] = rows[:, 1]
+        self.lengths = lengths
+        self._loaded_version = meta["version"]
+
+    def append(self, ids, texts):
+        """Index one batch of chunks (re-indexing any ID that is already present)."""
+        if not ids:
+            return
+        self.delete(ids, commit=False)
+        meta = self._meta()
+        first = meta["next_docno"]
+        postings = defaultdict(lambda: ([], []))
+        doc_rows = []
+        total = 0
+        for docno, (chunk_id, text) in enumerate(zip(ids, texts), start=first):
+            counts = Counter(tokenize(text))
+            length = sum(counts.values())
+            total += length
+            doc_rows.append((docno, chunk_id, length, text))
+            for term, tf in counts.items():
+                docnos, tfs = postings[term]
+                docnos.append(docno)
+                tfs.append(tf)
+
+        segment = meta["next_segment"]
+        rows = []
+        for term, (docnos, tfs) in postings.items():
+            deltas = np.diff(np.asarray(docnos, dtype=np.int64), prepend=0)
+            rows.append((term, segment, _pack(deltas), _pack(tfs)))
+        with self.conn:
+            self.conn.executemany("INSERT INTO docs VALUES (?, ?, ?, ?)", doc_rows)
+            self.conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)", rows)
+            self.conn.executemany("UPDATE meta SET value = value + ? WHERE key = ?", [
+                (len(ids), "next_docno"), (1, "next_segment"), (len(ids), "doc_count"),
+                (total, "total_length"), (1, "version"),
+            ])
+
+    def delete(self, ids, commit=True):
+        """Remove chunks by ID; their postings are filtered out until the next compact()."""
+        ids = list(ids)
+        removed, removed_length = 0, 0
+        for i in range(0, len(ids), 900):
+            part = ids[i:i + 900]
+            marks = ",".join("?" * len(part))
+            rows = self.conn.execute(f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs "
+                                     f"WHERE chunk_id IN ({marks})", part).fetchone()
+            removed += rows[0]
+            removed_length += rows[1]
+            self.conn.execute(f"DELETE FROM docs WHERE chunk_id IN ({marks})", part)
+        if removed:
+            self.conn.executemany("UPDATE meta SET value = value - ? WHERE key = ?",
+                                  [(removed, "doc_count"), (removed_length, "total_length")])
+            self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        if commit:
+            self.conn.commit()
+
+    def _postings(self, term):
+        """All (docnos, tfs) of a term across segments, deleted documents included."""
+        docnos, tfs = [], []
+        for docno_blob, tf_blob in self.conn.execute(
+                "SELECT docnos, tfs FROM postings WHERE term = ? ORDER BY segment", (term,)):
+            docnos.append(np.cumsum(_unpack(docno_blob), dtype=np.int64))
+            tfs.append(_unpack(tf_blob))
+        if not docnos:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint32)
+        return np.concatenate(docnos), np.concatenate(tfs)
+
+    def _score(self, terms, meta, require_all=False):
+        """BM25 scores for every docno (0 where no query term matches)."""
+        n_docs = max(meta["doc_count"], 1)
+        avg_length = meta["total_length"] / n_docs if meta["total_length"] else 1.0
+        scores = np.zeros(len(self.lengths), dtype=np.float64)
+        matched = np.zeros(len(self.lengths), dtype=np.int32)
+        for term, query_tf in Counter(terms).items():
+            docnos, tfs = self._postings(term)
+            if not len(docnos):
+                if require_all:
+                    return np.zeros_like(scores)
+                continue
+            lengths = self.lengths[docnos]
+            live = lengths > 0
+            docnos, tfs, lengths = docnos[live], tfs[live].astype(np.float64), lengths[live]
+            idf = math.log(1 + (n_docs - len(docnos) + 0.5) / (len(docnos) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / avg_length)
+            weights = query_tf * idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+            scores += np.bincount(docnos, weights=weights, minlength=len(scores))
+            matched += np.bincount(docnos, minlength=len(scores)).astype(np.int32)
+        if require_all:
+            scores[matched < len(set(terms))] = 0.0
+        return scores
+
+    def _docs(self, docnos):
+        marks = ",".join("?" * len(docnos))
+        rows = self.conn.execute(f"SELECT docno, chunk_id, text FROM docs WHERE docno IN ({marks})",
+                                 [int(d) for d in docnos])
+        found = {docno: (chunk_id, text) for docno, chunk_id, text in rows}
+        return [(d, *found[d]) for d in (int(d) for d in docnos) if d in found]
+
+    def _search_one(self, query_text, top_k, phrase):
+        terms = tokenize(query_text)
+        meta = self._meta()
+        self._refresh(meta)
+        if not terms or top_k <= 0 or not len(self.lengths):
+            return [], [], []
+        scores = self._score(terms, meta, require_all=phrase)
+        n_hits = int(np.count_nonzero(scores))
+        if not n_hits:
+            return [], [], []
+        ranked = np.argsort(-scores)[:n_hits]
+
+        if not phrase:
+            best = ranked[:top_k]
+            docs = self._docs(best)
+            return [c for _, c, _ in docs], [t for _, _, t in docs], [float(scores[d]) for d, _, _ in docs]
+
+        # Exact phrase: every term matched, now check the words appear consecutively
+        contains_phrase = phrase_matcher(terms)
+        ids, texts, out_scores = [], [], []
+        for start in range(0, len(ranked), PHRASE_FETCH):
+            for docno, chunk_id, text in self._docs(ranked[start:start + PHRASE_FETCH]):
+                if contains_phrase(text):
+                    ids.append(chunk_id)
+                    texts.append(text)
+                    out_scores.append(float(scores[docno]))
+                    if len(ids) == top_k:
+                        return ids, texts, out_scores
+        return ids, texts, out_scores
+
+    def query(self, query_texts, top_k=5, phrase=False):
+        """
+        BM25 search for each query text. With `phrase=True` only chunks that contain
+        the query words consecutively (case and punctuation ignored) are returned.
+        Returns {"ids": [[...]], "documents": [[...]], "scores": [[...]]}, best first.
+        """
+        results = {"ids": [], "documents": [], "scores": []}
+        for query_text in query_texts:
+            ids, texts, scores = self._search_one(query_text, top_k, phrase)
+            results["ids"].append(ids)
+            results["documents"].append(texts)
+            results["scores"].append(scores)
+        return results
+
+    def count(self):
+        return self._meta()["doc_count"]
+
+    def fingerprint(self):
+        return f"lexical:{self._meta()['version']}"
+
+    def compact(self):
+        """Merge all segments of every term into one and drop postings of deleted chunks."""
+        meta = self._meta()
+        self._loaded_version = None
+        self._refresh(meta)
+        terms = [t for (t,) in self.conn.execute("SELECT DISTINCT term FROM postings")]
+        with self.conn:
+            for term in terms:
+                docnos, tfs = self._postings(term)
+                live = self.lengths[docnos] > 0
+                self.conn.execute("DELETE FROM postings WHERE term = ?", (term,))
+                if live.any():
+                    deltas = np.diff(docnos[live], prepend=0)
+                    self.conn.execute("INSERT INTO postings VALUES (?, 0, ?, ?)",
+                                      (term, _pack(deltas), _pack(tfs[live])))
+            self.conn.execute("UPDATE meta SET value = 1 WHERE key = 'next_segment'")
+            self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        self.conn.execute("VACUUM")
+
+    def close(self):
+        self.conn.close()
+
+
+def reciprocal_rank_fusion(rankings, top_k=5, k=RRF_K):
+    """
+    Fuse ranked lists of (id, document) pairs: each list adds 1 / (k + rank) to an
+    item's score. Returns (ids, documents, scores) of the top_k fused items.
+    """
+    scores, documents = defaultdict(float), {}
+    for ranking in rankings:
+        for rank, (chunk_id, document) in enumerate(ranking, start=1):
+            scores[chunk_id] += 1.0 / (k + rank)
+            documents.setdefault(chunk_id, document)
+    best = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return best, [documents[c] for c in best], [scores[c] for c in best]
+
+
+def hybrid_query(index, backend, query_text, query_embedding, top_k=5, candidates=RRF_CANDIDATES, where=None):
+    """
+    Lexical (BM25) and vector candidates for one query, fused with reciprocal
+    rank fusion. Returns the same shape as LexicalIndex.query, plus the chunk
+    metadatas known from the vector side ({} for lexical-only hits).
+
+    The lexical index stores no metadata, so with a `where` filter only lexical
+    hits that the filtered vector search also returned are kept.
+    """
+    n = max(top_k, candidates)
+    lexical = index.query([query_text], top_k=n)
+    vector = backend.query([query_embedding], top_k=n, where=where)
+    vector_ids = vector["ids"][0] if vector["ids"] else []
+    metadatas = dict(zip(vector_ids, vector["metadatas"][0])) if vector_ids else {}
+    lexical_hits = zip(lexical["ids"][0], lexical["documents"][0])
+    if where:
+        lexical_hits = [(c, d) for c, d in lexical_hits if c in metadatas]
+    ids, documents, scores = reciprocal_rank_fusion([
+        lexical_hits,
+        zip(vector_ids, vector["documents"][0]) if vector_ids else [],
+    ], top_k)
+    return {"ids": [ids], "documents": [documents], "scores": [scores],
+            "metadatas": [[metadatas.get(c, {}) for c in ids]]}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build, compact or query the BM25 lexical index.")
+    parser.add_argument("--index", default=LEXICAL_INDEX_PATH)
+    parser.add_argument("--from-chroma", default=None, metavar="PERSIST_DIR",
+                        help="(Re)index every chunk of an existing Chroma collection")
+    parser.add_argument("--compact", action="store_true", help="Merge segments and purge deleted postings")
+    parser.add_argument("--query", default=None)
+    parser.add_argument("--phrase", action="store_true", help="Exact phrase lookup for --query")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    index = LexicalIndex(args.index)
+    if args.from_chroma:
+        import chromadb
+
+        collection = chromadb.PersistentClient(path=args.from_chroma).get_collection("subtitle_chunks")
+        total = collection.count()
+        for offset in range(0, total, 5000):
+            page = collection.get(include=["documents"], limit=5000, offset=offset)
+            index.append(page["ids"], page["documents"])
+            print(f"🔥 Indexed {min(offset + 5000, total)}/{total} chunks...")
+    if args.compact:
+        index.compact()
+        print("✅ Index compacted.")
+    if args.query:
+        results = index.query([args.query], args.top_k, phrase=args.phrase)
+        for i, (doc, score) in enumerate(zip(results["documents"][0], results["scores"][0]), start=1):
+            print(f"{i}. ({score:.3f}) {doc[:200]}")
+    print(f"📋 {index.count()} chunks indexed in {args.index}")
+    index.close()
@@ -0,0 +1,90 @@
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+
+from search_service import HOST, PORT
+
+# ✅ Load test defaults
+CONCURRENCY = 32
+TOTAL_REQUESTS = 2000
+SAMPLE_QUERIES = [
+    "the ship is sinking", "I will never let go", "where are you going", "tell me the truth",
+    "we have to get out of here", "I love you", "what happened here", "look out behind you",
+    "may the force be with you", "I'll be back", "here's looking at you kid", "you can't handle the truth",
+]
+
+
+async def _request(reader, writer, host, query_text, top_k):
+    body = json.dumps({"query": query_text, "top_k": top_k}).encode("utf-8")
+    writer.write(
+        f"POST /search HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host, port, queries, top_k, latencies, statuses):
+    """One keep-alive connection sending its share of requests back to back."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for query_text in queries:
+            start = time.perf_counter()
+            status = await _request(reader, writer, host, query_text, top_k)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def run_load_test(host=HOST, port=PORT, concurrency=CONCURRENCY, total=TOTAL_REQUESTS, top_k=5, seed=0):
+    rng = random.Random(seed)
+    # Mix repeated popular queries with unique variants so batches are not all identical
+    queries = [f"{rng.choice(SAMPLE_QUERIES)} {i if rng.random() < 0.5 else ''}".strip() for i in range(total)]
+    shares = [queries[i::concurrency] for i in range(concurrency)]
+
+    latencies, statuses = [], Counter()
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, share, top_k, latencies, statuses) for share in shares if share))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pick = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+    return {
+        "requests": len(latencies), "concurrency": concurrency, "seconds": elapsed,
+        "qps": len(latencies) / elapsed, "p50_ms": pick(50), "p90_ms": pick(90), "p99_ms": pick(99),
+        "statuses": dict(statuses),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for search_service.py (p50/p99 latency and QPS).")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--requests", type=int, default=TOTAL_REQUESTS)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load_test(args.host, args.port, args.concurrency, args.requests, args.top_k))
+    print(f"🎯 {result['requests']} requests, concurrency {result['concurrency']}: {result['qps']:.1f} QPS | "
+          f"p50 {result['p50_ms']:.1f}ms | p90 {result['p90_ms']:.1f}ms | p99 {result['p99_ms']:.1f}ms | "
+          f"statuses {result['statuses']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
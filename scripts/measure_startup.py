@@ -0,0 +1,75 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+# ✅ What each scenario loads (each runs in a fresh interpreter so nothing is pre-warmed)
+CHROMA = 'import chromadb; chromadb.PersistentClient(path="chroma_db").get_collection("subtitle_chunks")'
+MINILM = ('from sentence_transformers import SentenceTransformer; '
+          'SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")')
+WHISPER = ('from transformers import pipeline; '
+           'pipeline("automatic-speech-recognition", model="openai/whisper-small")')
+
+SCENARIOS = {
+    "before: eager startup (Chroma + MiniLM + Whisper)": [CHROMA, MINILM, WHISPER],
+    "after: text-only startup (Chroma + MiniLM)": [CHROMA, MINILM],
+    "after: first Audio use (Whisper only)": [WHISPER],
+}
+
+REPORT = """
+import resource, sys, time, json
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+json.dump({{"seconds": elapsed, "peak_rss_mb": peak_kb / 1024}}, sys.stdout)
+"""
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+
+
+def measure_scenario(statements):
+    """Run the statements in a fresh Python process; returns wall time and peak RSS."""
+    code = REPORT.format(code="\n".join(statements))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure_app_reruns(runs=3):
+    """
+    Time real script runs of streamlit_app.py with Streamlit's AppTest harness:
+    the first run pays for loading, later reruns should hit st.cache_resource.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_PATH, default_timeout=600)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure Streamlit app startup time and memory.")
+    parser.add_argument("--skip-app", action="store_true", help="Skip the AppTest rerun measurement")
+    parser.add_argument("--output", default="startup_metrics.json", help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    results = {}
+    for name, statements in SCENARIOS.items():
+        print(f"⏱️ {name}...")
+        results[name] = measure_scenario(statements)
+        print(f"   {results[name]['seconds']:.2f}s, peak RSS {results[name]['peak_rss_mb']:.0f} MB")
+
+    if not args.skip_app:
+        reruns = measure_app_reruns()
+        results["streamlit_app.py runs (first, then cached reruns)"] = reruns
+        print("🔁 App runs: " + ", ".join(f"{t:.2f}s" for t in reruns))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Startup metrics saved to {args.output}")
@@ -0,0 +1,272 @@
+import re
+import zlib
+import sqlite3
+import hashlib
+import argparse
+import numpy as np
+
+from instrumentation import count
+from embedding_store import EMBEDDING_DIM
+
+# ✅ Near-duplicate detection (MinHash signatures + LSH banding over cleaned text)
+DEDUP_PATH = "near_duplicates.sqlite3"
+SHINGLE_WORDS = 5        # word n-grams compared between files
+NUM_PERM = 128           # MinHash signature length
+BANDS = 16               # LSH bands of NUM_PERM // BANDS rows: candidates from ~0.7 Jaccard upwards
+THRESHOLD = 0.8          # estimated Jaccard similarity at which a file counts as a duplicate
+SEED = 1
+MERSENNE = np.uint64((1 << 31) - 1)
+SHINGLE_BLOCK = 50000    # shingles hashed per step (bounds the NUM_PERM x block temporary)
+WORD = re.compile(r"[a-z0-9']+")
+
+
+def shingle_hashes(text, k=SHINGLE_WORDS):
+    """Distinct 31-bit hashes of the word k-shingles of `text` (case and punctuation ignored)."""
+    words = WORD.findall(text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    vocab = {w: zlib.crc32(w.encode("utf-8")) for w in set(words)}
+    word_hashes = np.fromiter((vocab[w] for w in words), dtype=np.uint64, count=len(words))
+    k = min(k, len(words))
+    # Polynomial rolling combination of k consecutive word hashes (uint64 wraps around)
+    combined = np.zeros(len(words) - k + 1, dtype=np.uint64)
+    for j in range(k):
+        combined = combined * np.uint64(1000003) + word_hashes[j:len(words) - k + 1 + j]
+    return np.unique(combined % MERSENNE)
+
+
+class DuplicateIndex:
+    """
+    Persistent MinHash/LSH index of the files already ingested.
+
+    Each new file's cleaned text is reduced to a NUM_PERM MinHash signature and
+    looked up in BANDS LSH buckets; candidates whose estimated Jaccard similarity
+    reaches `threshold` make it an alias of that representative (the first
+    release seen), and it is not chunked or embedded. Otherwise the file becomes
+    a representative itself. Only representatives are bucketed, so clusters
+    never chain through aliases.
+    """
+
+    def __init__(self, path=DEDUP_PATH, threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS, seed=SEED):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, int(MERSENNE), num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, int(MERSENNE), num_perm, dtype=np.uint64)[:, None]
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                source TEXT PRIMARY KEY,
+                representative TEXT NOT NULL,
+                similarity REAL NOT NULL,
+                chunk_count INTEGER NOT NULL DEFAULT 0,
+                chars INTEGER NOT NULL,
+                signature BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS signatures_by_representative ON signatures(representative);
+            CREATE TABLE IF NOT EXISTS buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                source TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS buckets_by_key ON buckets(band, bucket);
+            CREATE INDEX IF NOT EXISTS buckets_by_source ON buckets(source);
+        """)
+        self.conn.commit()
+        self.stats = {"checked_files": 0, "duplicate_files": 0, "skipped_chunks": 0, "skipped_chars": 0}
+        self.new_aliases = set()   # representatives that gained aliases since the last apply_aliases
+
+    def signature(self, text):
+        """MinHash signature (uint32[num_perm]) of the text, or None if it has no words."""
+        hashes = shingle_hashes(text)
+        if not len(hashes):
+            return None
+        signature = np.full(self.num_perm, MERSENNE, dtype=np.uint64)
+        for start in range(0, len(hashes), SHINGLE_BLOCK):
+            block = hashes[start:start + SHINGLE_BLOCK][None, :]
+            signature = np.minimum(signature, ((self.a * block + self.b) % MERSENNE).min(axis=1))
+        return signature.astype(np.uint32)
+
+    def _bucket_keys(self, signature):
+        rows = self.num_perm // self.bands
+        return [(band, int.from_bytes(hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(),
+                                                      digest_size=8).digest(), "little", signed=True))
+                for band in range(self.bands)]
+
+    def find(self, signature):
+        """Best representative with estimated similarity >= threshold: (source, similarity) or (None, 0.0)."""
+        candidates = set()
+        for band, bucket in self._bucket_keys(signature):
+            candidates.update(row[0] for row in self.conn.execute(
+                "SELECT source FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)))
+        best, best_similarity = None, 0.0
+        for source in sorted(candidates):
+            row = self.conn.execute("SELECT signature FROM signatures WHERE source = ?", (source,)).fetchone()
+            similarity = float(np.mean(np.frombuffer(row[0], dtype=np.uint32) == signature))
+            if similarity >= self.threshold and similarity > best_similarity:
+                best, best_similarity = source, similarity
+        return best, best_similarity
+
+    def _forget(self, source):
+        self.conn.execute("DELETE FROM buckets WHERE source = ?", (source,))
+        self.conn.execute("DELETE FROM signatures WHERE source = ?", (source,))
+
+    def check(self, source, text):
+        """
+        Register one cleaned file. Returns the representative it duplicates (the
+        caller skips chunking and embedding it), or None if it must be ingested.
+        """
+        self.stats["checked_files"] += 1
+        signature = self.signature(text)
+        # A changed file is re-evaluated from scratch; its own aliases keep pointing at it
+        self._forget(source)
+        if signature is None:
+            self.conn.commit()
+            return None
+        representative, similarity = self.find(signature)
+        if representative is None:
+            self.conn.execute(
+                "INSERT INTO signatures (source, representative, similarity, chars, signature) VALUES (?, ?, 1.0, ?, ?)",
+                (source, source, len(text), signature.tobytes()))
+            self.conn.executemany("INSERT INTO buckets (band, bucket, source) VALUES (?, ?, ?)",
+                                  [(band, bucket, source) for band, bucket in self._bucket_keys(signature)])
+            self.conn.commit()
+            return None
+
+        self.conn.execute(
+            "INSERT INTO signatures (source, representative, similarity, chars, signature) VALUES (?, ?, ?, ?, ?)",
+            (source, representative, similarity, len(text), signature.tobytes()))
+        self.conn.commit()
+        skipped = self.conn.execute("SELECT chunk_count FROM signatures WHERE source = ?",
+                                    (representative,)).fetchone()[0]
+        self.stats["duplicate_files"] += 1
+        self.stats["skipped_chunks"] += skipped
+        self.stats["skipped_chars"] += len(text)
+        count("near_duplicate_files_total")
+        count("near_duplicate_chunks_total", skipped)
+        self.new_aliases.add(representative)
+        return representative
+
+    def set_chunk_count(self, source, chunk_count):
+        """Remember how many chunks a representative produced (what each of its aliases saves)."""
+        self.conn.execute("UPDATE signatures SET chunk_count = ? WHERE source = ?", (chunk_count, source))
+        self.conn.commit()
+
+    def aliases(self, representative):
+        return [row[0] for row in self.conn.execute(
+            "SELECT source FROM signatures WHERE representative = ? AND source != ? ORDER BY source",
+            (representative, representative))]
+
+    def remove(self, source):
+        """
+        Drop a file that no longer exists. If it was a representative, its
+        aliases are dropped too and returned: they must be ingested again.
+        """
+        orphans = self.aliases(source)
+        for alias in orphans:
+            self._forget(alias)
+        self._forget(source)
+        self.conn.commit()
+        self.new_aliases.discard(source)
+        return orphans
+
+    def report(self, chunks_per_sec=None, dim=EMBEDDING_DIM):
+        """
+        What deduplication saved: skipped files, chunks and bytes across the whole
+        index (and for this run), with encode time estimated from `chunks_per_sec`.
+        """
+        total_files, duplicate_files, skipped_chars = self.conn.execute(
+            "SELECT COUNT(*), SUM(source != representative), SUM(CASE WHEN source != representative THEN chars END) "
+            "FROM signatures").fetchone()
+        skipped_chunks = self.conn.execute(
+            "SELECT COALESCE(SUM(r.chunk_count), 0) FROM signatures a JOIN signatures r ON r.source = a.representative "
+            "WHERE a.source != a.representative").fetchone()[0]
+        largest = self.conn.execute(
+            "SELECT representative, COUNT(*) - 1 AS n FROM signatures GROUP BY representative HAVING n > 0 "
+            "ORDER BY n DESC, representative LIMIT 10").fetchall()
+        report = {
+            "files": total_files,
+            "duplicate_files": duplicate_files or 0,
+            "skipped_chunks": skipped_chunks,
+            # float32 vectors plus chunk text (cleaned characters as a proxy for stored bytes)
+            "skipped_bytes": skipped_chunks * dim * 4 + (skipped_chars or 0),
+            "largest_clusters": [{"representative": r, "aliases": n} for r, n in largest],
+            "this_run": dict(self.stats),
+        }
+        if chunks_per_sec:
+            report["skipped_encode_seconds"] = skipped_chunks / chunks_per_sec
+            report["this_run"]["skipped_encode_seconds"] = self.stats["skipped_chunks"] / chunks_per_sec
+        return report
+
+    def close(self):
+        self.conn.close()
+
+
+def apply_aliases(dedup, collection, chunk_ids):
+    """
+    Record each representative's aliases in the metadata of its chunks
+    ("aliases": "zip/file | zip/file ...", "alias_count": n). `chunk_ids(source)`
+    returns the committed chunk IDs of a file (e.g. IngestManifest.committed_chunk_ids).
+    """
+    for representative in sorted(dedup.new_aliases):
+        ids = sorted(chunk_ids(representative))
+        if not ids:
+            continue
+        aliases = dedup.aliases(representative)
+        metadata = {"aliases": " | ".join(aliases), "alias_count": len(aliases)}
+        collection.update(ids=ids, metadatas=[metadata] * len(ids))
+    dedup.new_aliases.clear()
+
+
+def format_report(report):
+    lines = [f"🧬 Near-duplicates: {report['duplicate_files']} of {report['files']} files are aliases | "
+             f"{report['skipped_chunks']} chunks and {report['skipped_bytes'] / 1e6:.1f}MB not embedded"
+             + (f" (~{report['skipped_encode_seconds']:.0f}s of encoding)" if "skipped_encode_seconds" in report else "")]
+    run = report["this_run"]
+    if run["checked_files"]:
+        lines.append(f"   this run: {run['duplicate_files']} of {run['checked_files']} checked files skipped, "
+                     f"{run['skipped_chunks']} chunks"
+                     + (f" (~{run['skipped_encode_seconds']:.0f}s)" if "skipped_encode_seconds" in run else ""))
+    for cluster in report["largest_clusters"][:5]:
+        lines.append(f"   {cluster['aliases']:>4} aliases of {cluster['representative']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import json
+
+    parser = argparse.ArgumentParser(description="Near-duplicate subtitle detection: report or dry-run scan.")
+    parser.add_argument("--index", default=DEDUP_PATH)
+    parser.add_argument("--scan", default=None, metavar="DB",
+                        help="Dry run: check every subtitle file of a zipfiles database against --index")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--chunks-per-sec", type=float, default=None,
+                        help="Measured encoding throughput, to estimate the compute saved")
+    parser.add_argument("--output", default=None, help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    dedup = DuplicateIndex(args.index, args.threshold)
+    if args.scan:
+        from stream_ingest import iter_zip_rows, iter_subtitle_files
+        from clean_subtitles import clean_subtitle
+        from chunk_subtitles import chunk_text
+
+        for zip_name, file_name, text in iter_subtitle_files(iter_zip_rows(args.scan)):
+            source = f"{zip_name}/{file_name}"
+            cleaned = clean_subtitle(text, file_name)
+            if dedup.check(source, cleaned) is None:
+                # Legacy 500-word chunk count as the estimate of what each alias saves
+                dedup.set_chunk_count(source, len(chunk_text(cleaned)))
+            if dedup.stats["checked_files"] % 1000 == 0:
+                print(f"🔥 Checked {dedup.stats['checked_files']} files...")
+
+    report = dedup.report(args.chunks_per_sec)
+    dedup.close()
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📂 Report written to {args.output}")
@@ -0,0 +1,183 @@
+import os
+import json
+import argparse
+import numpy as np
+
+from embedding_engine import MODEL_NAME
+
+# ✅ Exported model location and runtime defaults
+ONNX_DIR = "onnx_minilm"            # model.onnx, model_int8.onnx, tokenizer files and encoder.json
+OPSET = 17
+INTRA_OP_THREADS = None             # None = ONNX Runtime's default (one per physical core)
+ENCODE_BATCH_SIZE = 64
+PARITY_MIN_COSINE = 0.99            # int8 typically stays above this; fp32 matches to ~1e-6
+
+
+def model_path(onnx_dir, quantized):
+    return os.path.join(onnx_dir, "model_int8.onnx" if quantized else "model.onnx")
+
+
+def export_onnx(model_name=MODEL_NAME, onnx_dir=ONNX_DIR, quantize=True, model=None):
+    """
+    Export the SentenceTransformer's transformer to ONNX (dynamic batch and
+    sequence axes), save its tokenizer next to it and, with `quantize`, write a
+    dynamically quantized int8 copy (int8 weights, activations quantized on the
+    fly). Mean pooling and normalization run in NumPy, so only the encoder is exported.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if model is None:
+        model = SentenceTransformer(model_name, device="cpu")
+    pooling = model[1]
+    # sentence-transformers < 6 names the mode through get_pooling_mode_str()
+    mode = pooling.get_pooling_mode_str() if hasattr(pooling, "get_pooling_mode_str") else pooling.pooling_mode
+    if mode != "mean":
+        raise ValueError(f"Only mean pooling is supported, {model_name} uses {mode!r}")
+    normalize = any(type(module).__name__ == "Normalize" for module in model)
+    transformer = model[0].auto_model.eval()
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    os.makedirs(onnx_dir, exist_ok=True)
+    sample = model.tokenizer(["an example subtitle line", "and another one"], padding=True, return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(LastHiddenState(transformer), tuple(sample[name] for name in names),
+                          model_path(onnx_dir, False), input_names=names, output_names=["last_hidden_state"],
+                          dynamic_axes=axes, opset_version=OPSET, dynamo=False)
+    model.tokenizer.save_pretrained(onnx_dir)
+    with open(os.path.join(onnx_dir, "encoder.json"), "w", encoding="utf-8") as f:
+        json.dump({"model_name": model_name, "max_seq_length": model.max_seq_length, "normalize": normalize,
+                   "dim": model.get_sentence_embedding_dimension()}, f, indent=2)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(model_path(onnx_dir, False), model_path(onnx_dir, True), weight_type=QuantType.QInt8)
+    return onnx_dir
+
+
+class OnnxEncoder:
+    """
+    ONNX Runtime replacement for SentenceTransformer.encode on CPU.
+
+    Texts are tokenized once without padding, sorted by length and batched,
+    so each batch is padded only to its own longest text instead of every
+    batch to the model window. Results come back in input order. It exposes
+    `encode`, `tokenizer` and `max_seq_length`, so it can stand in for the
+    SentenceTransformer in EmbeddingEngine, the token chunker and the query paths.
+    """
+
+    def __init__(self, onnx_dir=ONNX_DIR, quantized=False, threads=INTRA_OP_THREADS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(onnx_dir, "encoder.json"), "r", encoding="utf-8") as f:
+            config = json.load(f)
+        self.max_seq_length = config["max_seq_length"]
+        self.normalize = config["normalize"]
+        self.dim = config["dim"]
+        self.quantized = quantized
+        self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1    # one graph at a time; parallelism comes from intra-op threads
+        if threads:
+            options.intra_op_num_threads = threads
+        self.threads = threads
+        self.session = ort.InferenceSession(model_path(onnx_dir, quantized), options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.pad_id = self.tokenizer.pad_token_id or 0
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def _run(self, ids):
+        """One forward pass over token ID lists, padded to the longest; returns pooled embeddings."""
+        length = max(len(row) for row in ids)
+        input_ids = np.full((len(ids), length), self.pad_id, dtype=np.int64)
+        mask = np.zeros((len(ids), length), dtype=np.int64)
+        for i, row in enumerate(ids):
+            input_ids[i, :len(row)] = row
+            mask[i, :len(row)] = 1
+        feeds = {"input_ids": input_ids, "attention_mask": mask, "token_type_ids": np.zeros_like(input_ids)}
+        hidden = self.session.run(None, {name: feeds[name] for name in self.input_names})[0]
+        # Mean pooling over real tokens, like sentence-transformers' Pooling module
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        if self.normalize:
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled
+
+    def encode(self, texts, batch_size=ENCODE_BATCH_SIZE, show_progress_bar=False, **kwargs):
+        """Same contract as SentenceTransformer.encode: a float32 array (1-D for a single string)."""
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        if len(texts) == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        ids = self.tokenizer(list(texts), truncation=True, max_length=self.max_seq_length)["input_ids"]
+        order = sorted(range(len(ids)), key=lambda i: len(ids[i]))
+        out = np.empty((len(ids), self.dim), dtype=np.float32)
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            out[rows] = self._run([ids[i] for i in rows])
+        return out[0] if single else out
+
+
+def load_onnx_encoder(model_name=MODEL_NAME, onnx_dir=ONNX_DIR, quantized=False, threads=INTRA_OP_THREADS):
+    """OnnxEncoder for `model_name`, exporting (and quantizing) it into `onnx_dir` on first use."""
+    if not os.path.exists(model_path(onnx_dir, quantized)):
+        print(f"⚙️ Exporting {model_name} to ONNX in {onnx_dir}...")
+        export_onnx(model_name, onnx_dir, quantize=quantized)
+    return OnnxEncoder(onnx_dir, quantized=quantized, threads=threads)
+
+
+def parity_check(reference, encoder, texts, batch_size=ENCODE_BATCH_SIZE):
+    """
+    Cosine agreement between `reference` (the SentenceTransformer) and
+    `encoder` on the same texts: min/mean/p1 cosine similarity per text.
+    """
+    expected = np.asarray(reference.encode(texts, batch_size=batch_size, show_progress_bar=False), dtype=np.float32)
+    actual = np.asarray(encoder.encode(texts, batch_size=batch_size), dtype=np.float32)
+    cosine = (expected * actual).sum(axis=1) / (np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1))
+    return {"texts": len(texts), "min_cosine": float(cosine.min()), "mean_cosine": float(cosine.mean()),
+            "p1_cosine": float(np.percentile(cosine, 1))}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX (+ int8) and check parity.")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--output", default=ONNX_DIR, help="Directory for the exported model and tokenizer")
+    parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 copy")
+    parser.add_argument("--parity-texts", type=int, default=500, help="Synthetic subtitle chunks for the parity check")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    from synthetic_corpus import generate_files
+    from chunk_subtitles import chunk_text
+    from clean_subtitles import clean_subtitle
+
+    reference = SentenceTransformer(args.model, device="cpu")
+    export_onnx(args.model, args.output, quantize=not args.no_quantize, model=reference)
+    print(f"✅ Exported {args.model} to {args.output}")
+
+    texts = [chunk for name, body in generate_files(50, 200) for chunk in chunk_text(clean_subtitle(body, name), 120, 0)]
+    texts = texts[:args.parity_texts]
+    for quantized in ([False] if args.no_quantize else [False, True]):
+        report = parity_check(reference, OnnxEncoder(args.output, quantized=quantized), texts)
+        status = "✅" if report["min_cosine"] >= PARITY_MIN_COSINE else "❌"
+        print(f"{status} {'int8' if quantized else 'fp32'} parity over {report['texts']} texts: "
+              f"min cosine {report['min_cosine']:.5f} | mean {report['mean_cosine']:.5f} | p1 {report['p1_cosine']:.5f}")
@@ -0,0 +1,229 @@
+import os
+import re
+import json
+import time
+import atexit
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# ✅ Cache defaults
+MAX_ENTRIES = 1000
+TTL_SECONDS = 3600           # None = entries never expire
+SEMANTIC_THRESHOLD = None    # e.g. 0.95 enables "semantic hit" mode (cosine similarity)
+SAVE_EVERY = 50              # `maybe_save` rewrites the file after this many new entries...
+SAVE_INTERVAL_SECONDS = 60   # ...or when this long has passed since the last save (and at exit)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query_text):
+    """Cache key form of a query: lower-cased with whitespace collapsed."""
+    return _WHITESPACE.sub(" ", query_text).strip().lower()
+
+
+def filter_key(where):
+    """Cache key form of a metadata filter: kept verbatim (filters such as file names are case-sensitive)."""
+    return json.dumps(where, sort_keys=True) if where else ""
+
+
+class QueryCache:
+    """
+    Bounded LRU + TTL cache for search results, keyed by (normalized query, top_k,
+    `where` filter).
+
+    - `get` is checked before the query is encoded, so exact repeats skip both the
+      model and the collection.
+    - `get_semantic` (if a threshold is set) returns the results of a cached query
+      whose embedding is within `semantic_threshold` cosine similarity.
+    - `check_version` clears everything when the collection fingerprint changes.
+    - `save` / the `persist_path` argument keep entries across restarts (JSON);
+      `maybe_save` only writes every SAVE_EVERY inserts or SAVE_INTERVAL_SECONDS.
+
+    Query embeddings live in one preallocated unit-norm matrix (a row per
+    entry), so a semantic lookup is a single matrix-vector product.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl_seconds=TTL_SECONDS, persist_path=None,
+                 semantic_threshold=SEMANTIC_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.semantic_threshold = semantic_threshold
+        self.entries = OrderedDict()   # key -> {"results", "slot", "top_k", "created", "cost"}
+        self.version = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        # Semantic index: row `slot` of `vectors` belongs to the entry holding that slot
+        self.vectors = None                              # allocated on the first embedding (dim known then)
+        self.slot_top_k = np.full(max_entries, -1, dtype=np.int64)   # -1 = free slot
+        self.slot_created = np.zeros(max_entries, dtype=np.float64)
+        self.slot_keys = [None] * max_entries
+        self.free_slots = list(range(max_entries - 1, -1, -1))
+        self.unsaved = 0
+        self.last_save = time.time()
+        if persist_path:
+            if os.path.exists(persist_path):
+                self._load()
+            atexit.register(self.save)
+
+    def _key(self, query_text, top_k, where=None):
+        key = f"{top_k}\x00{normalize_query(query_text)}"
+        return f"{key}\x00{filter_key(where)}" if where else key
+
+    def _set_embedding(self, key, entry, embedding):
+        """Store a unit-norm copy of `embedding` in a free row of the matrix."""
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        if self.vectors is None:
+            self.vectors = np.zeros((self.max_entries, len(query)), dtype=np.float32)
+        if len(query) != self.vectors.shape[1] or not self.free_slots:
+            return
+        slot = self.free_slots.pop()
+        self.vectors[slot] = query / max(np.linalg.norm(query), 1e-12)
+        self.slot_top_k[slot] = entry["top_k"]
+        self.slot_created[slot] = entry["created"]
+        self.slot_keys[slot] = key
+        entry["slot"] = slot
+
+    def _release(self, entry):
+        slot = entry.get("slot")
+        if slot is not None:
+            self.slot_top_k[slot] = -1
+            self.slot_keys[slot] = None
+            self.free_slots.append(slot)
+            entry["slot"] = None
+
+    def _remove(self, key):
+        self._release(self.entries.pop(key))
+
+    def _clear(self):
+        for entry in self.entries.values():
+            self._release(entry)
+        self.entries.clear()
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            self._release(self.entries.popitem(last=False)[1])
+
+    def _expired(self, entry, now):
+        return self.ttl_seconds is not None and now - entry["created"] > self.ttl_seconds
+
+    def check_version(self, version):
+        """Invalidate all entries if the collection changed since they were cached."""
+        with self.lock:
+            if version != self.version:
+                self._clear()
+                self.version = version
+
+    def get(self, query_text, top_k, where=None):
+        """Exact lookup on the normalized query text (and the filter); returns cached results or None."""
+        key = self._key(query_text, top_k, where)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or self._expired(entry, now):
+                if entry is not None:
+                    self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry["cost"]
+            return entry["results"]
+
+    def get_semantic(self, query_embedding, top_k):
+        """Return results of the closest cached query with the same top_k if it is similar enough."""
+        if self.semantic_threshold is None:
+            return None
+        now = time.time()
+        with self.lock:
+            if self.vectors is None:
+                return None
+            eligible = self.slot_top_k == top_k
+            if self.ttl_seconds is not None:
+                eligible &= self.slot_created >= now - self.ttl_seconds
+            if not eligible.any():
+                return None
+            query = np.asarray(query_embedding, dtype=np.float32).ravel()
+            sims = self.vectors @ query / max(np.linalg.norm(query), 1e-12)
+            sims[~eligible] = -np.inf
+            best = int(np.argmax(sims))
+            if sims[best] < self.semantic_threshold:
+                return None
+            key = self.slot_keys[best]
+            entry = self.entries[key]
+            self.entries.move_to_end(key)
+            self.semantic_hits += 1
+            self.saved_seconds += entry["cost"]
+            return entry["results"]
+
+    def record_miss(self):
+        with self.lock:
+            self.misses += 1
+
+    def put(self, query_text, top_k, results, query_embedding=None, cost_seconds=0.0, where=None):
+        """Store results; `cost_seconds` is what a future hit saves (encode + query time)."""
+        key = self._key(query_text, top_k, where)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            entry = {"results": results, "slot": None, "top_k": top_k, "created": time.time(), "cost": cost_seconds}
+            self.entries[key] = entry
+            self._evict()
+            if query_embedding is not None:
+                self._set_embedding(key, entry, query_embedding)
+            self.unsaved += 1
+
+    def stats(self):
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds,
+        }
+
+    def maybe_save(self):
+        """`save` after SAVE_EVERY new entries or SAVE_INTERVAL_SECONDS, so most requests skip the rewrite."""
+        if self.unsaved and (self.unsaved >= SAVE_EVERY or time.time() - self.last_save >= SAVE_INTERVAL_SECONDS):
+            self.save()
+
+    def save(self):
+        if not self.persist_path or not self.unsaved:
+            return
+        with self.lock:
+            entries = []
+            for key, entry in self.entries.items():
+                slot = entry.get("slot")
+                embedding = None if slot is None else self.vectors[slot].tolist()
+                entries.append((key, {**{k: v for k, v in entry.items() if k != "slot"}, "embedding": embedding}))
+            data = {"version": self.version, "entries": entries}
+            self.unsaved = 0
+            self.last_save = time.time()
+        tmp_path = self.persist_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.persist_path)
+
+    def _load(self):
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.version = data.get("version")
+        now = time.time()
+        for key, entry in data.get("entries", []):
+            if not self._expired(entry, now):
+                embedding = entry.pop("embedding", None)
+                entry["slot"] = None
+                if key in self.entries:
+                    self._remove(key)
+                self.entries[key] = entry
+                self._evict()
+                if embedding is not None:
+                    self._set_embedding(key, entry, embedding)
@@ -1,75 +1,47 @@
 import chromadb
 import os
-from transformers import pipeline
-from sentence_transformers import SentenceTransformer
-import re
 
-# 1. Initialize Chroma and load your collection
-
-client = chromadb.PersistentClient(path="chroma_db")  # Update path if needed
-collection_name = "subtitle_chunks"  # Your collection name
-
-collections = client.list_collections()
-if collection_name not in collections:
-    print(f"❌ Collection '{collection_name}' not found in ChromaDB! Check your database.")
-    exit()
+from search_backends import get_backend, ChromaBackend
+from embedding_engine import load_encoder
+from sharding import read_layout
+from chunk_metadata import build_where, format_timestamp
+from text_cleanup import cleanup_document
+from cue_index import attach_snippets
+from transcriber import get_transcriber
 
-collection = client.get_collection(collection_name)
+# Retrieval backend: "chroma" (HNSW via ChromaDB), "numpy" (exact search over the embedding store), "int8" or "binary"
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "chroma")
 
-# 2. Load your models (Whisper + SentenceTransformer)
-
-whisper_model = pipeline("automatic-speech-recognition", model="openai/whisper-small")
-embedding_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+# 1. Initialize Chroma and load your collection
+# (called under __main__: shard worker processes re-import this module, so it must not open anything on import)
+
+def open_backend(persist_dir="chroma_db", collection_name="subtitle_chunks"):  # Update path if needed
+    if SEARCH_BACKEND != "chroma":
+        return get_backend(SEARCH_BACKEND)
+    if read_layout(persist_dir) is not None:
+        # Sharded layout: one worker process per shard, top-k merged across shards
+        return get_backend("chroma", persist_dir=persist_dir)
+    client = chromadb.PersistentClient(path=persist_dir)
+    collections = client.list_collections()
+    if collection_name not in collections:
+        print(f"❌ Collection '{collection_name}' not found in ChromaDB! Check your database.")
+        exit()
+    return ChromaBackend(client.get_collection(collection_name))
+
+# 2. Load your models (the query encoder in __main__; Whisper only on the first audio query)
 
 def get_query_embedding(query_text):
     """Convert query text into an embedding."""
     return embedding_model.encode(query_text).tolist()
 
-# 3. Cleanup function to remove unwanted parts
-
-def cleanup_subtitle_text(text):
-    """
-    Example: Remove .org, 'www.opensubtitles.org', 'score', etc.
-    Then trim or handle lines as you like.
-    """
-    if not text:
-        return ""
-    
-    # Remove URLs
-    text = re.sub(r'http\S+', '', text)
-
-    # Remove occurrences of domain
-    text = re.sub(r'www\.opensubtitles\.org', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\.org', '', text, flags=re.IGNORECASE)
-
-    # Remove 'score' references, 'download', etc.
-    skip_phrases = ["download", "score", "uploader", "subtitles", "the benchmark", "we set the standards"]
-    lines = text.splitlines()
-    cleaned_lines = []
-    for line in lines:
-        lower_line = line.lower()
-        # skip if any phrase is found
-        if any(skip in lower_line for skip in skip_phrases):
-            continue
-        # remove extra spaces
-        line = re.sub(r"\s+", " ", line).strip()
-        if line:
-            cleaned_lines.append(line)
-
-    cleaned_text = " ".join(cleaned_lines)
-
-    # Optionally limit to e.g. 300 chars:
-    max_len = 300
-    if len(cleaned_text) > max_len:
-        cleaned_text = cleaned_text[:max_len] + "..."
-    
-    return cleaned_text
+# 3. Display: chunks with a cue index get the best-matching cue window and its timestamp (cue_index.attach_snippets);
+#    older chunks fall back to the cleanup shared with the Streamlit app (text_cleanup.cleanup_document)
 
 # 4. Searching in ChromaDB
 
-def search_in_chromadb(query_text, top_k=5):
+def search_in_chromadb(query_text, top_k=5, where=None):
     query_embedding = get_query_embedding(query_text)
-    results = collection.query(query_embeddings=[query_embedding], n_results=top_k)
+    results = backend.query([query_embedding], top_k=top_k, where=where)
 
     if not results["documents"]:
         print("❌ No matching results found.")
@@ -78,17 +50,25 @@ def search_in_chromadb(query_text, top_k=5):
     # We get documents & distances
     docs = results["documents"][0]
     dists = results["distances"][0]
+    metas = attach_snippets(query_embedding, docs, results["metadatas"][0])
 
     # Sort them by distance in DESCENDING order (largest distance first)
     # If you want best match first, you'd sort ascending instead!
-    combined = list(zip(docs, dists))
+    combined = list(zip(docs, dists, metas))
     combined.sort(key=lambda x: x[1], reverse=True)  # reverse=True => descending
 
     print("\n🔍 **Search Results (descending distance)**:")
-    for idx, (subtitle, dist) in enumerate(combined, start=1):
-        # Clean up the text
-        cleaned = cleanup_subtitle_text(subtitle)
-        print(f"{idx}. {cleaned} (Score: {dist:.4f})")
+    for idx, (subtitle, dist, meta) in enumerate(combined, start=1):
+        # Ready-made snippet when the chunk has a cue index, otherwise clean up the text
+        if "snippet" in meta:
+            cleaned = f"[{format_timestamp(meta['snippet_start'])}] {meta['snippet']}"
+        else:
+            cleaned = cleanup_document(subtitle)
+        title = ""
+        if meta.get("title"):
+            year = f" ({meta['year']})" if "year" in meta else ""
+            title = f"[{meta['title']}{year}] "
+        print(f"{idx}. {title}{cleaned} (Score: {dist:.4f})")
 
 # 5. Handling user input (text or audio)
 def get_user_query(input_type="text"):
@@ -101,11 +81,16 @@ def get_user_query(input_type="text"):
             print("❌ File not found!")
             return None
         print("🎧 Transcribing audio with Whisper...")
-        result = whisper_model(audio_path, return_timestamps=False)
-        return result["text"]
+        return get_transcriber().transcribe_file(audio_path)
 
 # 6. Run
 if __name__ == "__main__":
+    backend = open_backend()
+    # ENCODER_BACKEND=onnx or onnx-int8 runs the query encoder on ONNX Runtime
+    embedding_model = load_encoder("sentence-transformers/all-MiniLM-L6-v2", os.environ.get("ENCODER_BACKEND", "torch"))
     user_query = get_user_query(input_type="text")  # or "audio"
     if user_query:
-        search_in_chromadb(user_query, top_k=5)
+        # Optional filters, e.g. SEARCH_TITLE="The Matrix" SEARCH_YEAR=1999
+        where = build_where(os.environ.get("SEARCH_TITLE"), os.environ.get("SEARCH_YEAR"),
+                            os.environ.get("SEARCH_FILE"))
+        search_in_chromadb(user_query, top_k=5, where=where)
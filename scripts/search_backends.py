@@ -0,0 +1,357 @@
+import os
+import json
+import numpy as np
+
+from embedding_store import EmbeddingStoreReader, STORE_DIR, META_FILE, DELETED_FILE
+
+# ✅ Retrieval defaults
+PERSIST_DIR = "chroma_db"
+COLLECTION_NAME = "subtitle_chunks"
+BLOCK_ROWS = 65536    # rows scored per matmul in the NumPy backend (bounds temporary memory)
+# Quantized backends re-score top_k * factor candidates at full precision (binary codes need a wider net)
+RERANK_FACTOR = {"int8": 4, "binary": 50}
+QUANT_FILE = "quantized_{mode}.npz"
+INT8_CONVERT_ROWS = 1024   # int8 codes are widened to float32 in cache-sized pieces before the matmul
+FILTER_CACHE_SIZE = 64     # `where` filters whose matching rows are kept in memory
+# Distance scale of the NumPy backends. "l2" matches the subtitle_chunks collection, which is created
+# with Chroma's default space (squared L2); "cosine" matches collections made with {"hnsw:space": "cosine"}
+DISTANCE_SPACE = "l2"
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def hamming_distances(codes, query_bits):
+    """Bit differences between one packed query and every packed row (uint64 words when possible)."""
+    diff = np.bitwise_xor(codes, query_bits)
+    if hasattr(np, "bitwise_count"):    # NumPy >= 2.0 has a native popcount
+        return np.bitwise_count(diff).sum(axis=1, dtype=np.int32)
+    return POPCOUNT[diff.view(np.uint8)].sum(axis=1, dtype=np.int32)
+
+
+def merge_top(best_scores, best_rows, scores, rows, k):
+    """Merge one block's scores (rows: their positions) into the running per-query top k."""
+    cand_scores = np.concatenate([best_scores, scores], axis=1)
+    cand_rows = np.concatenate([best_rows, np.broadcast_to(rows, scores.shape)], axis=1)
+    if cand_scores.shape[1] > k:
+        keep = np.argpartition(-cand_scores, k - 1, axis=1)[:, :k]
+    else:
+        keep = np.broadcast_to(np.arange(cand_scores.shape[1]), cand_scores.shape)
+    return np.take_along_axis(cand_scores, keep, axis=1), np.take_along_axis(cand_rows, keep, axis=1)
+
+
+class SearchBackend:
+    """
+    Common interface for retrieval backends.
+
+    `query` takes a list of query embeddings and returns a Chroma-shaped dict
+    ({"ids": [[...]], "documents": [[...]], "distances": [[...]], "metadatas": [[...]]})
+    so callers can switch backends without changing how they read results.
+    An optional Chroma-style `where` filter restricts the search to chunks
+    whose metadata matches (see chunk_metadata.build_where).
+    """
+
+    name = "base"
+
+    def query(self, query_embeddings, top_k=5, where=None):
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def fingerprint(self):
+        """Cheap string that changes whenever the indexed data changes (used for cache invalidation)."""
+        raise NotImplementedError
+
+
+def _check_space(space):
+    if space not in ("l2", "cosine"):
+        raise ValueError(f"Unknown distance space: {space!r} (expected 'l2' or 'cosine')")
+    return space
+
+
+def _mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else 0.0
+
+
+class ChromaBackend(SearchBackend):
+    """The existing path: HNSW search through `collection.query`."""
+
+    name = "chroma"
+
+    def __init__(self, collection=None, persist_dir=PERSIST_DIR, collection_name=COLLECTION_NAME):
+        if collection is None:
+            import chromadb
+            collection = chromadb.PersistentClient(path=persist_dir).get_collection(collection_name)
+        self.collection = collection
+        self.persist_dir = persist_dir
+
+    def query(self, query_embeddings, top_k=5, where=None):
+        kwargs = {"where": where} if where else {}
+        results = self.collection.query(query_embeddings=query_embeddings, n_results=top_k, **kwargs)
+        metadatas = results.get("metadatas") or [[None] * len(ids) for ids in results["ids"]]
+        return {"ids": results["ids"], "documents": results["documents"], "distances": results["distances"],
+                "metadatas": [[m or {} for m in row] for row in metadatas]}
+
+    def count(self):
+        return self.collection.count()
+
+    def fingerprint(self):
+        return f"chroma:{self.count()}:{_mtime(os.path.join(self.persist_dir, 'chroma.sqlite3'))}"
+
+
+class NumpyBackend(SearchBackend):
+    """
+    Exact top-k cosine search over the memory-mapped EmbeddingStore matrix.
+
+    Rows are scored in blocks of `block_rows` with one BLAS matmul per block
+    (all queries at once), and a running top-k is kept with argpartition, so
+    memory stays bounded however large the store is. Distances use the same
+    scale as the Chroma collection: with `space="l2"` (Chroma's default) the
+    squared L2 distance between unit vectors, 2 * (1 - cosine similarity);
+    with `space="cosine"`, 1 - cosine similarity.
+    """
+
+    name = "numpy"
+
+    def __init__(self, store_dir=STORE_DIR, block_rows=BLOCK_ROWS, space=DISTANCE_SPACE):
+        self.store = EmbeddingStoreReader(store_dir)
+        self.block_rows = block_rows
+        self.space = _check_space(space)
+        live = self.store.live_rows
+        # When every row is live the blocks are plain slices of the memmap (no copy)
+        self.contiguous = len(live) == self.store.count
+        self._filters = {}
+        self.inv_norms = np.empty(len(live), dtype=np.float32)
+        for start in range(0, len(live), block_rows):
+            block = self._block(start, start + block_rows)
+            norms = np.linalg.norm(block.astype(np.float32, copy=False), axis=1)
+            self.inv_norms[start:start + len(block)] = 1.0 / np.maximum(norms, 1e-12)
+
+    def _block(self, start, end):
+        if self.contiguous:
+            return self.store.vectors[start:end]
+        return self.store.vectors[self.store.live_rows[start:end]]
+
+    def _positions(self, where):
+        """Positions into live_rows matching `where` (None = all rows), cached per filter."""
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True)
+        if key not in self._filters:
+            if len(self._filters) >= FILTER_CACHE_SIZE:
+                self._filters.pop(next(iter(self._filters)))
+            self._filters[key] = self.store.filter_live(where)
+        return self._filters[key]
+
+    def _results(self, positions, scores):
+        """Chroma-shaped results from per-query positions into live_rows and cosine similarities."""
+        out = {"ids": [], "documents": [], "distances": [], "metadatas": []}
+        for q_positions, q_scores in zip(positions, scores):
+            rows = self.store.live_rows[q_positions]
+            out["ids"].append([self.store.ids[r] for r in rows])
+            out["documents"].append([self.store.text(r) for r in rows])
+            scale = 2.0 if self.space == "l2" else 1.0
+            out["distances"].append([float(scale * (1.0 - s)) for s in q_scores])
+            out["metadatas"].append([self.store.metadata(r) for r in rows])
+        return out
+
+    def query(self, query_embeddings, top_k=5, where=None):
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.store.dim)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        positions = self._positions(where)
+        n_queries = len(queries)
+        n_rows = len(self.store.live_rows) if positions is None else len(positions)
+        top_k = min(top_k, n_rows)
+        if top_k == 0:
+            return self._results([[] for _ in queries], [[] for _ in queries])
+
+        best_scores = np.full((n_queries, 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((n_queries, 0), dtype=np.int64)
+        for start in range(0, n_rows, self.block_rows):
+            if positions is None:
+                block = self._block(start, start + self.block_rows)
+                rows = np.arange(start, start + len(block))
+                inv_norms = self.inv_norms[start:start + len(block)]
+            else:
+                # Filtered search: only the matching rows are read and scored
+                rows = positions[start:start + self.block_rows]
+                block = self.store.vectors[self.store.live_rows[rows]]
+                inv_norms = self.inv_norms[rows]
+            scores = (queries @ block.astype(np.float32, copy=False).T) * inv_norms
+            best_scores, best_rows = merge_top(best_scores, best_rows, scores, rows, top_k)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        return self._results(best_rows, best_scores)
+
+    def count(self):
+        return len(self.store.live_rows)
+
+    def fingerprint(self):
+        meta = os.path.join(self.store.path, META_FILE)
+        deleted = os.path.join(self.store.path, DELETED_FILE)
+        return f"numpy:{_mtime(meta)}:{_mtime(deleted)}"
+
+
+class QuantizedBackend(NumpyBackend):
+    """
+    Compressed in-RAM index over the EmbeddingStore with full-precision re-ranking.
+
+    mode="int8":   per-dimension scalar quantization (4x smaller than float32),
+                   scored with one matmul per block against the int8 codes.
+    mode="binary": 1 bit per dimension (32x smaller), Hamming distance via XOR
+                   and a byte popcount table.
+
+    The top `top_k * rerank_factor` candidates (RERANK_FACTOR per mode by default)
+    are then re-scored against the float vectors, which stay memory-mapped on
+    disk (only those rows are read).
+    Codes are built from the store once and cached next to it; they are rebuilt
+    whenever the store changes.
+    """
+
+    def __init__(self, store_dir=STORE_DIR, mode="int8", rerank_factor=None, block_rows=BLOCK_ROWS,
+                 space=DISTANCE_SPACE):
+        if mode not in ("int8", "binary"):
+            raise ValueError(f"Unknown quantization mode: {mode!r} (expected 'int8' or 'binary')")
+        self.mode = mode
+        self.space = _check_space(space)
+        self.name = mode
+        self.rerank_factor = RERANK_FACTOR[mode] if rerank_factor is None else rerank_factor
+        self.store = EmbeddingStoreReader(store_dir)
+        self.block_rows = block_rows
+        self.contiguous = len(self.store.live_rows) == self.store.count
+        self._filters = {}
+        self._load_or_build()
+
+    def _stamp(self):
+        return f"{self.fingerprint()}:{self.store.count}:{len(self.store.live_rows)}"
+
+    def _load_or_build(self):
+        """Load cached codes (and row norms) if they match the store; otherwise one pass over it."""
+        path = os.path.join(self.store.path, QUANT_FILE.format(mode=self.mode))
+        if os.path.exists(path):
+            cached = np.load(path)
+            if str(cached["stamp"]) == self._stamp():
+                self.codes, self.inv_norms = cached["codes"], cached["inv_norms"]
+                self.offset, self.scale = cached["offset"], cached["scale"]
+                return
+        n_rows = len(self.store.live_rows)
+        self.inv_norms = np.empty(n_rows, dtype=np.float32)
+        for start in range(0, n_rows, self.block_rows):
+            block = self._block(start, start + self.block_rows).astype(np.float32, copy=False)
+            self.inv_norms[start:start + len(block)] = 1.0 / np.maximum(np.linalg.norm(block, axis=1), 1e-12)
+        self._build()
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, stamp=self._stamp(), codes=self.codes, inv_norms=self.inv_norms,
+                 offset=self.offset, scale=self.scale)
+        os.replace(tmp, path)
+
+    def fingerprint(self):
+        return f"{self.mode}:{super().fingerprint()}"
+
+    def _unit_block(self, start, end):
+        block = self._block(start, end).astype(np.float32)
+        return block * self.inv_norms[start:start + len(block), None]
+
+    def _build(self):
+        n_rows, dim = len(self.store.live_rows), self.store.dim
+        if self.mode == "int8":
+            # Calibrate the per-dimension range on (up to) the first block, clipping outliers
+            sample = self._unit_block(0, self.block_rows) if n_rows else np.zeros((1, dim), np.float32)
+            low = np.percentile(sample, 0.1, axis=0).astype(np.float32)
+            high = np.percentile(sample, 99.9, axis=0).astype(np.float32)
+            self.scale = np.maximum(high - low, 1e-6) / 255.0
+            self.offset = low
+            self.codes = np.empty((n_rows, dim), dtype=np.int8)
+            for start in range(0, n_rows, self.block_rows):
+                block = self._unit_block(start, start + self.block_rows)
+                q = np.clip(np.rint((block - self.offset) / self.scale), 0, 255) - 128
+                self.codes[start:start + len(block)] = q.astype(np.int8)
+        else:
+            self.scale = self.offset = np.zeros(0, dtype=np.float32)
+            self.codes = np.zeros((n_rows, -(-dim // 64)), dtype=np.uint64)
+            for start in range(0, n_rows, self.block_rows):
+                block = self._unit_block(start, start + self.block_rows)
+                self.codes[start:start + len(block)] = self._pack_bits(block)
+
+    def _pack_bits(self, vectors):
+        """Sign bits packed into uint64 words (zero padded), one row per vector."""
+        bits = np.packbits(vectors > 0, axis=1)
+        padded = np.zeros((len(vectors), -(-vectors.shape[1] // 64) * 8), dtype=np.uint8)
+        padded[:, :bits.shape[1]] = bits
+        return padded.view(np.uint64)
+
+    @property
+    def index_bytes(self):
+        """RAM held by the quantized index (the float vectors stay on disk)."""
+        return self.codes.nbytes + self.inv_norms.nbytes + self.scale.nbytes + self.offset.nbytes
+
+    def _candidates(self, queries, n_candidates, positions=None):
+        """Approximate top candidates (positions into live_rows) for each query, best first."""
+        n_queries = len(queries)
+        n_rows = len(self.codes) if positions is None else len(positions)
+        if self.mode == "int8":
+            # q . x  ~=  q . (offset + 128 * scale)  +  (q * scale) . code
+            weights = queries * self.scale
+            bias = queries @ (self.offset + 128 * self.scale)
+        else:
+            query_bits = self._pack_bits(queries)
+
+        best_scores = np.full((n_queries, 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((n_queries, 0), dtype=np.int64)
+        for start in range(0, n_rows, self.block_rows):
+            if positions is None:
+                block = self.codes[start:start + self.block_rows]
+                rows = np.arange(start, start + len(block))
+            else:
+                rows = positions[start:start + self.block_rows]
+                block = self.codes[rows]
+            if self.mode == "int8":
+                scores = np.empty((n_queries, len(block)), dtype=np.float32)
+                for s in range(0, len(block), INT8_CONVERT_ROWS):
+                    piece = block[s:s + INT8_CONVERT_ROWS].astype(np.float32)
+                    scores[:, s:s + len(piece)] = weights @ piece.T
+                scores += bias[:, None]
+            else:
+                # Negated Hamming distance, so larger is better in both modes
+                scores = -np.stack([hamming_distances(block, bits) for bits in query_bits]).astype(np.float32)
+            best_scores, best_rows = merge_top(best_scores, best_rows, scores, rows, n_candidates)
+        return best_rows
+
+    def query(self, query_embeddings, top_k=5, where=None):
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.store.dim)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        positions = self._positions(where)
+        n_rows = len(self.codes) if positions is None else len(positions)
+        top_k = min(top_k, n_rows)
+        if top_k == 0:
+            return self._results([[] for _ in queries], [[] for _ in queries])
+
+        candidates = self._candidates(queries, min(n_rows, top_k * max(1, self.rerank_factor)), positions)
+        best_rows, best_scores = [], []
+        for q, rows in enumerate(candidates):
+            # Full-precision re-rank: read only the candidate rows from the memory-mapped store
+            rows = np.sort(rows)
+            exact = (self.store.vectors[self.store.live_rows[rows]].astype(np.float32) @ queries[q]) * self.inv_norms[rows]
+            order = np.argsort(-exact)[:top_k]
+            best_rows.append(rows[order])
+            best_scores.append(exact[order])
+        return self._results(best_rows, best_scores)
+
+
+def get_backend(name="chroma", **kwargs):
+    """Build a retrieval backend by name: "chroma" (default), "numpy", "int8" or "binary".
+
+    "chroma" opens a ShardedBackend when PERSIST_DIR holds a sharded layout (see sharding.py).
+    """
+    if name == "chroma":
+        from sharding import read_layout, ShardedBackend
+
+        if read_layout(kwargs.get("persist_dir", PERSIST_DIR)) is not None:
+            return ShardedBackend(**kwargs)
+        return ChromaBackend(**kwargs)
+    if name == "numpy":
+        return NumpyBackend(**kwargs)
+    if name in ("int8", "binary"):
+        return QuantizedBackend(mode=name, **kwargs)
+    raise ValueError(f"Unknown search backend: {name!r} (expected 'chroma', 'numpy', 'int8' or 'binary')")
@@ -0,0 +1,274 @@
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+from search_backends import get_backend
+from embedding_engine import load_encoder, ENCODER_BACKENDS
+from instrumentation import span, trace, count, observe, prometheus_text
+from cue_index import attach_snippets
+from chunk_metadata import validate_where
+
+# ✅ Service defaults
+HOST = "127.0.0.1"
+PORT = 8765
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+BATCH_WINDOW_MS = 5        # how long to wait for more requests before running a batch
+MAX_BATCH_SIZE = 64        # upper bound on queries per encode + collection.query
+MAX_PENDING = 1024         # queued requests beyond this are rejected with 503 (backpressure)
+REQUEST_TIMEOUT_S = 10.0   # per-request deadline, answered with 504
+MAX_TOP_K = 50
+
+
+class MicroBatcher:
+    """
+    Collects concurrent search requests for up to `window_ms`, then encodes all
+    of them in one model call and answers them with one multi-vector query.
+    The CPU-bound work runs in a single-thread executor so the event loop stays
+    responsive while a batch is being processed.
+    """
+
+    def __init__(self, model, backend, window_ms=BATCH_WINDOW_MS, max_batch_size=MAX_BATCH_SIZE,
+                 max_pending=MAX_PENDING):
+        self.model = model
+        self.backend = backend
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-batch")
+        self.batches = 0
+        self.batched_queries = 0
+
+    async def submit(self, query_text, top_k, where=None):
+        """Queue one query; raises asyncio.QueueFull when the service is saturated."""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((query_text, top_k, where, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requests that already timed out are dropped before doing any work for them
+            batch = [item for item in batch if not item[-1].done()]
+            if not batch:
+                continue
+            try:
+                results = await loop.run_in_executor(self.executor, self._search, batch)
+                for (*_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _search(self, batch):
+        """
+        Runs in the executor: one encode call for the whole batch, then one
+        multi-vector query per distinct `where` filter (usually just one).
+        Each answer's metadata carries its best cue-window snippet and timestamp.
+        """
+        texts = [text for text, *_ in batch]
+        groups = {}
+        for i, (_, _, where, _) in enumerate(batch):
+            groups.setdefault(json.dumps(where, sort_keys=True), []).append(i)
+        with trace("search_batch", batch_size=len(batch), filters=len(groups)):
+            with span("encode", items=len(texts)):
+                embeddings = self.model.encode(texts, batch_size=len(texts), show_progress_bar=False).tolist()
+            answers = [None] * len(batch)
+            for members in groups.values():
+                where = batch[members[0]][2]
+                top_k = max(batch[i][1] for i in members)
+                with span("query", items=len(members)):
+                    results = self.backend.query([embeddings[i] for i in members], top_k=top_k, where=where)
+                with span("postprocess"):
+                    for j, i in enumerate(members):
+                        k = batch[i][1]
+                        docs = results["documents"][j][:k]
+                        answers[i] = {
+                            "ids": results["ids"][j][:k],
+                            "documents": docs,
+                            "distances": results["distances"][j][:k],
+                            "metadatas": attach_snippets(embeddings[i], docs, results["metadatas"][j][:k]),
+                        }
+            self.batches += 1
+            self.batched_queries += len(batch)
+        return answers
+
+
+def _response(writer, status, payload):
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error",
+              503: "Service Unavailable", 504: "Gateway Timeout"}[status]
+    if isinstance(payload, str):
+        # Plain-text payloads (the Prometheus /metrics page)
+        body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+    else:
+        body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+    writer.write(
+        f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode("ascii") + body
+    )
+
+
+async def _read_request(reader):
+    """Minimal HTTP/1.1 request parser: returns (method, target, body) or None on EOF."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+    body = await reader.readexactly(length) if length else b""
+    return method, target, body
+
+
+class SearchService:
+    """
+    Asyncio HTTP front end for the micro-batcher.
+
+    GET  /search?q=...&top_k=5     or   POST /search {"query": ..., "top_k": 5, "where": {...}}
+    GET  /health                   -> queue depth and batching stats
+    GET  /metrics                  -> per-stage timings and counters (Prometheus text format)
+    """
+
+    def __init__(self, batcher, timeout_s=REQUEST_TIMEOUT_S):
+        self.batcher = batcher
+        self.timeout_s = timeout_s
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except ValueError:
+                    # Unparseable request line or Content-Length: answer, then drop the connection
+                    _response(writer, 400, {"error": "malformed HTTP request"})
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, body = request
+                status, payload = await self.route(method, target, body)
+                _response(writer, status, payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, target, body):
+        url = urlsplit(target)
+        if url.path == "/health":
+            b = self.batcher
+            return 200, {"pending": b.queue.qsize(), "batches": b.batches,
+                         "avg_batch_size": b.batched_queries / b.batches if b.batches else 0.0}
+        if url.path == "/metrics":
+            return 200, prometheus_text()
+        if url.path != "/search":
+            return 404, {"error": "not found"}
+
+        try:
+            if method == "POST":
+                params = json.loads(body or b"{}")
+            else:
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            query_text = params.get("query") or params.get("q")
+            top_k = int(params.get("top_k", 5))
+            if top_k < 1:
+                raise ValueError("top_k must be at least 1")
+            top_k = min(top_k, MAX_TOP_K)
+            where = params.get("where") or None
+            if isinstance(where, str):
+                where = json.loads(where)
+            if where is not None:
+                validate_where(where)
+        except (ValueError, TypeError, AttributeError) as e:
+            count("search_requests_total", status="400")
+            return 400, {"error": f"invalid request: {e}"}
+        if not isinstance(query_text, str) or not query_text:
+            count("search_requests_total", status="400")
+            return 400, {"error": "missing query"}
+
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self.batcher.submit(query_text, top_k, where), self.timeout_s)
+        except asyncio.QueueFull:
+            count("search_requests_total", status="503")
+            return 503, {"error": "search queue full, retry later"}
+        except asyncio.TimeoutError:
+            count("search_requests_total", status="504")
+            return 504, {"error": f"search timed out after {self.timeout_s}s"}
+        except Exception as e:
+            # Encoder or backend failure, passed on by the batcher through the request's future
+            count("search_requests_total", status="500")
+            return 500, {"error": f"search failed: {type(e).__name__}: {e}"}
+        seconds = time.perf_counter() - start
+        observe("search_request_seconds", seconds)
+        count("search_requests_total", status="200")
+        result["latency_ms"] = seconds * 1000
+        return 200, result
+
+
+async def serve(host=HOST, port=PORT, backend_name="chroma", window_ms=BATCH_WINDOW_MS,
+                max_batch_size=MAX_BATCH_SIZE, max_pending=MAX_PENDING, timeout_s=REQUEST_TIMEOUT_S,
+                encoder="torch"):
+    model = load_encoder(MODEL_NAME, encoder)
+    backend = get_backend(backend_name)
+    batcher = MicroBatcher(model, backend, window_ms, max_batch_size, max_pending)
+    service = SearchService(batcher, timeout_s)
+
+    batch_task = asyncio.create_task(batcher.run())
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"🚀 Search service listening on http://{host}:{port} ({backend.name} backend, "
+          f"{window_ms}ms batching window, max batch {max_batch_size})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+
+
+def search_via_service(url, query_text, top_k=5, timeout_s=REQUEST_TIMEOUT_S, where=None):
+    """Small blocking client used by the Streamlit app (and anything else without asyncio)."""
+    from urllib.request import Request, urlopen
+
+    payload = {"query": query_text, "top_k": top_k, "where": where}
+    request = Request(url.rstrip("/") + "/search", data=json.dumps(payload).encode(),
+                      headers={"Content-Type": "application/json"}, method="POST")
+    with urlopen(request, timeout=timeout_s) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Asyncio subtitle search service with micro-batching.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--backend", choices=["chroma", "numpy", "int8", "binary"], default="chroma")
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW_MS)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING)
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT_S)
+    parser.add_argument("--encoder", choices=ENCODER_BACKENDS, default="torch", help="Query encoder backend")
+    args = parser.parse_args()
+
+    asyncio.run(serve(args.host, args.port, args.backend, args.window_ms, args.max_batch_size,
+                      args.max_pending, args.timeout, args.encoder))
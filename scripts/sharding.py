@@ -0,0 +1,249 @@
+import os
+import json
+import heapq
+import hashlib
+import threading
+import itertools
+import multiprocessing
+import numpy as np
+
+from search_backends import ChromaBackend, PERSIST_DIR, COLLECTION_NAME, _mtime
+
+# ✅ Sharding layout: PERSIST_DIR/shards.json plus one Chroma directory per shard
+LAYOUT_FILE = "shards.json"
+SHARD_DIR = "shard_{shard:02d}"
+
+
+def shard_for(chunk_id, num_shards):
+    """Stable shard of a chunk ID (same in every process and run, unlike hash())."""
+    digest = hashlib.blake2b(chunk_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % num_shards
+
+
+def read_layout(persist_dir=PERSIST_DIR):
+    """The shard layout of `persist_dir`, or None if it holds a single unsharded collection."""
+    path = os.path.join(persist_dir, LAYOUT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _open_collection(path, collection_name):
+    import chromadb
+
+    return chromadb.PersistentClient(path=path).get_or_create_collection(name=collection_name)
+
+
+def _call(collection, op, kwargs):
+    """Run one collection operation; embeddings travel between processes as float32 arrays."""
+    if "embeddings" in kwargs:
+        kwargs = {**kwargs, "embeddings": kwargs["embeddings"].tolist()}
+    if op == "query":
+        kwargs["query_embeddings"] = kwargs.pop("embeddings")
+        return collection.query(**kwargs)
+    if op == "count":
+        return collection.count()
+    return getattr(collection, op)(**kwargs)
+
+
+def _shard_worker(path, collection_name, conn):
+    """Process entry point: owns one shard's PersistentClient and serves requests until closed."""
+    collection = _open_collection(path, collection_name)
+    while True:
+        op, kwargs = conn.recv()
+        if op == "close":
+            break
+        try:
+            conn.send(("ok", _call(collection, op, kwargs)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+class _LocalShard:
+    """A shard served in this process (processes=False): calls run one after another."""
+
+    def __init__(self, path, collection_name):
+        self.collection = _open_collection(path, collection_name)
+        self.result = None
+
+    def send(self, op, kwargs):
+        self.result = _call(self.collection, op, kwargs)
+
+    def recv(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class _ProcessShard:
+    """A shard served by its own worker process, talked to over a pipe."""
+
+    def __init__(self, path, collection_name, context):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_shard_worker, args=(path, collection_name, child), daemon=True)
+        self.process.start()
+        child.close()
+
+    def send(self, op, kwargs):
+        self.conn.send((op, kwargs))
+
+    def recv(self):
+        status, result = self.conn.recv()
+        if status == "error":
+            raise RuntimeError(f"Shard worker failed: {result}")
+        return result
+
+    def close(self):
+        if self.process.is_alive():
+            self.conn.send(("close", None))
+            self.process.join(timeout=10)
+        self.conn.close()
+
+
+class ShardedCollection:
+    """
+    `subtitle_chunks` split across `num_shards` Chroma directories.
+
+    Chunks are routed to a shard by a stable hash of their ID, so upserts,
+    deletes and updates touch only the owning shard. Queries are scattered to
+    every shard and the per-shard top-k lists are merged with a heap. With
+    `processes=True` each shard lives in its own worker process, so shards
+    insert and search in parallel; the workers are spawned, so they re-import
+    the caller's main module, which must keep its work under `__main__`.
+    It exposes the part of the Chroma collection API the pipeline uses
+    (upsert, delete, update, query, count), so it can be passed anywhere a
+    collection is expected.
+    """
+
+    def __init__(self, persist_dir=PERSIST_DIR, num_shards=None, collection_name=None, processes=True):
+        layout = read_layout(persist_dir)
+        if layout is None:
+            if not num_shards:
+                raise ValueError(f"{persist_dir} is not sharded; pass num_shards to create a sharded layout")
+            os.makedirs(persist_dir, exist_ok=True)
+            layout = {"num_shards": num_shards, "collection": collection_name or COLLECTION_NAME}
+            with open(os.path.join(persist_dir, LAYOUT_FILE), "w", encoding="utf-8") as f:
+                json.dump(layout, f)
+        elif num_shards and num_shards != layout["num_shards"]:
+            raise ValueError(f"{persist_dir} has {layout['num_shards']} shards, not {num_shards} "
+                             "(routing would change; re-ingest into a new directory to reshard)")
+        self.persist_dir = persist_dir
+        self.num_shards = layout["num_shards"]
+        self.paths = [os.path.join(persist_dir, SHARD_DIR.format(shard=s)) for s in range(self.num_shards)]
+        # The layout records the collection it was created with; an explicit name opens another one
+        self.collection_name = collection_name or layout["collection"]
+        if processes:
+            context = multiprocessing.get_context("spawn")
+            self.shards = [_ProcessShard(path, self.collection_name, context) for path in self.paths]
+        else:
+            self.shards = [_LocalShard(path, self.collection_name) for path in self.paths]
+        # One scatter-gather at a time: each pipe carries a single request/response pair
+        self.lock = threading.Lock()
+
+    def _scatter(self, requests):
+        """
+        Send {shard: (op, kwargs)} to the shards in parallel and gather {shard: result}.
+        Every shard that got a request is read before a failure is raised, so no
+        stale reply is left in a pipe for the next call to pick up.
+        """
+        with self.lock:
+            sent, results, error = [], {}, None
+            for shard, request in requests.items():
+                try:
+                    self.shards[shard].send(*request)
+                except Exception as e:
+                    error = e
+                    break
+                sent.append(shard)
+            for shard in sent:
+                try:
+                    results[shard] = self.shards[shard].recv()
+                except Exception as e:
+                    error = error or e
+            if error is not None:
+                raise error
+            return results
+
+    def _route(self, op, ids, **columns):
+        """Split one write by owning shard, keeping every column aligned with its IDs."""
+        positions = {}
+        for i, chunk_id in enumerate(ids):
+            positions.setdefault(shard_for(chunk_id, self.num_shards), []).append(i)
+        requests = {}
+        for shard, rows in positions.items():
+            kwargs = {"ids": [ids[i] for i in rows]}
+            for name, values in columns.items():
+                if values is None:
+                    continue
+                if name == "embeddings":
+                    kwargs[name] = np.asarray(values, dtype=np.float32)[rows]
+                else:
+                    kwargs[name] = [values[i] for i in rows]
+            requests[shard] = (op, kwargs)
+        self._scatter(requests)
+
+    def upsert(self, ids, embeddings=None, documents=None, metadatas=None):
+        self._route("upsert", ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def add(self, ids, embeddings=None, documents=None, metadatas=None):
+        self._route("add", ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def update(self, ids, embeddings=None, documents=None, metadatas=None):
+        self._route("update", ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def delete(self, ids):
+        self._route("delete", ids)
+
+    def count(self):
+        return sum(self._scatter({s: ("count", {}) for s in range(self.num_shards)}).values())
+
+    def query(self, query_embeddings, n_results=10, where=None, include=("documents", "metadatas", "distances")):
+        """Top `n_results` over all shards, in Chroma's result shape (best first)."""
+        kwargs = {"embeddings": np.asarray(query_embeddings, dtype=np.float32), "n_results": n_results,
+                  "include": list(include)}
+        if where:
+            kwargs["where"] = where
+        results = self._scatter({s: ("query", kwargs) for s in range(self.num_shards)})
+        for result in results.values():
+            result.setdefault("metadatas", None)
+        merged = {"ids": [], "documents": [], "distances": [], "metadatas": []}
+        for q in range(len(kwargs["embeddings"])):
+            # Each shard's list is already sorted by distance: a lazy k-way heap merge
+            streams = [
+                zip(r["distances"][q], r["ids"][q], r["documents"][q],
+                    r["metadatas"][q] if r["metadatas"] else itertools.repeat(None))
+                for r in results.values()
+            ]
+            best = list(itertools.islice(heapq.merge(*streams, key=lambda hit: hit[0]), n_results))
+            merged["distances"].append([hit[0] for hit in best])
+            merged["ids"].append([hit[1] for hit in best])
+            merged["documents"].append([hit[2] for hit in best])
+            merged["metadatas"].append([hit[3] for hit in best])
+        return merged
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ShardedBackend(ChromaBackend):
+    """ChromaBackend over a ShardedCollection: scatter-gather top-k across the shard workers."""
+
+    name = "chroma"
+
+    def __init__(self, persist_dir=PERSIST_DIR, collection_name=None, processes=True):
+        super().__init__(ShardedCollection(persist_dir, collection_name=collection_name, processes=processes),
+                         persist_dir)
+
+    def fingerprint(self):
+        stamps = ":".join(str(_mtime(os.path.join(path, "chroma.sqlite3"))) for path in self.collection.paths)
+        return f"chroma:{self.collection.num_shards}:{self.count()}:{stamps}"
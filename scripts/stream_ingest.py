@@ -0,0 +1,267 @@
+import io
+import os
+import sqlite3
+import zipfile
+import argparse
+import chromadb
+
+from clean_subtitles import clean_subtitle
+from chunk_subtitles import chunk_text_spans
+from subtitle_parsers import detect_format, iter_clean_cues
+from cue_index import chunk_cue_index, add_cue_vectors, CUE_INDEX_KEY
+from token_chunker import load_chunker
+from embedding_engine import EmbeddingEngine, MODEL_NAME, ENCODE_BATCH_SIZE, ENCODER_BACKENDS
+from embedding_store import EmbeddingStore
+from lexical_index import LexicalIndex
+from near_duplicates import DuplicateIndex, apply_aliases, format_report
+from sharding import ShardedCollection
+from instrumentation import span, timed_iter, trace, stage_summary, write_prometheus
+from ingest_manifest import (IngestManifest, content_hash, iter_incremental_chunks, commit_batch,
+                             remove_missing_sources, new_stats, summary, MANIFEST_PATH)
+
+# ✅ Define Source & Target
+DB_PATH = "eng_subtitles_database.db"   # SQLite dump with the `zipfiles` table
+PERSIST_DIR = "chroma_db"
+COLLECTION_NAME = "subtitle_chunks"
+
+# ✅ Streaming parameters
+PAGE_SIZE = 200        # zipfiles rows fetched per page (bounds BLOBs held in RAM)
+BATCH_SIZE = 1000      # chunks embedded and inserted per batch
+NUM_WORKERS = 1        # CPU worker processes for encoding
+CHUNKER = "tokens"     # "tokens": pack whole cues into the model window; "words": legacy 500-word chunks
+CUE_VECTORS = False    # opt-in: also embed each chunk's snippet windows (~3 KB metadata per chunk, ~2x ingest time)
+SUBTITLE_EXTENSIONS = (".srt", ".vtt", ".ass", ".nfo")
+
+
+def iter_zip_rows(db_path=DB_PATH, page_size=PAGE_SIZE):
+    """
+    Page through the `zipfiles` table by rowid instead of `fetchall()`,
+    so only `page_size` compressed BLOBs are in memory at any time.
+    Yields (rowid, name, content) tuples.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        last_rowid = 0
+        while True:
+            rows = conn.execute(
+                "SELECT rowid, name, content FROM zipfiles WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, page_size),
+            ).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                yield row
+            last_rowid = rows[-1][0]
+    finally:
+        conn.close()
+
+
+def decode_subtitle_bytes(raw):
+    """Decode subtitle bytes as UTF-8, falling back to latin-1 like the notebook does."""
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+
+def iter_subtitle_files(rows):
+    """
+    Decompress each zip BLOB in memory and yield (zip_name, file_name, text)
+    for every subtitle file inside it. Corrupt zips are skipped.
+    """
+    for _, zip_name, blob_data in rows:
+        try:
+            with zipfile.ZipFile(io.BytesIO(blob_data), "r") as zip_ref:
+                for file_name in zip_ref.namelist():
+                    if not file_name.lower().endswith(SUBTITLE_EXTENSIONS):
+                        continue
+                    yield zip_name, file_name, decode_subtitle_bytes(zip_ref.read(file_name))
+        except zipfile.BadZipFile:
+            print(f"❌ Skipped (Corrupt ZIP): {zip_name}")
+
+
+def is_near_duplicate(dedup, source, cleaned):
+    """Dedup stage between cleaning and chunking: True if `source` is an alias of an ingested file."""
+    if dedup is None:
+        return False
+    with span("dedup"):
+        return dedup.check(source, cleaned) is not None
+
+
+def cue_chunks(token_chunker, text, file_name, dedup=None, source=None):
+    """
+    Parse and clean the file's cues, then pack whole cues into model-sized chunks.
+    Returns (chunk, offsets) pairs: the chunk's character range in the cleaned
+    text (cues joined by spaces), the time range of its first and last cue and
+    the packed per-cue index used for snippets at search time (see cue_index.py).
+    Near-duplicates of an already ingested file (with `dedup`) produce no chunks.
+    """
+    with span("clean"):
+        fmt = detect_format(file_name, text[:2048])
+        cues = list(iter_clean_cues(text.splitlines(), fmt))
+        texts = [cue for _, _, cue in cues]
+    if is_near_duplicate(dedup, source, " ".join(texts)):
+        return []
+    with span("chunk"):
+        starts, position = [], 0
+        for cue in texts:
+            starts.append(position)
+            position += len(cue) + 1
+        chunks = []
+        for chunk, first, last in token_chunker.chunk_unit_spans(texts):
+            chunks.append((chunk, {"char_start": starts[first], "char_end": starts[last] + len(texts[last]),
+                                   "start_time": cues[first][0], "end_time": cues[last][1],
+                                   CUE_INDEX_KEY: chunk_cue_index(cues, starts, first, last)}))
+    if dedup is not None:
+        dedup.set_chunk_count(source, len(chunks))
+    return chunks
+
+
+def word_chunks(text, file_name, dedup=None, source=None):
+    """Legacy path: clean the whole file, then split it into 500-word chunks (with char offsets)."""
+    with span("clean"):
+        cleaned = clean_subtitle(text, file_name)
+    if is_near_duplicate(dedup, source, cleaned):
+        return []
+    with span("chunk"):
+        chunks = [(chunk, {"char_start": start, "char_end": end})
+                  for chunk, start, end in chunk_text_spans(cleaned)]
+    if dedup is not None:
+        dedup.set_chunk_count(source, len(chunks))
+    return chunks
+
+
+def iter_manifest_files(files, token_chunker=None, dedup=None, cue_vectors=False):
+    """
+    Key each subtitle file as "zip_name/file_name" with a hash of its raw text
+    (plus the chunking mode, so switching chunkers re-chunks everything).
+    Cleaning and chunking are deferred so unchanged files cost only a hash.
+    Turning dedup on also changes the hash, so existing duplicates are found
+    (and their chunks deleted) on the next run without re-embedding anything.
+    Toggling `cue_vectors` changes the hash of token-chunked files too, so they
+    are re-ingested with (or without) window vectors.
+    """
+    mode = "words" if token_chunker is None else f"tokens:{token_chunker.budget}:{token_chunker.overlap}"
+    if dedup is not None:
+        mode += ":dedup"
+    if cue_vectors and token_chunker is not None:
+        # Word chunks carry no cue index, so the flag changes nothing for them
+        mode += ":cues"
+    for zip_name, file_name, text in files:
+        source = f"{zip_name}/{file_name}"
+        if token_chunker is not None:
+            get_chunks = lambda text=text, file_name=file_name, source=source: cue_chunks(
+                token_chunker, text, file_name, dedup, source)
+        else:
+            get_chunks = lambda text=text, file_name=file_name, source=source: word_chunks(
+                text, file_name, dedup, source)
+        yield source, content_hash(f"{mode}\x00{text}"), get_chunks
+
+
+def run_pipeline(db_path=DB_PATH, persist_dir=PERSIST_DIR, page_size=PAGE_SIZE, batch_size=BATCH_SIZE,
+                 num_workers=NUM_WORKERS, encode_batch_size=ENCODE_BATCH_SIZE, manifest_path=MANIFEST_PATH, store_dir=None,
+                 chunker=CHUNKER, metrics_out=None, lexical_path=None, dedup_path=None, num_shards=1, encoder="torch",
+                 cue_vectors=CUE_VECTORS):
+    """
+    zipfiles rows -> in-memory unzip -> clean -> chunk -> embed -> Chroma,
+    chained as generators so at most one page of BLOBs and one batch of
+    chunks are alive at a time. Nothing is written to intermediate folders.
+    The manifest limits embedding to new or changed files and lets a crashed
+    run resume from its last committed batch. With `store_dir`, every batch is
+    also appended to a memory-mappable EmbeddingStore backup, and with
+    `lexical_path` indexed into a BM25 LexicalIndex. With `dedup_path`,
+    near-duplicate releases are detected after cleaning and only their first
+    release is chunked and embedded (see near_duplicates.py). With `num_shards`
+    > 1 the collection is split into hash-routed shards, each written by its
+    own worker process (see sharding.py). With `cue_vectors`, the snippet
+    windows of cue-indexed chunks are embedded too (see cue_index.py). Per-stage timings
+    are printed at the end and, with `metrics_out`, written in Prometheus format.
+    """
+    os.makedirs(persist_dir, exist_ok=True)
+    if num_shards > 1:
+        collection = ShardedCollection(persist_dir, num_shards=num_shards, collection_name=COLLECTION_NAME)
+        print(f"✅ ChromaDB initialized with {num_shards} shards.")
+    else:
+        chroma_client = chromadb.PersistentClient(path=persist_dir)
+        collection = chroma_client.get_or_create_collection(name=COLLECTION_NAME)
+        print("✅ ChromaDB initialized and collection loaded.")
+
+    engine = EmbeddingEngine(MODEL_NAME, batch_size=encode_batch_size, num_workers=num_workers, encoder=encoder)
+    print(f"✅ Loaded model: {MODEL_NAME} ({encoder})")
+    token_chunker = load_chunker(engine.model) if chunker == "tokens" else None
+
+    manifest = IngestManifest(manifest_path)
+    stats = new_stats()
+    finished = []
+    backup_store = EmbeddingStore(store_dir) if store_dir else None
+    lexical_index = LexicalIndex(lexical_path) if lexical_path else None
+    dedup = DuplicateIndex(dedup_path) if dedup_path else None
+
+    files = timed_iter("extract", iter_subtitle_files(iter_zip_rows(db_path, page_size)))
+    chunks = iter_incremental_chunks(manifest, iter_manifest_files(files, token_chunker, dedup, cue_vectors),
+                                     finished, stats)
+
+    with trace("ingest", db=db_path, chunker=chunker), engine:
+        for batch, embeddings in engine.embed_batches(chunks, gather_size=batch_size):
+            if cue_vectors:
+                # Snippet windows are embedded here, once, so search never runs the model for them
+                add_cue_vectors(batch, lambda texts: engine.encode(texts, stage="encode_cues"))
+            commit_batch(manifest, collection, batch, embeddings, finished, stats, backup_store=backup_store,
+                         lexical_index=lexical_index)
+            print(f"🔥 Processed {stats['embedded_chunks']} chunks... ({engine.chunks_per_sec:.1f} chunks/sec)")
+
+        commit_batch(manifest, collection, [], [], finished, stats, backup_store=backup_store,
+                     lexical_index=lexical_index)
+        remove_missing_sources(manifest, collection, stats, backup_store=backup_store, lexical_index=lexical_index,
+                               dedup=dedup)
+        if dedup is not None:
+            apply_aliases(dedup, collection, manifest.committed_chunk_ids)
+    manifest.close()
+    if lexical_index is not None:
+        lexical_index.close()
+    if num_shards > 1:
+        collection.close()
+
+    print(f"\n🎯 Streaming ingestion complete! Total chunks processed: {stats['embedded_chunks']}")
+    print(summary(stats))
+    print(engine.report())
+    if dedup is not None:
+        print(format_report(dedup.report(engine.chunks_per_sec)))
+        dedup.close()
+    for stage, totals in stage_summary().items():
+        print(f"⏱️ {stage}: {totals['seconds']:.1f}s over {totals['calls']} calls"
+              + (f", {totals['items']} items" if "items" in totals else ""))
+    if metrics_out:
+        write_prometheus(metrics_out)
+        print(f"📂 Metrics written to {metrics_out}")
+    return stats['embedded_chunks']
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream subtitles from the zipfiles table straight into ChromaDB.")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database with the zipfiles table")
+    parser.add_argument("--persist-dir", default=PERSIST_DIR, help="ChromaDB persistence directory")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="zipfiles rows fetched per page")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Chunks embedded and inserted per batch")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS, help="CPU worker processes for encoding")
+    parser.add_argument("--encode-batch-size", type=int, default=ENCODE_BATCH_SIZE, help="Texts per model forward pass")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="Ingestion manifest used for incremental runs")
+    parser.add_argument("--store", default=None, help="Also append embeddings to this binary EmbeddingStore directory")
+    parser.add_argument("--chunker", choices=["tokens", "words"], default=CHUNKER,
+                        help="tokens: cue-aligned chunks sized to the model window; words: legacy 500-word chunks")
+    parser.add_argument("--lexical-index", default=None, help="Also index chunks into this BM25 lexical index")
+    parser.add_argument("--metrics-out", default=None, help="Write per-stage metrics in Prometheus text format here")
+    parser.add_argument("--dedup", default=None, metavar="INDEX",
+                        help="Skip near-duplicate releases, tracked in this MinHash index (e.g. near_duplicates.sqlite3)")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Split the collection into this many hash-routed shards (fixed once created)")
+    parser.add_argument("--encoder", choices=ENCODER_BACKENDS, default="torch",
+                        help="torch: SentenceTransformer; onnx / onnx-int8: ONNX Runtime (single process, intra-op threads)")
+    parser.add_argument("--cue-vectors", action="store_true",
+                        help="Also embed snippet windows so search picks the best one (~2x ingest time); "
+                             "without it snippets start at each chunk's first cue")
+    args = parser.parse_args()
+
+    run_pipeline(args.db, args.persist_dir, args.page_size, args.batch_size, args.workers,
+                 args.encode_batch_size, args.manifest, args.store, args.chunker, args.metrics_out,
+                 args.lexical_index, args.dedup, args.shards, args.encoder, args.cue_vectors)
@@ -0,0 +1,51 @@
+import re
+import zlib
+import numpy as np
+
+# ✅ Matches all-MiniLM-L6-v2's output size and input window
+EMBEDDING_DIM = 384
+MAX_SEQ_LENGTH = 256
+
+_WORD = re.compile(r"\S+")
+
+
+class StubTokenizer:
+    """Whitespace 'word piece' tokenizer with the parts of the HF API the chunkers use."""
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+    def __call__(self, texts, add_special_tokens=False, return_offsets_mapping=False, verbose=False, **kwargs):
+        if isinstance(texts, str):
+            spans = [m.span() for m in _WORD.finditer(texts)]
+            out = {"input_ids": list(range(len(spans)))}
+            if return_offsets_mapping:
+                out["offset_mapping"] = spans
+            return out
+        return {"input_ids": [list(range(len(_WORD.findall(t)))) for t in texts]}
+
+
+class StubEncoder:
+    """
+    Tiny deterministic stand-in for SentenceTransformer: hashes words into a
+    384-d vector and L2-normalizes it. Needs no model download and is cheap,
+    so benchmarks measure the pipeline around the encoder, not the encoder.
+    Similar texts share words and therefore get similar vectors.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+        self.tokenizer = StubTokenizer()
+        self.max_seq_length = MAX_SEQ_LENGTH
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False, **kwargs):
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in _WORD.findall(text.lower())[:MAX_SEQ_LENGTH]:
+                h = zlib.crc32(word.encode("utf-8"))
+                out[i, h % self.dim] += 1.0 if (h >> 16) & 1 else -1.0
+        out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out[0] if single else out
@@ -0,0 +1,160 @@
+import re
+
+from text_cleanup import clean_cue_texts
+
+# ✅ Precompiled patterns (compiled once per process, not per call)
+SRT_VTT_TIMING = re.compile(
+    r"^\s*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})\s*-->\s*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})"
+)
+ASS_TIME = re.compile(r"^(\d+):(\d{2}):(\d{2})[.,](\d{1,3})$")
+ASS_OVERRIDE = re.compile(r"\{[^}]*\}")
+ASS_LINE_BREAK = re.compile(r"\\[Nnh]")
+CUE_BATCH = 256    # cues cleaned per clean_cue_texts call (keeps streaming memory bounded)
+
+VTT_SKIP_BLOCKS = ("NOTE", "STYLE", "REGION")
+
+
+def parse_timestamp(value):
+    """'01:02:03,456' / '02:03.456' / '1:02:03.45' -> seconds as float."""
+    value = value.replace(",", ".")
+    parts = value.split(":")
+    seconds = float(parts[-1])
+    if len(parts) >= 2:
+        seconds += int(parts[-2]) * 60
+    if len(parts) == 3:
+        seconds += int(parts[-3]) * 3600
+    return seconds
+
+
+def _iter_blocks(lines):
+    """Group lines into blank-line separated blocks (lists of stripped lines)."""
+    block = []
+    for line in lines:
+        line = line.strip().lstrip("\ufeff")
+        if line:
+            block.append(line)
+        elif block:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def _timed_cue(block):
+    """Return (start, end, text) for a block with a timing line; lines above it are indices/IDs."""
+    for i, line in enumerate(block):
+        match = SRT_VTT_TIMING.match(line)
+        if match:
+            text = " ".join(block[i + 1:])
+            if text:
+                return parse_timestamp(match.group(1)), parse_timestamp(match.group(2)), text
+            return None
+    return None
+
+
+def iter_srt_cues(lines):
+    """
+    Yield (start, end, text) cues from SRT lines. Cue indices and timing lines are
+    consumed by the parser instead of being regex-stripped out of the text.
+    """
+    for block in _iter_blocks(lines):
+        cue = _timed_cue(block)
+        if cue:
+            yield cue
+
+
+def iter_vtt_cues(lines):
+    """
+    Yield (start, end, text) cues from WebVTT lines, skipping the WEBVTT header
+    block, NOTE/STYLE/REGION blocks, cue identifiers and cue settings.
+    """
+    for block in _iter_blocks(lines):
+        first = block[0]
+        if first.startswith("WEBVTT") or first.split(" ", 1)[0] in VTT_SKIP_BLOCKS:
+            continue
+        cue = _timed_cue(block)
+        if cue:
+            yield cue
+
+
+def _parse_ass_time(value):
+    match = ASS_TIME.match(value.strip())
+    if not match:
+        return None
+    h, m, s, frac = match.groups()
+    return int(h) * 3600 + int(m) * 60 + int(s) + int(frac) / (10 ** len(frac))
+
+
+def iter_ass_cues(lines):
+    """
+    Yield (start, end, text) cues from the [Events] section of an ASS/SSA file.
+    Only Dialogue lines are read; styles, script info and comments are skipped.
+    """
+    in_events = False
+    fields = ["Layer", "Start", "End", "Style", "Name", "MarginL", "MarginR", "MarginV", "Effect", "Text"]
+    for line in lines:
+        line = line.strip().lstrip("\ufeff")
+        if line.startswith("["):
+            in_events = line.lower() == "[events]"
+            continue
+        if not in_events:
+            continue
+        if line.startswith("Format:"):
+            fields = [f.strip() for f in line[len("Format:"):].split(",")]
+        elif line.startswith("Dialogue:"):
+            values = line[len("Dialogue:"):].split(",", len(fields) - 1)
+            if len(values) != len(fields):
+                continue
+            row = dict(zip(fields, values))
+            text = ASS_LINE_BREAK.sub(" ", ASS_OVERRIDE.sub("", row.get("Text", "")))
+            if text.strip():
+                yield _parse_ass_time(row.get("Start", "")), _parse_ass_time(row.get("End", "")), text
+
+
+def iter_plain_cues(lines):
+    """.nfo and unknown formats: every non-empty line is untimed text."""
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield None, None, line
+
+
+PARSERS = {"srt": iter_srt_cues, "vtt": iter_vtt_cues, "ass": iter_ass_cues, "ssa": iter_ass_cues}
+
+
+def detect_format(file_name=None, head=""):
+    """Pick a parser from the file extension, falling back to sniffing the first lines."""
+    if file_name:
+        ext = file_name.rsplit(".", 1)[-1].lower()
+        if ext in PARSERS:
+            return ext
+        if ext == "nfo":
+            return "plain"
+    head = head.lstrip("\ufeff")
+    if head.startswith("WEBVTT"):
+        return "vtt"
+    if "[Script Info]" in head or "[Events]" in head:
+        return "ass"
+    if "-->" in head:
+        return "srt"
+    return "plain"
+
+
+def iter_clean_cues(lines, fmt, batch_size=CUE_BATCH):
+    """
+    Parse `lines` as `fmt` and yield (start, end, cleaned_text) for non-empty cues.
+    Cue texts are cleaned `batch_size` at a time (see text_cleanup.clean_cue_texts).
+    """
+    batch = []
+    for cue in PARSERS.get(fmt, iter_plain_cues)(lines):
+        batch.append(cue)
+        if len(batch) >= batch_size:
+            yield from _clean_batch(batch)
+            batch = []
+    yield from _clean_batch(batch)
+
+
+def _clean_batch(cues):
+    for (start, end, _), cleaned in zip(cues, clean_cue_texts([text for _, _, text in cues])):
+        if cleaned:
+            yield start, end, cleaned
@@ -0,0 +1,173 @@
+import io
+import os
+import re
+import random
+import sqlite3
+import zipfile
+
+# ✅ Vocabulary for fake dialogue (no network or real data needed)
+WORDS = (
+    "the ship is sinking we have to get off now jack rose where are you going I will never let go "
+    "captain said the lifeboats are full do not panic stay calm everyone listen to me please hurry up "
+    "what happened here I think the engine failed come on we can make it together look out behind you "
+    "this is the end of the road my friend tell me the truth I love you more than anything in the world"
+).split()
+
+FORMATS = ("srt", "vtt", "ass")
+TIMESTAMP = re.compile(r"(\d{1,2}):(\d{2}):(\d{2})([,.])(\d{2,3})")
+FPS_RATIOS = (25 / 23.976, 23.976 / 25, 1.0)   # re-releases: PAL/NTSC speed-ups or the same timing
+
+
+def _line(rng):
+    words = rng.choices(WORDS, k=rng.randint(3, 12))
+    words[0] = words[0].capitalize()
+    return " ".join(words) + rng.choice([".", "?", "!", "..."])
+
+
+def _cues(rng, n_cues):
+    """Yield (start_seconds, end_seconds, [lines]) for consecutive cues."""
+    t = rng.uniform(1, 5)
+    for _ in range(n_cues):
+        duration = rng.uniform(1.0, 4.0)
+        lines = [_line(rng) for _ in range(rng.randint(1, 2))]
+        yield t, t + duration, lines
+        t += duration + rng.uniform(0.2, 3.0)
+
+
+def _timestamp(seconds, sep):
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{sep}{ms:03d}"
+
+
+def make_srt(rng, n_cues):
+    out = []
+    for i, (start, end, lines) in enumerate(_cues(rng, n_cues), start=1):
+        if rng.random() < 0.1:
+            lines = [f"<i>{lines[0]}</i>"] + lines[1:]
+        out.append(f"{i}\n{_timestamp(start, ',')} --> {_timestamp(end, ',')}\n" + "\n".join(lines) + "\n")
+    out.append(f"{n_cues + 1}\n{_timestamp(9000, ',')} --> {_timestamp(9003, ',')}\n"
+               "Downloaded from www.OpenSubtitles.org\n")
+    return "\n".join(out)
+
+
+def make_vtt(rng, n_cues):
+    out = ["WEBVTT\nKind: captions\nLanguage: en\n",
+           "STYLE\n::cue { color: yellow; }\n",
+           "NOTE generated by synthetic_corpus.py\n"]
+    for i, (start, end, lines) in enumerate(_cues(rng, n_cues), start=1):
+        ident = f"cue-{i}\n" if rng.random() < 0.5 else ""
+        if rng.random() < 0.2:
+            lines = [f"<v Jack>{lines[0]}</v>"] + lines[1:]
+        out.append(f"{ident}{_timestamp(start, '.')} --> {_timestamp(end, '.')} align:start position:10%\n"
+                   + "\n".join(lines) + "\n")
+    return "\n".join(out)
+
+
+def make_ass(rng, n_cues):
+    out = [
+        "[Script Info]", "Title: Synthetic", "ScriptType: v4.00+", "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, Bold, Italic, Alignment, MarginL, MarginR, MarginV",
+        "Style: Default,Arial,20,&H00FFFFFF,0,0,2,10,10,10", "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for start, end, lines in _cues(rng, n_cues):
+        s = _timestamp(start, ".")[1:-1]   # ASS uses H:MM:SS.cc
+        e = _timestamp(end, ".")[1:-1]
+        text = "\\N".join(lines)
+        if rng.random() < 0.2:
+            text = "{\\i1}" + text + "{\\i0}"
+        out.append(f"Dialogue: 0,{s},{e},Default,,0,0,0,,{text}")
+    return "\n".join(out) + "\n"
+
+
+MAKERS = {"srt": make_srt, "vtt": make_vtt, "ass": make_ass}
+
+
+def rerelease(rng, text):
+    """
+    Another release of the same subtitles: timestamps rescaled and shifted (fps
+    variant or different rip) and a few lines dropped or retyped.
+    """
+    ratio, shift = rng.choice(FPS_RATIOS), rng.uniform(-2.0, 2.0)
+
+    def retime(match):
+        h, m, s, sep, frac = match.groups()
+        seconds = max(0.0, (int(h) * 3600 + int(m) * 60 + int(s) + int(frac) / 10 ** len(frac)) * ratio + shift)
+        stamp = _timestamp(seconds, sep)
+        return stamp[1:-1] if len(h) == 1 else stamp    # keep the ASS H:MM:SS.cc shape
+
+    lines = []
+    for line in TIMESTAMP.sub(retime, text).splitlines():
+        roll = rng.random()
+        if roll < 0.02 and not TIMESTAMP.search(line):
+            continue
+        lines.append(line.upper() if roll > 0.99 else line)
+    return "\n".join(lines) + "\n"
+
+
+def generate_files(n_files, cues_per_file=400, seed=42, formats=FORMATS, duplicate_rate=0.0):
+    """
+    Yield (file_name, text) for a reproducible synthetic subtitle corpus. With
+    `duplicate_rate`, that fraction of files are re-releases of an earlier movie.
+    """
+    rng = random.Random(seed)
+    originals = []
+    for i in range(n_files):
+        if originals and rng.random() < duplicate_rate:
+            name, text = rng.choice(originals)
+            stem, fmt = name.rsplit(".", 1)
+            yield f"{stem}_rip{i:05d}.{fmt}", rerelease(rng, text)
+            continue
+        fmt = formats[i % len(formats)]
+        n_cues = max(1, int(rng.gauss(cues_per_file, cues_per_file * 0.2)))
+        name, text = f"synthetic_movie_{i:05d}.{fmt}", MAKERS[fmt](rng, n_cues)
+        if duplicate_rate:
+            originals.append((name, text))
+        yield name, text
+
+
+def write_corpus(folder, n_files, cues_per_file=400, seed=42):
+    """Write the synthetic corpus to `folder`; returns the total bytes written."""
+    os.makedirs(folder, exist_ok=True)
+    total = 0
+    for name, text in generate_files(n_files, cues_per_file, seed):
+        data = text.encode("utf-8")
+        with open(os.path.join(folder, name), "wb") as f:
+            f.write(data)
+        total += len(data)
+    return total
+
+
+def write_zipfiles_db(db_path, n_files, cues_per_file=400, seed=42, duplicate_rate=0.0):
+    """
+    Build a local SQLite database with the same `zipfiles` (num, name, content)
+    table as the OpenSubtitles dump, each row a zip BLOB holding one subtitle file.
+    Returns the total uncompressed subtitle bytes.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE zipfiles (num INTEGER, name TEXT, content BLOB)")
+    total = 0
+    rows = []
+    for num, (name, text) in enumerate(generate_files(n_files, cues_per_file, seed, duplicate_rate=duplicate_rate)):
+        data = text.encode("utf-8")
+        total += len(data)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+            zip_ref.writestr(name, data)
+        release = name.rsplit(".", 1)[0].replace("_", ".") + ".(2001).eng.1cd"
+        rows.append((num, release, buffer.getvalue()))
+        if len(rows) >= 500:
+            conn.executemany("INSERT INTO zipfiles VALUES (?, ?, ?)", rows)
+            rows = []
+    if rows:
+        conn.executemany("INSERT INTO zipfiles VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return total
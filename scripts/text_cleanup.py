@@ -0,0 +1,192 @@
+import re
+import html
+
+# ✅ Precompiled patterns shared by ingestion (cue cleaning) and result display
+HTML_TAG = re.compile(r"<[^>]*>")
+HTML_TAG_IN_LINE = re.compile(r"<[^>\n]*>")            # batch mode: a tag never spans two cues
+DISALLOWED_CHARS = re.compile(r"[^a-zA-Z0-9\s.,!?']+")
+# Same rule as DISALLOWED_CHARS for pure-ASCII text, applied with str.translate (no regex scan)
+ASCII_DISALLOWED = str.maketrans({chr(i): " " for i in range(128)
+                                  if not (chr(i).isalnum() or chr(i).isspace() or chr(i) in ".,!?'")})
+URL = re.compile(r"http\S+")
+BATCH_SEPARATOR = "\x00\x1f\x00"    # own line between documents in the batch API
+# Every line break str.splitlines() splits on ("\r\n" counts as "\r" then "\n")
+LINE_BREAK_CHARS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+LINE_BREAK = re.compile(f"[{LINE_BREAK_CHARS}]")
+OTHER_LINE_BREAK = re.compile(f"[{LINE_BREAK_CHARS[1:]}]")
+
+# Lines containing any of these (case-insensitive) are release/site boilerplate, not dialogue
+SKIP_PHRASES = (
+    "movie information", "imdb link", "uploader", "download",
+    "filename", "nfo created", "md5", "fps", "language",
+    "format", "subtitles", "www.opensubtitles.org",
+    "we set the standards", "the benchmark", "score", "org",
+)
+DISPLAY_MAX_LEN = 300
+
+
+def collapse_whitespace(text):
+    """Runs of any whitespace -> one space, stripped (str.split is much faster than a \\s+ regex)."""
+    return " ".join(text.split())
+
+
+def replace_disallowed(text):
+    """Everything but letters, numbers, whitespace and .,!?' becomes a space."""
+    return text.translate(ASCII_DISALLOWED) if text.isascii() else DISALLOWED_CHARS.sub(" ", text)
+
+
+def clean_cue_text(text):
+    """Drop markup and keep only letters, numbers and basic punctuation."""
+    if "<" in text:
+        text = HTML_TAG.sub(" ", text)
+    if "&" in text:
+        text = html.unescape(text)
+    return collapse_whitespace(replace_disallowed(text))
+
+
+def clean_cue_texts(texts):
+    """
+    `clean_cue_text` for a list of cues at once: the cues are joined into one
+    string so each pattern runs once per batch instead of once per cue.
+    Returns one cleaned string (possibly empty) per input cue.
+    """
+    if not texts:
+        return []
+    blob = "\n".join(text.replace("\n", " ") if "\n" in text else text for text in texts)
+    if "<" in blob:
+        blob = HTML_TAG_IN_LINE.sub(" ", blob)
+    if "&" in blob:
+        unescaped = html.unescape(blob)
+        if unescaped.count("\n") != blob.count("\n"):    # an entity decoded to a newline
+            return [clean_cue_text(text) for text in texts]
+        blob = unescaped
+    return [collapse_whitespace(line) for line in replace_disallowed(blob).split("\n")]
+
+
+def phrase_trie_pattern(phrases):
+    """
+    One regex alternation for all phrases, factored as a prefix trie so each
+    position is tested against a single branch per character. Phrases that
+    contain another phrase are dropped (the shorter one already matches).
+    """
+    kept = []
+    for phrase in sorted({p.lower() for p in phrases if p}, key=len):
+        if not any(k in phrase for k in kept):
+            kept.append(phrase)
+    trie = {}
+    for phrase in kept:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        if "" in node:
+            return ""
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+class SkipPhraseMatcher:
+    """
+    Removes every line that contains one of `phrases`, in a single scan of the
+    text with one compiled trie alternation (instead of testing every phrase
+    against every line).
+    """
+
+    def __init__(self, phrases=SKIP_PHRASES):
+        pattern = phrase_trie_pattern(phrases)
+        self.pattern = re.compile(pattern)                          # run on lowercased text
+        self.pattern_ignorecase = re.compile(pattern, re.IGNORECASE)
+
+    def remove_lines(self, text):
+        """
+        `text` without the lines that contain a skip phrase (other line breaks are
+        kept). Lines end at the same breaks as str.splitlines(); a "\\r\\n" pair is
+        two breaks here, which only leaves an extra empty (whitespace) line.
+        """
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            search, haystack = self.pattern.search, lowered
+        else:
+            # Lowercasing changed some lengths (rare Unicode): match case-insensitively in place
+            search, haystack = self.pattern_ignorecase.search, text
+        if OTHER_LINE_BREAK.search(haystack):
+            return self._remove_lines_any_break(text, haystack, search)
+        parts, position = [], 0
+        match = search(haystack)
+        while match:
+            parts.append(text[position:haystack.rfind("\n", 0, match.start()) + 1])
+            end = haystack.find("\n", match.end())
+            if end < 0:
+                return "".join(parts)
+            position = end + 1
+            match = search(haystack, position)
+        parts.append(text[position:])
+        return "".join(parts)
+
+    def _remove_lines_any_break(self, text, haystack, search):
+        """`remove_lines` for text that also has line breaks other than "\\n"."""
+        parts, position = [], 0
+        match = search(haystack)
+        while match:
+            # Start of the matched line: just after the last break between `position` and the match
+            start = max(haystack.rfind(ch, position, match.start()) for ch in LINE_BREAK_CHARS) + 1
+            parts.append(text[position:max(start, position)])
+            end = LINE_BREAK.search(haystack, match.end())
+            if end is None:
+                return "".join(parts)
+            position = end.end()
+            match = search(haystack, position)
+        parts.append(text[position:])
+        return "".join(parts)
+
+
+DEFAULT_MATCHER = SkipPhraseMatcher()
+
+
+def _finish(cleaned, without_urls, max_len):
+    if max_len is not None:
+        # Collapsing a prefix gives a prefix of the collapsed text, so long chunks
+        # only need their first few hundred characters collapsed
+        head = collapse_whitespace(cleaned[:4 * max_len])
+        if len(head) > max_len:
+            return head[:max_len] + "..."
+    cleaned = collapse_whitespace(cleaned)
+    if not cleaned:
+        cleaned = without_urls.strip()
+    if max_len is not None and len(cleaned) > max_len:
+        cleaned = cleaned[:max_len] + "..."
+    return cleaned
+
+
+def cleanup_document(doc, max_len=DISPLAY_MAX_LEN, matcher=DEFAULT_MATCHER):
+    """
+    Clean up one retrieved subtitle chunk for display: remove URLs and any line
+    containing a skip phrase, collapse whitespace and truncate to `max_len`
+    characters. If cleaning removes everything, the text without URLs is shown.
+    """
+    if not doc:
+        return ""
+    without_urls = URL.sub("", doc) if "http" in doc else doc
+    return _finish(matcher.remove_lines(without_urls), without_urls, max_len)
+
+
+def cleanup_documents(docs, max_len=DISPLAY_MAX_LEN, matcher=DEFAULT_MATCHER):
+    """
+    `cleanup_document` for many documents at once: URL removal and the skip-phrase
+    scan run once over all documents joined together.
+    """
+    docs = [doc or "" for doc in docs]
+    if not docs:
+        return []
+    if any(BATCH_SEPARATOR in doc for doc in docs):
+        return [cleanup_document(doc, max_len, matcher) for doc in docs]
+    # The separator sits on its own line, so removing a neighbouring line never touches it
+    blob = f"\n{BATCH_SEPARATOR}\n".join(docs)
+    without_urls = URL.sub("", blob) if "http" in blob else blob
+    kept = matcher.remove_lines(without_urls).split(BATCH_SEPARATOR)
+    return [_finish(cleaned, original, max_len) if doc else ""
+            for doc, cleaned, original in zip(docs, kept, without_urls.split(BATCH_SEPARATOR))]
@@ -0,0 +1,148 @@
+import os
+import re
+import argparse
+
+# ✅ Chunking defaults (lengths are in model word pieces, not whitespace tokens)
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+OVERLAP_TOKENS = 32
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class TokenChunker:
+    """
+    Packs text into chunks that exactly fill the embedding model's input window.
+
+    Lengths are measured with the model's own tokenizer, so every chunk is at most
+    `max_seq_length` word pieces including [CLS]/[SEP] and nothing is truncated at
+    encode time. With `boundary="sentence"` (or when packing cues) chunks only
+    break between units; units longer than the window fall back to token windows.
+    """
+
+    def __init__(self, tokenizer, max_seq_length=256, overlap=OVERLAP_TOKENS, boundary=None):
+        self.tokenizer = tokenizer
+        self.budget = max_seq_length - tokenizer.num_special_tokens_to_add(pair=False)
+        self.overlap = min(overlap, self.budget // 2)
+        self.boundary = boundary
+
+    def count_tokens(self, texts):
+        """Word-piece counts (without special tokens) for a list of texts."""
+        if not texts:
+            return []
+        encoded = self.tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def chunk_text(self, text):
+        """Chunk one cleaned document, honouring the configured boundary mode."""
+        if not text:
+            return []
+        if self.boundary == "sentence":
+            return self.chunk_units([s for s in SENTENCE_END.split(text) if s])
+        return self._token_windows(text)
+
+    def _token_windows(self, text):
+        """Fixed windows of `budget` word pieces with `overlap` pieces shared, cut at token offsets."""
+        offsets = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True,
+                                 verbose=False)["offset_mapping"]
+        chunks = []
+        step = self.budget - self.overlap
+        for start in range(0, len(offsets), step):
+            end = min(start + self.budget, len(offsets))
+            chunks.append(text[offsets[start][0]:offsets[end - 1][1]])
+            if end == len(offsets):
+                break
+        return chunks
+
+    def chunk_units(self, units):
+        """
+        Greedily pack whole units (subtitle cues or sentences) into windows. The
+        last units of a chunk, up to `overlap` word pieces, are repeated at the
+        start of the next one.
+        """
+        return [text for text, _, _ in self.chunk_unit_spans(units)]
+
+    def chunk_unit_spans(self, units):
+        """Like `chunk_units`, but returns (text, first_unit, last_unit) so chunks can be mapped back to cues."""
+        chunks = []
+        current, current_lens, current_len, first = [], [], 0, 0
+        for i, (unit, n) in enumerate(zip(units, self.count_tokens(units))):
+            if n > self.budget:
+                if current:
+                    chunks.append((" ".join(current), first, i - 1))
+                    current, current_lens, current_len = [], [], 0
+                chunks.extend((window, i, i) for window in self._token_windows(unit))
+                first = i + 1
+                continue
+            if current and current_len + n > self.budget:
+                chunks.append((" ".join(current), first, i - 1))
+                # Carry trailing units into the next chunk as overlap
+                keep = 0
+                carried = 0
+                for length in reversed(current_lens):
+                    if carried + length > self.overlap or carried + length + n > self.budget:
+                        break
+                    carried += length
+                    keep += 1
+                current = current[len(current) - keep:] if keep else []
+                current_lens = current_lens[len(current_lens) - keep:] if keep else []
+                current_len = carried
+                first = i - keep
+            current.append(unit)
+            current_lens.append(n)
+            current_len += n
+        if current:
+            chunks.append((" ".join(current), first, len(units) - 1))
+        return chunks
+
+
+def load_chunker(model=None, overlap=OVERLAP_TOKENS, boundary=None):
+    """Build a TokenChunker from a SentenceTransformer (loaded here if not given)."""
+    if model is None:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(MODEL_NAME)
+    return TokenChunker(model.tokenizer, model.max_seq_length, overlap, boundary)
+
+
+def truncation_report(texts, chunker, legacy_chunk_text):
+    """
+    Compare the legacy whitespace chunker with token-aware chunking: how many
+    word pieces each produces and how many the model would silently drop.
+    """
+    report = {"legacy_chunks": 0, "legacy_tokens": 0, "legacy_truncated_tokens": 0,
+              "token_chunks": 0, "token_tokens": 0, "token_truncated_tokens": 0}
+    for text in texts:
+        for key, chunks in (("legacy", legacy_chunk_text(text)), ("token", chunker.chunk_text(text))):
+            lengths = chunker.count_tokens(chunks)
+            report[f"{key}_chunks"] += len(chunks)
+            report[f"{key}_tokens"] += sum(lengths)
+            report[f"{key}_truncated_tokens"] += sum(max(0, n - chunker.budget) for n in lengths)
+    for key in ("legacy", "token"):
+        total = report[f"{key}_tokens"]
+        report[f"{key}_indexed_fraction"] = 1 - report[f"{key}_truncated_tokens"] / total if total else 1.0
+    return report
+
+
+if __name__ == "__main__":
+    from chunk_subtitles import chunk_text, INPUT_FOLDER
+
+    parser = argparse.ArgumentParser(description="Report truncated vs indexed tokens for legacy and token-aware chunking.")
+    parser.add_argument("--input", default=INPUT_FOLDER, help="Folder of cleaned subtitle files")
+    parser.add_argument("--overlap", type=int, default=OVERLAP_TOKENS)
+    parser.add_argument("--boundary", choices=["none", "sentence"], default="none")
+    parser.add_argument("--limit", type=int, default=200, help="Max files to sample")
+    args = parser.parse_args()
+
+    chunker = load_chunker(overlap=args.overlap, boundary=None if args.boundary == "none" else args.boundary)
+    files = sorted(os.listdir(args.input))[:args.limit]
+    texts = []
+    for filename in files:
+        with open(os.path.join(args.input, filename), "r", encoding="utf-8", errors="ignore") as f:
+            texts.append(f.read())
+
+    report = truncation_report(texts, chunker, chunk_text)
+    print(f"📊 Sampled {len(texts)} files (window {chunker.budget} word pieces, overlap {chunker.overlap})")
+    print(f"   legacy 500-word chunks: {report['legacy_chunks']} chunks, "
+          f"{report['legacy_truncated_tokens']} of {report['legacy_tokens']} word pieces truncated "
+          f"({report['legacy_indexed_fraction']:.0%} indexed)")
+    print(f"   token-aware chunks:     {report['token_chunks']} chunks, "
+          f"{report['token_truncated_tokens']} of {report['token_tokens']} word pieces truncated "
+          f"({report['token_indexed_fraction']:.0%} indexed)")
@@ -0,0 +1,181 @@
+import io
+import wave
+from math import gcd
+import threading
+import numpy as np
+
+from instrumentation import span
+
+# ✅ Transcription defaults
+WHISPER_MODEL = "openai/whisper-small"
+SAMPLING_RATE = 16000      # Whisper's expected input rate
+CHUNK_LENGTH_S = 30        # long clips are split into 30s windows...
+STRIDE_LENGTH_S = 5        # ...overlapping by 5s on each side so words at the edges aren't cut
+BATCH_SIZE = 8             # windows decoded per forward pass
+
+# Voice-activity trimming (energy based)
+VAD_FRAME_MS = 30
+VAD_THRESHOLD_DB = -40.0   # frames quieter than this (relative to the loudest frame) count as silence
+VAD_PADDING_MS = 200       # speech is padded so word onsets/endings are kept
+VAD_MAX_GAP_MS = 1000      # internal silences longer than this are shortened to this length
+
+
+def decode_audio_bytes(data):
+    """
+    Decode an in-memory audio file to (mono float32 samples, sampling_rate)
+    without touching the disk. WAV is read with the stdlib `wave` module;
+    other formats use soundfile if it is installed.
+    """
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            n_channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+        if width == 1:
+            audio = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+        elif width == 2:
+            audio = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768
+        elif width == 4:
+            audio = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648
+        else:
+            raise wave.Error(f"unsupported sample width: {width}")
+    except wave.Error:
+        # Not a plain PCM WAV (float WAV, FLAC, OGG, ...)
+        import soundfile as sf
+        audio, rate = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+        n_channels = audio.shape[1]
+        audio = audio.reshape(-1)
+    if n_channels > 1:
+        audio = audio.reshape(-1, n_channels).mean(axis=1)
+    return np.ascontiguousarray(audio, dtype=np.float32), rate
+
+
+def resample(audio, rate, target=SAMPLING_RATE):
+    """
+    Resample mono float32 audio from `rate` to `target` Hz, so the ASR pipeline
+    never has to (transformers would need torchaudio for that). Uses scipy's
+    polyphase filter when installed, linear interpolation otherwise.
+    """
+    if rate == target or len(audio) == 0:
+        return audio
+    try:
+        from scipy.signal import resample_poly
+
+        g = gcd(int(rate), int(target))
+        return resample_poly(audio, target // g, int(rate) // g).astype(np.float32)
+    except ImportError:
+        n_out = int(round(len(audio) * target / rate))
+        positions = np.arange(n_out, dtype=np.float64) * (rate / target)
+        return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def trim_silence(audio, rate, threshold_db=VAD_THRESHOLD_DB, frame_ms=VAD_FRAME_MS, padding_ms=VAD_PADDING_MS,
+                 max_gap_ms=VAD_MAX_GAP_MS):
+    """
+    Drop leading/trailing silence and shorten long pauses before the model runs.
+    Returns the trimmed samples (the input unchanged if it is all silence).
+    """
+    frame = max(1, int(rate * frame_ms / 1000))
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return audio
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    voiced = energy_db > energy_db.max() + threshold_db
+    if not voiced.any():
+        return audio
+
+    # Pad speech regions, then keep at most `max_gap` frames of each remaining silence
+    pad = int(padding_ms / frame_ms)
+    padded = voiced.copy()
+    for shift in range(1, pad + 1):
+        padded[:-shift] |= voiced[shift:]
+        padded[shift:] |= voiced[:-shift]
+    first, last = np.argmax(padded), len(padded) - np.argmax(padded[::-1])
+    keep = padded.copy()
+    max_gap = int(max_gap_ms / frame_ms)
+    gap = 0
+    for i in range(first, last):
+        if padded[i]:
+            gap = 0
+        else:
+            gap += 1
+            keep[i] = gap <= max_gap
+    keep[:first] = False
+    keep[last:] = False
+    return frames[keep].reshape(-1)
+
+
+class Transcriber:
+    """
+    Reusable Whisper transcription component.
+
+    The ASR pipeline is built once (lazily, thread-safe) and reused for every
+    query. Audio is decoded from the in-memory upload, optionally trimmed of
+    silence, and long clips go through chunked, batched inference with a stride.
+    """
+
+    def __init__(self, model_name=WHISPER_MODEL, chunk_length_s=CHUNK_LENGTH_S, stride_length_s=STRIDE_LENGTH_S,
+                 batch_size=BATCH_SIZE, trim=True):
+        self.model_name = model_name
+        self.chunk_length_s = chunk_length_s
+        self.stride_length_s = stride_length_s
+        self.batch_size = batch_size
+        self.trim = trim
+        self.pipeline = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.pipeline is None:
+                # transformers (and torch) are only imported when audio is actually used
+                from transformers import pipeline
+                self.pipeline = pipeline("automatic-speech-recognition", model=self.model_name,
+                                         chunk_length_s=self.chunk_length_s)
+            return self.pipeline
+
+    def warm_up_in_background(self):
+        threading.Thread(target=self.load, name="whisper-warmup", daemon=True).start()
+
+    def transcribe_array(self, audio, rate, language=None):
+        with span("resample"):
+            audio, rate = resample(audio, rate), SAMPLING_RATE
+        if self.trim:
+            with span("vad_trim"):
+                audio = trim_silence(audio, rate)
+        with span("whisper_load"):
+            asr = self.load()
+        generate_kwargs = {"task": "transcribe"}
+        if language:
+            generate_kwargs["language"] = language
+        with span("transcribe"):
+            result = asr(
+                {"raw": audio, "sampling_rate": rate},
+                stride_length_s=self.stride_length_s,
+                batch_size=self.batch_size,
+                return_timestamps=True,
+                generate_kwargs=generate_kwargs,
+            )
+        return result["text"].strip()
+
+    def transcribe_bytes(self, data, language=None):
+        """Transcribe an uploaded audio file held in memory."""
+        with span("decode_audio"):
+            audio, rate = decode_audio_bytes(data)
+        return self.transcribe_array(audio, rate, language)
+
+    def transcribe_file(self, path, language=None):
+        with open(path, "rb") as f:
+            return self.transcribe_bytes(f.read(), language)
+
+
+_default_transcriber = None
+_default_lock = threading.Lock()
+
+
+def get_transcriber():
+    """Process-wide shared Transcriber, so the model is loaded at most once."""
+    global _default_transcriber
+    with _default_lock:
+        if _default_transcriber is None:
+            _default_transcriber = Transcriber()
+        return _default_transcriber
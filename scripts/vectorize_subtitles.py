@@ -1,115 +1,123 @@
 import os
-import json
-from sentence_transformers import SentenceTransformer
 import chromadb
 
-# Step 1: Initialize ChromaDB Client
+from embedding_engine import EmbeddingEngine, MODEL_NAME
+from embedding_store import EmbeddingStore, STORE_DIR
+from lexical_index import LexicalIndex, LEXICAL_INDEX_PATH
+from ingest_manifest import (IngestManifest, content_hash, iter_incremental_chunks, commit_batch,
+                             remove_missing_sources, new_stats, summary, MANIFEST_PATH)
 
+# Embedding parameters
+ENCODE_BATCH_SIZE = 64    # texts per model forward pass
+NUM_WORKERS = 1           # CPU worker processes used for encoding (1 = in-process)
+ENCODER = "torch"         # "onnx" / "onnx-int8": ONNX Runtime encoder (see onnx_encoder.py), needs NUM_WORKERS = 1
+BATCH_SIZE = 1000         # Insert in batches of 1000
 
-# Ensure the persistence directory exists
-PERSIST_DIR = "chroma_db"
-os.makedirs(PERSIST_DIR, exist_ok=True)
-
-# Initialize ChromaDB client using PersistentClient (local, self-contained)
-chroma_client = chromadb.PersistentClient(path=PERSIST_DIR)
-collection = chroma_client.get_or_create_collection(name="subtitle_chunks")
-print("✅ ChromaDB initialized and collection loaded.")
-
-# Step 2: Clear Existing Data (for a Fresh Start)
-
-existing = collection.get()
-if existing["ids"]:
-    # Delete existing records in batches to avoid batch size limits
-    batch_size_delete = 10000
-    total_ids = existing["ids"]
-    for i in range(0, len(total_ids), batch_size_delete):
-        batch = total_ids[i:i + batch_size_delete]
-        collection.delete(ids=batch)
-        print(f"✅ Deleted batch of IDs from {i} to {i+len(batch)}")
-else:
-    print("✅ No existing data found in collection.")
-
-# Step 3: Load the SentenceTransformer Model
-
-model_name = "sentence-transformers/all-MiniLM-L6-v2"
-model = SentenceTransformer(model_name)
-print(f"✅ Loaded model: {model_name}")
+CHUNKS_FOLDER = "chunked_subtitles"       # Folder with chunked subtitle files
+CHUNKS_DATASET = None                     # e.g. "chunked_subtitles.parquet" to read chunks from the columnar dataset
+EMBEDDINGS_OUTPUT = STORE_DIR             # Backup binary embedding store (memory-mappable)
+EMBEDDINGS_DTYPE = "float32"               # or "float16" to halve the backup size
+LEXICAL_INDEX = LEXICAL_INDEX_PATH        # BM25 index for exact-quote and hybrid search (None to skip)
+NUM_SHARDS = 1                            # >1 splits the collection into hash-routed shards (see sharding.py)
 
-# Step 4: Process Chunk Files and Generate Embeddings
 
-CHUNKS_FOLDER = "chunked_subtitles"       # Folder with chunked subtitle files
-EMBEDDINGS_OUTPUT = "embeddings.json"      # Backup JSON file
-
-# Gather all chunk files (assumed to be .txt files)
-chunk_files = [os.path.join(CHUNKS_FOLDER, f) for f in os.listdir(CHUNKS_FOLDER) if f.endswith(".txt")]
-print(f"📂 Found {len(chunk_files)} chunk files.")
-
-# Prepare for batching and backup storage
-embedding_data = []   # For optional JSON backup
-batch_docs = []
-batch_embeddings = []
-batch_ids = []
-batch_size = 1000     # Insert in batches of 1000
-chunk_id = 0
-
-def flush_batch():
-    global batch_docs, batch_embeddings, batch_ids
-    if batch_ids:
-        collection.add(
-            documents=batch_docs,
-            embeddings=batch_embeddings,
-            ids=batch_ids
-        )
-        print(f"✅ Batch inserted with {len(batch_ids)} items.")
-        batch_docs = []
-        batch_embeddings = []
-        batch_ids = []
-
-# Process each chunk file
-for file_path in chunk_files:
+def read_chunk_file(file_path):
+    """Return the list of chunk texts stored in one `*_chunks.txt` file."""
     with open(file_path, "r", encoding="utf-8") as f:
         # Split file into chunks using the marker "--- CHUNK"
         file_content = f.read().split("--- CHUNK")
-        for i, chunk in enumerate(file_content):
-            chunk = chunk.strip()
-            if not chunk:
-                continue
-
-            # Remove header line if present; get pure text
-            lines = chunk.splitlines()
-            text = " ".join(lines[1:]).strip() if len(lines) > 1 else lines[0].strip()
-
-            if text:
-                # Generate embedding for the text chunk
-                embedding = model.encode(text).tolist()
-
-                # Create a unique id for this chunk
-                chunk_id += 1
-                doc_id = f"chunk_{chunk_id}"
-
-                # Append data to the batch lists
-                batch_docs.append(text)
-                batch_embeddings.append(embedding)
-                batch_ids.append(doc_id)
-
-                # Also save to backup list
-                embedding_data.append({
-                    "id": doc_id,
-                    "text": text,
-                    "embedding": embedding
-                })
-
-                if len(batch_ids) >= batch_size:
-                    flush_batch()
-                    print(f"🔥 Processed {chunk_id} chunks...")
-
-# Flush any remaining items in the batch
-flush_batch()
-
-print(f"\n🎯 Total chunks processed: {chunk_id}")
-
-# Step 5: Save Backup Embedding Data to a JSON File
-
-with open(EMBEDDINGS_OUTPUT, "w", encoding="utf-8") as f_out:
-    json.dump(embedding_data, f_out)
-print("✅ Embedding generation and storage complete!")
+    texts = []
+    for chunk in file_content:
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+
+        # Remove header line if present; get pure text
+        lines = chunk.splitlines()
+        text = " ".join(lines[1:]).strip() if len(lines) > 1 else lines[0].strip()
+        if text:
+            texts.append(text)
+    return texts
+
+
+def iter_chunk_files(chunk_files):
+    """Yield (source, file_hash, get_chunks) for the manifest; chunks are only parsed if needed."""
+    for file_path in chunk_files:
+        with open(file_path, "rb") as f:
+            file_hash = content_hash(f.read())
+        yield os.path.basename(file_path), file_hash, (lambda path=file_path: read_chunk_file(path))
+
+
+# The worker pool re-imports this module, so everything that does work lives under __main__
+if __name__ == "__main__":
+    # Step 1: Initialize ChromaDB Client
+
+    # Ensure the persistence directory exists
+    PERSIST_DIR = "chroma_db"
+    os.makedirs(PERSIST_DIR, exist_ok=True)
+
+    # Initialize ChromaDB client using PersistentClient (local, self-contained)
+    if NUM_SHARDS > 1:
+        # One Chroma directory and worker process per shard; chunks are routed by a hash of their ID
+        from sharding import ShardedCollection
+        collection = ShardedCollection(PERSIST_DIR, num_shards=NUM_SHARDS)
+        print(f"✅ ChromaDB initialized with {NUM_SHARDS} shards.")
+    else:
+        chroma_client = chromadb.PersistentClient(path=PERSIST_DIR)
+        collection = chroma_client.get_or_create_collection(name="subtitle_chunks")
+        print("✅ ChromaDB initialized and collection loaded.")
+
+    # Step 2: Open the Ingestion Manifest (replaces the wipe-and-rebuild)
+
+    # Only new or changed chunk files are embedded; a crashed run resumes from its last committed batch
+    manifest = IngestManifest(MANIFEST_PATH)
+    stats = new_stats()
+    finished = []
+    print(f"✅ Ingestion manifest loaded: {MANIFEST_PATH}")
+
+    # Step 3: Load the SentenceTransformer Model
+
+    engine = EmbeddingEngine(MODEL_NAME, batch_size=ENCODE_BATCH_SIZE, num_workers=NUM_WORKERS, encoder=ENCODER)
+    print(f"✅ Loaded model: {MODEL_NAME} ({ENCODER}, {NUM_WORKERS} worker(s), encode batch {ENCODE_BATCH_SIZE})")
+
+    # Step 4: Process Chunk Files and Generate Embeddings
+
+    if CHUNKS_DATASET:
+        # Chunks stream in as record batches with their source, index and offsets; no marker parsing
+        from columnar_dataset import iter_dataset_chunk_files
+        chunk_sources = iter_dataset_chunk_files(CHUNKS_DATASET)
+        print(f"📂 Reading chunks from {CHUNKS_DATASET}.")
+    else:
+        # Gather all chunk files (assumed to be .txt files)
+        chunk_files = [os.path.join(CHUNKS_FOLDER, f) for f in os.listdir(CHUNKS_FOLDER) if f.endswith(".txt")]
+        chunk_sources = iter_chunk_files(chunk_files)
+        print(f"📂 Found {len(chunk_files)} chunk files.")
+
+    # Backup store is appended batch by batch, so it costs no extra RAM
+    backup_store = EmbeddingStore(EMBEDDINGS_OUTPUT, dtype=EMBEDDINGS_DTYPE)
+    # The lexical index receives exactly the chunks (and IDs) that go into Chroma
+    lexical_index = LexicalIndex(LEXICAL_INDEX) if LEXICAL_INDEX else None
+    records = iter_incremental_chunks(manifest, chunk_sources, finished, stats)
+
+    # Chunks are gathered into groups of BATCH_SIZE, encoded together and inserted together
+    with engine:
+        for batch, embeddings in engine.embed_batches(records, gather_size=BATCH_SIZE):
+            commit_batch(manifest, collection, batch, embeddings, finished, stats, backup_store=backup_store,
+                         lexical_index=lexical_index)
+            print(f"✅ Batch upserted with {len(batch)} items.")
+            print(f"🔥 Processed {stats['embedded_chunks']} chunks... ({engine.chunks_per_sec:.1f} chunks/sec)")
+
+    # Close out files whose chunks were all reused, then drop chunks of deleted files
+    commit_batch(manifest, collection, [], [], finished, stats, backup_store=backup_store,
+                 lexical_index=lexical_index)
+    remove_missing_sources(manifest, collection, stats, backup_store=backup_store, lexical_index=lexical_index)
+    manifest.close()
+    if lexical_index is not None:
+        lexical_index.close()
+    if NUM_SHARDS > 1:
+        collection.close()
+
+    print(f"\n🎯 Total chunks processed: {stats['embedded_chunks']}")
+    print(summary(stats))
+    print(engine.report())
+    print(f"✅ Embedding generation and storage complete! Backup store: {EMBEDDINGS_OUTPUT} ({backup_store.count} rows)")
@@ -1,10 +1,12 @@
-from transformers import pipeline
 import os
 
+from transcriber import get_transcriber
+
 def get_user_query(input_type="text", force_language=None):
     """
     Accepts user input: either a text query or a path to an audio (.wav) file.
-    If the input is audio, it uses the Hugging Face Whisper pipeline to transcribe the audio.
+    If the input is audio, it uses the shared Whisper transcriber (loaded once per process)
+    to transcribe the audio straight from memory.
     
     Parameters:
       input_type (str): "text" or "audio"
@@ -26,21 +28,15 @@ def get_user_query(input_type="text", force_language=None):
             return None
 
         print("🎧 Processing audio with Whisper...")
-        # Load Whisper model via Hugging Face pipeline
-        whisper_model = pipeline("automatic-speech-recognition", model="openai/whisper-small")
-        
-        # If force_language is provided, pass it in generate_kwargs to force transcription in that language.
-        if force_language:
-            result = whisper_model(audio_path, 
-                                   return_timestamps=True, 
-                                   generate_kwargs={"task": "transcribe", "language": force_language})
-        else:
-            result = whisper_model(audio_path, return_timestamps=True)
+        # The pipeline is built on first use and reused by every later call;
+        # silence is trimmed and long clips are transcribed in strided 30s chunks.
+        text = get_transcriber().transcribe_file(audio_path, language=force_language)
         
-        print(f"✅ Transcribed Text: {result['text']}\n")
-        return result["text"]
+        print(f"✅ Transcribed Text: {text}\n")
+        return text
 
 # Test the function.
 # For maximum accuracy on your English dataset, we force language to English.
-query = get_user_query(input_type="audio", force_language="en")
-print("Final Query:", query)
+if __name__ == "__main__":
+    query = get_user_query(input_type="audio", force_language="en")
+    print("Final Query:", query)
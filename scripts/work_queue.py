@@ -0,0 +1,511 @@
+import os
+import json
+import time
+import shutil
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+
+from embedding_engine import EmbeddingEngine, MODEL_NAME, ENCODE_BATCH_SIZE, ENCODER_BACKENDS
+from embedding_store import EmbeddingStore, EmbeddingStoreReader
+from chunk_metadata import chunk_metadata
+from lexical_index import LexicalIndex
+from cue_index import add_cue_vectors, CUE_INDEX_KEY, CUE_VECTORS_KEY
+from ingest_manifest import (IngestManifest, iter_incremental_chunks, commit_batch, new_stats, summary,
+                             MANIFEST_PATH)
+from stream_ingest import (iter_subtitle_files, iter_manifest_files, decode_subtitle_bytes, DB_PATH, PERSIST_DIR,
+                           COLLECTION_NAME, CHUNKER, CUE_VECTORS, SUBTITLE_EXTENSIONS)
+
+# ✅ Queue, staging and lease defaults
+QUEUE_PATH = "ingest_queue.sqlite3"
+STAGING_DIR = "ingest_staging"     # one EmbeddingStore per finished unit attempt
+UNIT_ROWS = 100                    # zipfiles rows (or subtitle files) per work unit
+LEASE_SECONDS = 300                # a unit whose lease is not renewed in time is handed to another worker
+MAX_ATTEMPTS = 3                   # after this many expired/failed leases a unit is marked failed
+POLL_SECONDS = 2.0                 # idle workers re-check the queue this often
+BATCH_SIZE = 1000                  # chunks embedded per batch inside a unit (and upserted per merge batch)
+SOURCES_FILE = "sources.jsonl"     # per staged unit: source, content hash and chunk IDs of every file
+
+
+class WorkQueue:
+    """
+    Durable queue of ingestion work units in one SQLite file.
+
+    A unit is a range of `zipfiles` rowids (or a list of subtitle files). It
+    moves pending -> leased -> done -> merged. A worker holds a lease that it
+    renews while it works; if the worker dies the lease expires and the next
+    `claim` hands the unit to another worker. Every claim counts as an attempt,
+    and a unit that runs out of attempts is marked failed with its last error.
+    All state changes are single SQLite transactions, so any number of worker
+    processes (on this box, or on hosts sharing the file) can use one queue.
+    """
+
+    def __init__(self, path=QUEUE_PATH, timeout=30.0):
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS units (
+                unit_id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                source TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_expires REAL,
+                started_at REAL,
+                finished_at REAL,
+                files INTEGER NOT NULL DEFAULT 0,
+                chunks INTEGER NOT NULL DEFAULT 0,
+                staging TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS units_by_status ON units(status);
+        """)
+
+    def _transaction(self, fn):
+        """Run `fn()` inside BEGIN IMMEDIATE, so competing workers serialize on the write lock."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn()
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return result
+
+    def plan_zip_rows(self, db_path=DB_PATH, unit_rows=UNIT_ROWS):
+        """Split the zipfiles table into rowid ranges of `unit_rows` rows. Planning a source twice is a no-op."""
+        if self.conn.execute("SELECT 1 FROM units WHERE kind = 'zip' AND source = ?", (db_path,)).fetchone():
+            return 0
+        source = sqlite3.connect(db_path)
+        rowids = [row[0] for row in source.execute("SELECT rowid FROM zipfiles ORDER BY rowid")]
+        source.close()
+        units = [(rowids[i], rowids[min(i + unit_rows, len(rowids)) - 1]) for i in range(0, len(rowids), unit_rows)]
+        return self._add_units("zip", db_path, [{"first_rowid": a, "last_rowid": b} for a, b in units])
+
+    def plan_folder(self, folder, unit_rows=UNIT_ROWS):
+        """Split a folder of subtitle files (e.g. subtitles_extracted_data) into lists of `unit_rows` files."""
+        if self.conn.execute("SELECT 1 FROM units WHERE kind = 'folder' AND source = ?", (folder,)).fetchone():
+            return 0
+        names = sorted(f for f in os.listdir(folder) if f.lower().endswith(SUBTITLE_EXTENSIONS))
+        return self._add_units("folder", folder, [{"files": names[i:i + unit_rows]}
+                                                  for i in range(0, len(names), unit_rows)])
+
+    def _add_units(self, kind, source, payloads):
+        self._transaction(lambda: self.conn.executemany(
+            "INSERT INTO units (kind, source, payload) VALUES (?, ?, ?)",
+            [(kind, source, json.dumps(payload)) for payload in payloads]))
+        return len(payloads)
+
+    def claim(self, worker, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        """
+        Lease the next pending unit, or one whose lease expired (its worker died).
+        Returns the unit as a dict (with its attempt number), or None if nothing is claimable.
+        """
+        def claim_one():
+            now = time.time()
+            # Expired leases that used up their attempts are given up on
+            self.conn.execute(
+                "UPDATE units SET status = 'failed', worker = NULL, error = COALESCE(error, 'lease expired') "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?", (now, max_attempts))
+            row = self.conn.execute(
+                "SELECT unit_id, kind, source, payload, attempts FROM units "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY unit_id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            unit_id, kind, source, payload, attempts = row
+            self.conn.execute(
+                "UPDATE units SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                "started_at = ?, error = NULL WHERE unit_id = ?", (worker, now + lease_seconds, now, unit_id))
+            return {"unit_id": unit_id, "kind": kind, "source": source, "attempt": attempts + 1,
+                    **json.loads(payload)}
+
+        return self._transaction(claim_one)
+
+    def renew(self, unit_id, worker, lease_seconds=LEASE_SECONDS):
+        """Extend a lease. False if the worker no longer holds it (it expired and was re-claimed)."""
+        cursor = self.conn.execute(
+            "UPDATE units SET lease_expires = ? WHERE unit_id = ? AND worker = ? AND status = 'leased'",
+            (time.time() + lease_seconds, unit_id, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, unit_id, worker, staging, files, chunks):
+        """Mark a unit done with its staged results. False if the lease was lost meanwhile."""
+        cursor = self.conn.execute(
+            "UPDATE units SET status = 'done', finished_at = ?, staging = ?, files = ?, chunks = ?, "
+            "lease_expires = NULL WHERE unit_id = ? AND worker = ? AND status = 'leased'",
+            (time.time(), staging, files, chunks, unit_id, worker))
+        return cursor.rowcount == 1
+
+    def fail(self, unit_id, worker, error, max_attempts=MAX_ATTEMPTS):
+        """Give a unit back after an error: pending again, or failed once attempts are used up."""
+        self.conn.execute(
+            "UPDATE units SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, lease_expires = NULL, error = ? WHERE unit_id = ? AND worker = ? AND status = 'leased'",
+            (max_attempts, error, unit_id, worker))
+
+    def retry_failed(self):
+        """Put failed units back in the queue with a fresh attempt budget."""
+        return self.conn.execute(
+            "UPDATE units SET status = 'pending', attempts = 0 WHERE status = 'failed'").rowcount
+
+    def done_units(self):
+        return self.conn.execute(
+            "SELECT unit_id, staging FROM units WHERE status = 'done' ORDER BY unit_id").fetchall()
+
+    def mark_merged(self, unit_id):
+        self.conn.execute("UPDATE units SET status = 'merged' WHERE unit_id = ?", (unit_id,))
+
+    def is_finished(self):
+        """True once no unit is pending or leased."""
+        row = self.conn.execute("SELECT COUNT(*) FROM units WHERE status IN ('pending', 'leased')").fetchone()
+        return row[0] == 0
+
+    def progress(self):
+        """Counts per status, files/chunks done, throughput over the run so far and per worker, and an ETA."""
+        now = time.time()
+        status = dict(self.conn.execute("SELECT status, COUNT(*) FROM units GROUP BY status").fetchall())
+        files, chunks, first_start, last_finish = self.conn.execute(
+            "SELECT COALESCE(SUM(files), 0), COALESCE(SUM(chunks), 0), MIN(started_at), MAX(finished_at) "
+            "FROM units WHERE status IN ('done', 'merged')").fetchone()
+        finished = status.get("done", 0) + status.get("merged", 0)
+        remaining = status.get("pending", 0) + status.get("leased", 0)
+        # The clock stops at the last finished unit once the queue is drained
+        elapsed = ((now if remaining else last_finish) or now) - (first_start or now)
+        workers = [
+            {"worker": worker, "units": units, "chunks": worker_chunks,
+             "chunks_per_sec": worker_chunks / busy if busy else 0.0}
+            for worker, units, worker_chunks, busy in self.conn.execute(
+                "SELECT worker, COUNT(*), SUM(chunks), SUM(finished_at - started_at) FROM units "
+                "WHERE status IN ('done', 'merged') GROUP BY worker ORDER BY worker")
+        ]
+        active = self.conn.execute(
+            "SELECT worker, unit_id, lease_expires - ? FROM units WHERE status = 'leased' ORDER BY unit_id",
+            (now,)).fetchall()
+        units_per_sec = finished / elapsed if elapsed > 0 else 0.0
+        return {
+            "units": sum(status.values()), "status": status, "files": files, "chunks": chunks,
+            "elapsed_s": elapsed, "chunks_per_sec": chunks / elapsed if elapsed > 0 else 0.0,
+            "eta_s": remaining / units_per_sec if units_per_sec else None,
+            "workers": workers,
+            "active": [{"worker": w, "unit_id": u, "lease_left_s": left} for w, u, left in active],
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+def format_progress(progress):
+    status = progress["status"]
+    eta = "n/a" if progress["eta_s"] is None else f"{progress['eta_s']:.0f}s"
+    lines = [
+        f"📦 Units: {progress['units']} | pending {status.get('pending', 0)} | leased {status.get('leased', 0)} | "
+        f"done {status.get('done', 0)} | merged {status.get('merged', 0)} | failed {status.get('failed', 0)}",
+        f"⚡ {progress['files']} files, {progress['chunks']} chunks in {progress['elapsed_s']:.1f}s "
+        f"({progress['chunks_per_sec']:.1f} chunks/sec) | ETA {eta}",
+    ]
+    for w in progress["workers"]:
+        lines.append(f"   👷 {w['worker']}: {w['units']} units, {w['chunks']} chunks "
+                     f"({w['chunks_per_sec']:.1f} chunks/sec while busy)")
+    for a in progress["active"]:
+        lines.append(f"   ⏳ {a['worker']} on unit {a['unit_id']} (lease {a['lease_left_s']:.0f}s left)")
+    return "\n".join(lines)
+
+
+def iter_unit_files(unit):
+    """(container, file_name, text) for every subtitle file of a unit, like stream_ingest.iter_subtitle_files."""
+    if unit["kind"] == "zip":
+        conn = sqlite3.connect(unit["source"])
+        try:
+            rows = conn.execute("SELECT rowid, name, content FROM zipfiles WHERE rowid BETWEEN ? AND ? ORDER BY rowid",
+                                (unit["first_rowid"], unit["last_rowid"])).fetchall()
+        finally:
+            conn.close()
+        yield from iter_subtitle_files(rows)
+    else:
+        container = os.path.basename(os.path.normpath(unit["source"]))
+        for name in unit["files"]:
+            with open(os.path.join(unit["source"], name), "rb") as f:
+                yield container, name, decode_subtitle_bytes(f.read())
+
+
+class LeaseKeeper(threading.Thread):
+    """Renews a unit's lease in the background while the worker embeds; records if it was lost."""
+
+    def __init__(self, queue_path, unit_id, worker, lease_seconds):
+        super().__init__(daemon=True)
+        self.args = (queue_path, unit_id, worker, lease_seconds)
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        queue_path, unit_id, worker, lease_seconds = self.args
+        queue = WorkQueue(queue_path)    # SQLite connections stay in the thread that opened them
+        try:
+            while not self.stopped.wait(lease_seconds / 3):
+                if not queue.renew(unit_id, worker, lease_seconds):
+                    self.lost = True
+                    break
+        finally:
+            queue.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def process_unit(unit, engine, token_chunker, staging_dir, manifest=None, batch_size=BATCH_SIZE, lease=None,
+                 cue_vectors=CUE_VECTORS):
+    """
+    Clean -> chunk -> embed one unit into a fresh staging EmbeddingStore, plus
+    SOURCES_FILE with each file's content hash and chunk IDs for the merge.
+    Files that `manifest` (the main ingestion manifest, read only) already has
+    at the same hash are skipped. Returns (staging_path, files, chunks).
+    """
+    staging = os.path.join(staging_dir, f"unit_{unit['unit_id']:06d}_a{unit['attempt']}")
+    shutil.rmtree(staging, ignore_errors=True)     # leftovers of a crashed attempt of this same lease
+    store = EmbeddingStore(staging)
+    files = iter_manifest_files(iter_unit_files(unit), token_chunker, cue_vectors=cue_vectors)
+    if manifest is not None:
+        files = (f for f in files if not manifest.is_current(f[0], f[1]))
+    # A private in-memory manifest makes every file "new" and supplies chunk IDs and hashes
+    unit_manifest, finished, stats = IngestManifest(":memory:"), [], new_stats()
+    records = iter_incremental_chunks(unit_manifest, files, finished, stats)
+    chunks = 0
+    for batch, embeddings in engine.embed_batches(records, gather_size=batch_size):
+        if lease is not None and lease.lost:
+            raise RuntimeError("lease lost (another worker now owns this unit)")
+        if cue_vectors:
+            add_cue_vectors(batch, lambda texts: engine.encode(texts, stage="encode_cues"))
+        store.append([r[0] for r in batch], [r[-1] for r in batch], embeddings,
+                     [chunk_metadata(r[1], r[2], **r[3]) for r in batch])
+        chunks += len(batch)
+    with open(os.path.join(staging, SOURCES_FILE), "w", encoding="utf-8") as f:
+        for source, ids in finished:
+            file_hash = unit_manifest.conn.execute(
+                "SELECT content_hash FROM files WHERE source = ?", (source,)).fetchone()[0]
+            f.write(json.dumps({"source": source, "hash": file_hash, "chunk_ids": ids}) + "\n")
+    unit_manifest.close()
+    return staging, len(finished), chunks
+
+
+def load_worker_encoder(encoder, encode_batch_size=ENCODE_BATCH_SIZE):
+    if encoder == "stub":
+        # Deterministic hashing encoder: exercises the queue without the model (local testing)
+        from stub_encoder import StubEncoder
+        return EmbeddingEngine(model=StubEncoder(), batch_size=encode_batch_size, encoder="stub")
+    return EmbeddingEngine(MODEL_NAME, batch_size=encode_batch_size, num_workers=1, encoder=encoder)
+
+
+def run_worker(queue_path=QUEUE_PATH, worker=None, staging_dir=STAGING_DIR, encoder="torch", chunker=CHUNKER,
+               manifest_path=MANIFEST_PATH, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS,
+               exit_when_empty=True, batch_size=BATCH_SIZE, cue_vectors=CUE_VECTORS):
+    """
+    Worker loop: claim a unit, process it under a renewed lease, mark it done
+    (or give it back on error), repeat. Exits when the queue has nothing left
+    to claim and no unit is still leased (or keeps polling without `exit_when_empty`).
+    """
+    from token_chunker import load_chunker
+
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    os.makedirs(staging_dir, exist_ok=True)
+    queue = WorkQueue(queue_path)
+    engine = load_worker_encoder(encoder)
+    token_chunker = load_chunker(engine.model) if chunker == "tokens" else None
+    manifest = IngestManifest(manifest_path) if manifest_path and os.path.exists(manifest_path) else None
+    units = 0
+    try:
+        while True:
+            unit = queue.claim(worker, lease_seconds, max_attempts)
+            if unit is None:
+                if exit_when_empty and queue.is_finished():
+                    break
+                time.sleep(POLL_SECONDS)    # other workers still hold leases that may expire
+                continue
+            lease = LeaseKeeper(queue_path, unit["unit_id"], worker, lease_seconds)
+            lease.start()
+            try:
+                staging, files, chunks = process_unit(unit, engine, token_chunker, staging_dir, manifest,
+                                                      batch_size, lease, cue_vectors)
+            except Exception as e:
+                lease.stop()
+                queue.fail(unit["unit_id"], worker, f"{type(e).__name__}: {e}", max_attempts)
+                print(f"❌ {worker}: unit {unit['unit_id']} failed: {e}")
+                continue
+            lease.stop()
+            if queue.complete(unit["unit_id"], worker, staging, files, chunks):
+                units += 1
+                print(f"✅ {worker}: unit {unit['unit_id']} -> {files} files, {chunks} chunks")
+            else:
+                shutil.rmtree(staging, ignore_errors=True)
+                print(f"⚠️ {worker}: lost the lease on unit {unit['unit_id']}, result discarded")
+    finally:
+        queue.close()
+        if manifest is not None:
+            manifest.close()
+    return units
+
+
+def open_collection(persist_dir=PERSIST_DIR):
+    """The ingestion target: a ShardedCollection if persist_dir is sharded, else the Chroma collection."""
+    from sharding import read_layout, ShardedCollection
+
+    if read_layout(persist_dir) is not None:
+        return ShardedCollection(persist_dir)
+    import chromadb
+    return chromadb.PersistentClient(path=persist_dir).get_or_create_collection(name=COLLECTION_NAME)
+
+
+def merge(queue_path=QUEUE_PATH, persist_dir=PERSIST_DIR, manifest_path=MANIFEST_PATH, batch_size=BATCH_SIZE,
+          collection=None, keep_staging=False, store_dir=None, lexical_path=None):
+    """
+    Bulk-load every done unit's staging store into `subtitle_chunks` through
+    the same commit path as the single-machine pipeline: the manifest records
+    each file and its chunk IDs, and chunks an edited file no longer produces
+    are deleted. As in stream_ingest, `store_dir` and `lexical_path` keep an
+    EmbeddingStore and a LexicalIndex in step (appends and stale deletions).
+    Units are marked merged one by one, so an interrupted merge resumes where
+    it stopped. Returns the ingestion stats.
+    """
+    queue = WorkQueue(queue_path)
+    manifest = IngestManifest(manifest_path)
+    backup_store = EmbeddingStore(store_dir) if store_dir else None
+    lexical_index = LexicalIndex(lexical_path) if lexical_path else None
+    own_collection = collection is None
+    collection = collection if collection is not None else open_collection(persist_dir)
+    stats = new_stats()
+    offset_keys = ("char_start", "char_end", "start_time", "end_time", CUE_INDEX_KEY, CUE_VECTORS_KEY)
+    try:
+        for unit_id, staging in queue.done_units():
+            reader = EmbeddingStoreReader(staging)
+            finished = []
+            with open(os.path.join(staging, SOURCES_FILE), "r", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    manifest.begin_file(entry["source"], entry["hash"])
+                    finished.append((entry["source"], entry["chunk_ids"]))
+            for start in range(0, reader.count, batch_size):
+                rows = range(start, min(start + batch_size, reader.count))
+                batch = []
+                for row in rows:
+                    metadata = reader.metadata(row)
+                    offsets = {key: metadata[key] for key in offset_keys if key in metadata}
+                    batch.append((reader.ids[row], metadata["source"], metadata["chunk_index"], offsets,
+                                  reader.text(row)))
+                embeddings = reader.vectors[rows.start:rows.stop].astype("float32")
+                commit_batch(manifest, collection, batch, embeddings, [], stats, backup_store=backup_store,
+                             lexical_index=lexical_index)
+            # Files are closed out (and their stale chunks deleted) only after all their chunks are in
+            files = len(finished)
+            commit_batch(manifest, collection, [], [], finished, stats, backup_store=backup_store,
+                         lexical_index=lexical_index)
+            stats["ingested_files"] += files
+            queue.mark_merged(unit_id)
+            if not keep_staging:
+                shutil.rmtree(staging, ignore_errors=True)
+            print(f"📥 Merged unit {unit_id}: {files} files, {reader.count} chunks")
+    finally:
+        manifest.close()
+        queue.close()
+        if lexical_index is not None:
+            lexical_index.close()
+        if own_collection and hasattr(collection, "close"):
+            collection.close()
+    return stats
+
+
+def _worker_process(kwargs):
+    return run_worker(**kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed ingestion: plan units, run workers, merge, watch progress.")
+    parser.add_argument("--queue", default=QUEUE_PATH, help="SQLite work queue (shared by all workers)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    plan = commands.add_parser("plan", help="Split a zipfiles database or a subtitle folder into work units")
+    plan.add_argument("--db", default=None, help=f"zipfiles database (default {DB_PATH} if no --folder)")
+    plan.add_argument("--folder", default=None, help="Folder of subtitle files instead of the database")
+    plan.add_argument("--unit-rows", type=int, default=UNIT_ROWS, help="Zip rows (or files) per unit")
+
+    for name, help_text in (("work", "Run one worker until the queue is drained"),
+                            ("run", "Drain the planned queue with N local worker processes, then merge")):
+        sub = commands.add_parser(name, help=help_text)
+        sub.add_argument("--staging", default=STAGING_DIR, help="Staging directory (shared storage across hosts)")
+        sub.add_argument("--encoder", choices=[*ENCODER_BACKENDS, "stub"], default="torch")
+        sub.add_argument("--chunker", choices=["tokens", "words"], default=CHUNKER)
+        sub.add_argument("--manifest", default=MANIFEST_PATH, help="Main manifest; unchanged files are skipped")
+        sub.add_argument("--lease", type=float, default=LEASE_SECONDS, help="Lease length in seconds")
+        sub.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+        sub.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        sub.add_argument("--cue-vectors", action="store_true", help="Also embed snippet windows (~2x ingest time)")
+    commands.choices["work"].add_argument("--worker-id", default=None, help="Default: hostname:pid")
+    commands.choices["work"].add_argument("--keep-polling", action="store_true",
+                                          help="Wait for new units instead of exiting when the queue is drained")
+    commands.choices["run"].add_argument("--workers", type=int, default=2, help="Local worker processes")
+
+    merge_cmd = commands.add_parser("merge", help="Bulk-load finished units into the collection")
+    merge_cmd.add_argument("--manifest", default=MANIFEST_PATH)
+    merge_cmd.add_argument("--keep-staging", action="store_true")
+    for sub in (commands.choices["run"], merge_cmd):
+        sub.add_argument("--persist-dir", default=PERSIST_DIR)
+        sub.add_argument("--store", default=None, help="Also merge embeddings into this binary EmbeddingStore directory")
+        sub.add_argument("--lexical-index", default=None, help="Also merge chunks into this BM25 lexical index")
+
+    status_cmd = commands.add_parser("status", help="Show progress and throughput")
+    status_cmd.add_argument("--watch", type=float, default=None, metavar="SECONDS", help="Refresh every SECONDS")
+    status_cmd.add_argument("--retry-failed", action="store_true", help="Requeue failed units first")
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        queue = WorkQueue(args.queue)
+        if args.folder:
+            added = queue.plan_folder(args.folder, args.unit_rows)
+        else:
+            added = queue.plan_zip_rows(args.db or DB_PATH, args.unit_rows)
+        print(f"✅ Planned {added} new units in {args.queue}")
+        print(format_progress(queue.progress()))
+        queue.close()
+
+    elif args.command == "work":
+        n = run_worker(args.queue, args.worker_id, args.staging, args.encoder, args.chunker, args.manifest,
+                       args.lease, args.max_attempts, not args.keep_polling, args.batch_size, args.cue_vectors)
+        print(f"🎯 Worker finished {n} units")
+
+    elif args.command == "run":
+        worker_kwargs = [dict(queue_path=args.queue, worker=f"local-{i}", staging_dir=args.staging,
+                              encoder=args.encoder, chunker=args.chunker, manifest_path=args.manifest,
+                              lease_seconds=args.lease, max_attempts=args.max_attempts, batch_size=args.batch_size,
+                              cue_vectors=args.cue_vectors)
+                         for i in range(args.workers)]
+        start = time.perf_counter()
+        with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+            result = pool.map_async(_worker_process, worker_kwargs)
+            queue = WorkQueue(args.queue)
+            while not result.ready():
+                result.wait(5)
+                print(format_progress(queue.progress()))
+            queue.close()
+            result.get()
+        print(f"🎯 Workers done in {time.perf_counter() - start:.1f}s, merging...")
+        print(summary(merge(args.queue, args.persist_dir, args.manifest, store_dir=args.store,
+                            lexical_path=args.lexical_index)))
+
+    elif args.command == "merge":
+        print(summary(merge(args.queue, args.persist_dir, args.manifest, keep_staging=args.keep_staging,
+                            store_dir=args.store, lexical_path=args.lexical_index)))
+
+    elif args.command == "status":
+        queue = WorkQueue(args.queue)
+        if args.retry_failed:
+            print(f"🔁 Requeued {queue.retry_failed()} failed units")
+        while True:
+            print(format_progress(queue.progress()))
+            if args.watch is None or queue.is_finished():
+                break
+            time.sleep(args.watch)
+        queue.close()
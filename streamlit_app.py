@@ -1,22 +1,109 @@
 import os
+import sys
+import time
 import streamlit as st
 import chromadb
-from transformers import pipeline
-from sentence_transformers import SentenceTransformer
 import re
 import numpy as np
 
-# Initializing ChromaDB Client
-client = chromadb.PersistentClient(path="chroma_db")  # Adjust path to match your folder
-collection = client.get_collection("subtitle_chunks")  # Must match your stored collection name
+# Shared pipeline modules live in scripts/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from search_backends import get_backend, ChromaBackend
+from embedding_engine import load_encoder
+from sharding import read_layout, ShardedBackend
+from query_cache import QueryCache
+from search_service import search_via_service
+from transcriber import Transcriber
+from instrumentation import span, trace, write_prometheus
+from lexical_index import LexicalIndex, hybrid_query, LEXICAL_INDEX_PATH
+from chunk_metadata import build_where, format_timestamp
+from text_cleanup import cleanup_document
+from cue_index import attach_snippets
 
-# Load Models for Query Embeddings and Audio Transcription
-embedding_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-whisper_model = pipeline("automatic-speech-recognition", model="openai/whisper-small")
+# Retrieval backend: "chroma" (HNSW via ChromaDB), "numpy" (exact search over the embedding store),
+# or "int8"/"binary" (quantized codes in RAM, re-ranked against the on-disk float vectors)
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "chroma")
+# Query encoder: "torch" (SentenceTransformer) or "onnx" / "onnx-int8" (ONNX Runtime, see scripts/onnx_encoder.py)
+ENCODER_BACKEND = os.environ.get("ENCODER_BACKEND", "torch")
+
+# Retrieval mode: "vector" (embeddings only), "lexical" (BM25 inverted index) or
+# "hybrid" (BM25 + vector candidates fused with reciprocal rank fusion).
+# In lexical/hybrid mode a query wrapped in double quotes is an exact phrase lookup.
+SEARCH_MODE = os.environ.get("SEARCH_MODE", "vector")
+LEXICAL_INDEX = os.environ.get("LEXICAL_INDEX", LEXICAL_INDEX_PATH)
+
+# If set (e.g. http://127.0.0.1:8765), queries go to the micro-batching search service
+# instead of loading the embedding model and collection in this process
+SEARCH_SERVICE_URL = os.environ.get("SEARCH_SERVICE_URL")
+
+# Query-result cache settings
+CACHE_MAX_ENTRIES = 1000
+CACHE_TTL_SECONDS = 3600
+CACHE_PATH = "query_cache.json"      # None keeps the cache in memory only
+SEMANTIC_CACHE_THRESHOLD = None      # e.g. 0.95 to reuse results of near-identical queries
+
+# Per-stage metrics: METRICS_PATH rewrites a Prometheus textfile after every query;
+# METRICS_JSON_LOG and PROFILE_SLOW_MS (see scripts/instrumentation.py) add JSON logs and slow-request profiles
+METRICS_PATH = os.environ.get("METRICS_PATH")
+
+# Set WHISPER_WARMUP=1 to start loading Whisper in a background thread at server start
+WHISPER_WARMUP = os.environ.get("WHISPER_WARMUP") == "1"
+
+# Streamlit re-runs this script on every interaction, so every heavy resource is
+# created once per server process with st.cache_resource and shared by all sessions.
+
+@st.cache_resource
+def get_search_backend(name: str):
+    """Initializing ChromaDB Client (or the NumPy backend) once per process."""
+    if name == "chroma" and read_layout("chroma_db") is not None:
+        # Streamlit runs this script as __main__, which spawned shard workers would re-run, so the
+        # shards are searched in-process here (SEARCH_SERVICE_URL gives one worker process per shard)
+        return ShardedBackend("chroma_db", processes=False)
+    if name == "chroma":
+        client = chromadb.PersistentClient(path="chroma_db")  # Adjust path to match your folder
+        collection = client.get_collection("subtitle_chunks")  # Must match your stored collection name
+        return ChromaBackend(collection)
+    return get_backend(name)
+
+@st.cache_resource
+def get_embedding_model():
+    """Load the query embedding model once per process."""
+    return load_encoder("sentence-transformers/all-MiniLM-L6-v2", ENCODER_BACKEND)
+
+@st.cache_resource
+def get_whisper_transcriber():
+    """
+    Shared Whisper transcriber. The model itself loads the first time Audio mode
+    transcribes (or in a background thread when WHISPER_WARMUP=1).
+    """
+    transcriber = Transcriber()
+    if WHISPER_WARMUP:
+        transcriber.warm_up_in_background()
+    return transcriber
+
+@st.cache_resource
+def get_lexical_index(path: str):
+    """Open the BM25 index once per process (it is read-only here)."""
+    return LexicalIndex(path)
+
+if SEARCH_SERVICE_URL:
+    backend = embedding_model = None
+else:
+    backend = get_search_backend(SEARCH_BACKEND)
+    embedding_model = get_embedding_model()
+lexical_index = get_lexical_index(LEXICAL_INDEX) if SEARCH_MODE in ("lexical", "hybrid") else None
+whisper_transcriber = get_whisper_transcriber()
+
+@st.cache_resource
+def get_query_cache():
+    """One cache per server process, shared by every session and rerun."""
+    return QueryCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, CACHE_PATH, SEMANTIC_CACHE_THRESHOLD)
+
+query_cache = get_query_cache()
 
 def get_query_embedding(query_text: str):
     """
-    Generate an embedding for the query using SentenceTransformer,
+    Generate an embedding for the query with the query encoder (see ENCODER_BACKEND),
     then ensure it matches the dimension used in your ChromaDB collection.
     """
     query_embedding = embedding_model.encode(query_text)
@@ -26,46 +113,6 @@ def get_query_embedding(query_text: str):
         query_embedding = np.resize(query_embedding, target_dimension)
     return query_embedding.tolist()
 
-def cleanup_document(doc: str) -> str:
-    """
-    Clean up the retrieved subtitle text for display:
-      - Remove URLs.
-      - Remove extraneous lines containing skip-phrases.
-      - Truncate to 300 characters.
-      If cleaning removes all content, fall back to the original text (with URLs removed).
-    """
-    if not doc:
-        return ""
-    
-    # Remove URLs
-    doc_no_urls = re.sub(r'http\S+', '', doc)
-    lines = doc_no_urls.splitlines()
-    
-    skip_phrases = [
-        "movie information", "imdb link", "uploader", "download",
-        "filename", "nfo created", "md5", "fps", "language",
-        "format", "subtitles", "www.opensubtitles.org",
-        "we set the standards", "the benchmark", "score", "org"
-    ]
-    
-    cleaned_lines = []
-    for line in lines:
-        lower_line = line.lower()
-        if any(skip in lower_line for skip in skip_phrases):
-            continue
-        line = re.sub(r"\s+", " ", line).strip()
-        if line:
-            cleaned_lines.append(line)
-    
-    cleaned_doc = " ".join(cleaned_lines).strip()
-    if not cleaned_doc:
-        cleaned_doc = doc_no_urls.strip()
-    
-    max_len = 300
-    if len(cleaned_doc) > max_len:
-        cleaned_doc = cleaned_doc[:max_len] + "..."
-    return cleaned_doc
-
 def extract_movie_name(doc: str) -> str:
     """
     Attempt to extract a 'Release Name' from the document metadata.
@@ -77,30 +124,154 @@ def extract_movie_name(doc: str) -> str:
     match = re.search(r"Release Name\s*[:\-]\s*(.+)", doc, re.IGNORECASE)
     return match.group(1).strip() if match else ""
 
-def search_subtitles(query_text: str, top_k=5):
+def sort_results(docs, distances, metadatas=None):
+    """Sort results in descending order by score and return three lists (docs, scores, metadatas)."""
+    if not docs:
+        return [], [], []
+    if metadatas is None:
+        metadatas = [{}] * len(docs)
+    # Zip documents with distances and metadata
+    zipped_results = list(zip(docs, distances, metadatas))
+    # Sort descending by score (assuming higher score means better match)
+    sorted_results = sorted(zipped_results, key=lambda x: x[1], reverse=True)
+    # Unzip back to three lists
+    docs_sorted, distances_sorted, metas_sorted = zip(*sorted_results)
+    return list(docs_sorted), list(distances_sorted), list(metas_sorted)
+
+def cached_results(cached):
+    """Cache entries are [docs, scores, metadatas]; entries written before metadata existed have two lists."""
+    docs, scores = list(cached[0]), list(cached[1])
+    metadatas = list(cached[2]) if len(cached) > 2 else [{}] * len(docs)
+    return docs, scores, metadatas
+
+def search_subtitles(query_text: str, top_k=5, where=None):
     """
-    Search for the top_k relevant subtitles in the ChromaDB collection
-    using the query_text embedding. Sort results in descending order (higher scores first).
+    Search for the top_k relevant subtitles with the configured retrieval backend
+    using the query_text embedding, optionally restricted by a metadata `where`
+    filter. Sort results in descending order (higher scores first).
+    Repeated (or, in semantic mode, near-identical) queries are answered from the cache,
+    which is cleared whenever the indexed data changes.
     """
-    query_vec = get_query_embedding(query_text)
+    if lexical_index is not None:
+        return search_lexical(query_text, top_k, where)
+
+    if SEARCH_SERVICE_URL:
+        try:
+            with span("search_service"):
+                result = search_via_service(SEARCH_SERVICE_URL, query_text, top_k, where=where)
+            return sort_results(result["documents"], result["distances"], result.get("metadatas"))
+        except Exception as e:
+            st.error(f"Error calling search service at {SEARCH_SERVICE_URL}: {e}")
+            return [], [], []
+
+    with span("cache_lookup"):
+        query_cache.check_version(backend.fingerprint())
+        cached = query_cache.get(query_text, top_k, where)
+    if cached is not None:
+        return cached_results(cached)
+
+    start = time.perf_counter()
+    with span("encode"):
+        query_vec = get_query_embedding(query_text)
+    # The semantic cache ignores filters, so it only answers unfiltered searches
+    cached = query_cache.get_semantic(query_vec, top_k) if not where else None
+    if cached is not None:
+        return cached_results(cached)
+    query_cache.record_miss()
+
     try:
-        results = collection.query(query_embeddings=[query_vec], n_results=top_k)
+        with span("query"):
+            results = backend.query([query_vec], top_k=top_k, where=where)
         if not results["documents"]:
-            return [], []
-        # Zip documents with distances
-        zipped_results = list(zip(results["documents"][0], results["distances"][0]))
-        # Sort descending by score (assuming higher score means better match)
-        sorted_results = sorted(zipped_results, key=lambda x: x[1], reverse=True)
-        # Unzip back to two lists
-        docs_sorted, distances_sorted = zip(*sorted_results)
-        return list(docs_sorted), list(distances_sorted)
+            return [], [], []
+        docs_sorted, distances_sorted, metas_sorted = sort_results(
+            results["documents"][0], results["distances"][0], results["metadatas"][0])
+        with span("snippets"):
+            metas_sorted = attach_snippets(query_vec, docs_sorted, metas_sorted)
+        with span("cache_store"):
+            query_cache.put(query_text, top_k, [docs_sorted, distances_sorted, metas_sorted],
+                            None if where else query_vec, cost_seconds=time.perf_counter() - start, where=where)
+            query_cache.maybe_save()
+        return docs_sorted, distances_sorted, metas_sorted
     except Exception as e:
-        st.error(f"Error during ChromaDB query: {e}")
-        return [], []
+        st.error(f"Error during {backend.name} query: {e}")
+        return [], [], []
     
+def search_lexical(query_text: str, top_k=5, where=None):
+    """
+    Lexical or hybrid search. "Quoted" queries are exact phrase lookups on the
+    BM25 index; otherwise hybrid mode fuses BM25 and vector candidates.
+    Scores are BM25 scores (lexical) or fused RRF scores (hybrid), higher is better.
+    The BM25 index stores no metadata, so filters apply in hybrid mode only.
+    """
+    quoted = len(query_text) > 2 and query_text.startswith('"') and query_text.endswith('"')
+    version = f"{SEARCH_MODE}:{lexical_index.fingerprint()}:{backend.fingerprint() if backend else ''}"
+    with span("cache_lookup"):
+        query_cache.check_version(version)
+        cached = query_cache.get(query_text, top_k, where)
+    if cached is not None:
+        return cached_results(cached)
+    query_cache.record_miss()
+
+    start = time.perf_counter()
+    query_vec = None
+    try:
+        if quoted or SEARCH_MODE == "lexical" or backend is None:
+            if where:
+                st.warning("⚠️ Filters are ignored for lexical and exact-phrase searches.")
+            with span("lexical_query"):
+                results = lexical_index.query([query_text.strip('"')], top_k=top_k, phrase=quoted)
+        else:
+            with span("encode"):
+                query_vec = get_query_embedding(query_text)
+            with span("hybrid_query"):
+                results = hybrid_query(lexical_index, backend, query_text, query_vec, top_k, where=where)
+    except Exception as e:
+        st.error(f"Error during {SEARCH_MODE} query: {e}")
+        return [], [], []
+
+    docs, scores = results["documents"][0], results["scores"][0]
+    metadatas = results.get("metadatas", [[{}] * len(docs)])[0]
+    with span("snippets"):
+        metadatas = attach_snippets(query_vec, docs, metadatas)
+    query_cache.put(query_text, top_k, [docs, scores, metadatas], cost_seconds=time.perf_counter() - start,
+                    where=where)
+    query_cache.maybe_save()
+    return docs, scores, metadatas
+
+def format_result(doc: str, metadata: dict) -> str:
+    """
+    One result line from the chunk's stored metadata: title (year), file and
+    timestamp, plus a short snippet. With a cue index the snippet and timestamp
+    come ready-made from search (see scripts/cue_index.py), so only the snippet
+    is formatted here. Chunks indexed before metadata was stored fall back to
+    scraping the text.
+    """
+    if not metadata or "title" not in metadata:
+        movie_name = extract_movie_name(doc)
+        return f"**Movie:** {movie_name}" if movie_name else cleanup_document(doc)
+    parts = [metadata["title"] + (f" ({metadata['year']})" if "year" in metadata else "")]
+    if "file_name" in metadata:
+        parts.append(metadata["file_name"])
+    if "snippet_start" in metadata:
+        parts.append(f"{format_timestamp(metadata['snippet_start'])}–{format_timestamp(metadata['snippet_end'])}")
+    elif "start_time" in metadata:
+        parts.append(format_timestamp(metadata["start_time"]))
+    if metadata.get("alias_count"):
+        parts.append(f"+{metadata['alias_count']} duplicate releases")
+    snippet = metadata.get("snippet") or doc[:300] + ("..." if len(doc) > 300 else "")
+    return f"**Movie:** {' · '.join(parts)}  \n{snippet}"
+
 # Streamlit Interface
 st.title("🎬 Subtitles Search Engine")
 
+st.sidebar.header("Filters")
+filter_title = st.sidebar.text_input("Title")
+filter_year = st.sidebar.number_input("Year", min_value=0, max_value=2100, value=0, step=1,
+                                      help="0 = any year")
+filter_file = st.sidebar.text_input("Subtitle file")
+where = build_where(filter_title, filter_year or None, filter_file)
+
 mode = st.radio("Select Input Mode", ("Text", "Audio"))
 
 if mode == "Text":
@@ -109,40 +280,45 @@ else:
     uploaded_file = st.file_uploader("🎤 Upload your audio (.wav) file", type=["wav"])
     user_input = None
     if uploaded_file is not None:
-        temp_audio_path = "temp_audio.wav"
-        with open(temp_audio_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
         st.write("🎧 Processing audio with Whisper...")
         try:
-            result = whisper_model(
-                temp_audio_path,
-                return_timestamps=True,
-                generate_kwargs={"task": "transcribe", "language": "en"}
-            )
-            user_input = result["text"]
+            # Decoded straight from the upload buffer; silence trimmed, long clips chunked
+            with trace("transcription", audio_bytes=uploaded_file.size):
+                user_input = whisper_transcriber.transcribe_bytes(uploaded_file.getvalue(), language="en")
             st.write("✅ Transcribed Text:", user_input)
         except Exception as e:
             st.error(f"Whisper transcription failed: {str(e)}")
-        finally:
-            os.remove(temp_audio_path)
 
 if st.button("Submit Query") and user_input:
     st.write("### User Query:")
     st.write(user_input)
     
-    docs, distances = search_subtitles(user_input, top_k=5)
-    
-    if not docs:
-        st.warning("❌ No relevant subtitles found.")
-    else:
-        st.write("### Top Matching Subtitles:")
-        for i, (doc, score) in enumerate(zip(docs, distances), start=1):
-            movie_name = extract_movie_name(doc)
-            if movie_name:
-                display_text = f"**Movie:** {movie_name}"
-            else:
-                display_text = cleanup_document(doc)
-            st.write(f"**{i}.** {display_text} (Score: {score:.4f})")
+    with trace("search", mode=mode, query_chars=len(user_input)) as search_trace:
+        docs, distances, metadatas = search_subtitles(user_input, top_k=5, where=where)
+
+        if not docs:
+            st.warning("❌ No relevant subtitles found.")
+        else:
+            st.write("### Top Matching Subtitles:")
+            with span("postprocess"):
+                lines = []
+                for i, (doc, score, metadata) in enumerate(zip(docs, distances, metadatas), start=1):
+                    lines.append(f"**{i}.** {format_result(doc, metadata)} (Score: {score:.4f})")
+            for line in lines:
+                st.write(line)
+
+    if METRICS_PATH:
+        write_prometheus(METRICS_PATH)
+    st.sidebar.caption(
+        f"Last query: {search_trace['duration_ms']:.0f}ms ("
+        + ", ".join(f"{stage} {ms:.0f}ms" for stage, ms in search_trace["stages"].items()) + ")"
+    )
+
+cache_stats = query_cache.stats()
+st.sidebar.caption(
+    f"Query cache: {cache_stats['entries']} entries | hit rate {cache_stats['hit_rate']:.0%} | "
+    f"saved {cache_stats['saved_seconds']:.1f}s"
+)
 
 st.write("---")
 st.info("**Note**: If audio & text results differ, it may reflect differences in the actual transcribed text vs. typed text. This is normal for semantic search.")